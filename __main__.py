@@ -1,19 +1,66 @@
 # Author: Chong Cheng Hock
 # Admin No / Grp: 230643M / AA2301
+import gc
 import time
 import math
 import random
+import heapq
+import collections
 import json
 import hashlib
+import threading
 import os
+import sys
 from os import path
 
+try:
+	# optional, used to score whole columns of titles at once (UtilCLI.levenshtein_batch)
+	import numpy as np
+except ImportError:
+	np = None
+
 from includes.database_engine import database_engine
+from includes.sorted_index import SortedIndex
+from includes.search_index import NGramIndex
+from includes.query_cache import QueryCache
+from includes.loan_index import BorrowerIndex, DueIndex, loan_rows
+from includes.book_store import wrap_book
+from includes.loan_archive import LoanArchive
+from includes.library_server import LibraryServer, LibraryClient, RemoteError, RemoteReader, RemoteSequence, RemotePages, RemoteObject
+from includes.command_registry import CommandRegistry
+from includes.catalogue_import import read_rows, chunked
+from includes.catalogue_export import write_rows, BOOK_FIELDS, LOAN_FIELDS
+from includes.record_merge import MISSING
+from includes.isbn_codes import valid_isbn, canonical_isbn, canonical_isbns, catalogue_isbn, catalogue_canonical_isbn
+from includes.frame_renderer import FrameRenderer
 from includes import help_messages
 
-# database collections
-database_engine.create_reader("users.json")
-database_engine.create_reader("isbn.json")
+# storage backend, "json" (whole files in memory), "binary" (database/*.bin snapshots) or "sqlite" (database/library.sqlite3)
+# binary and sqlite import the json files on first use
+STORAGE_BACKEND = os.environ.get("LIBCLI_BACKEND", "json")
+
+# database collections (json/binary: changes are appended to a write-ahead log, json records are only decoded once accessed, see DatabaseReader)
+reader_options = {"wal": True, "lazy": True} if STORAGE_BACKEND in ("json", "binary") else {}
+if (os.environ.get("LIBCLI_SHARED") == "1" and STORAGE_BACKEND in ("json", "binary")):
+	# several terminals on the same database/ directory, saves are serialised with a file lock
+	# and changes made by the other terminals are merged in before every command (sqlite locks on its own)
+	reader_options["shared"] = True
+
+# library server (python . serve), terminals started while it runs connect to it instead of loading the database themselves
+LIBRARY_SOCKET = os.environ.get("LIBCLI_SOCKET", path.join(path.dirname(path.abspath(__file__)), "database", "library.sock"))
+library_client = LibraryClient.connect(LIBRARY_SOCKET) if sys.argv[1:2] != ["serve"] else None
+
+if (library_client != None):
+	# thin client, records are read from (and written through) the server
+	database_engine.created_readers["users"] = RemoteReader(library_client, "users")
+	database_engine.created_readers["isbn"] = RemoteReader(library_client, "isbn")
+else:
+	database_engine.create_reader("users.json", backend=STORAGE_BACKEND, **reader_options)
+	if (STORAGE_BACKEND in ("json", "binary")):
+		# books are held as compact BookRecord objects instead of one dict each
+		database_engine.create_reader("isbn.json", backend=STORAGE_BACKEND, wrap=wrap_book, **reader_options)
+	else:
+		database_engine.create_reader("isbn.json", backend=STORAGE_BACKEND, **reader_options)
 
 class UtilCLI:
 	# CLI utility class for misc actions not related to library function
@@ -22,60 +69,118 @@ class UtilCLI:
 		if (os.name == "nt"):
 			# windows
 			os.system("cls")
-		else:
-			# posix (mac, linux)
-			os.system("clear")
+		elif renderer.active():
+			# posix (mac, linux) terminal, escape sequences instead of running clear in a shell
+			renderer.clear()
+		# output redirected (e.g. to a file or pipe): nothing to clear, screens are printed one after another as plain text
 
 	def white_lines(line):
 		# line: int (number of empty lines to print out)
 		# prints out empty lines depending on line
 		print("\n" *line)
 
-	def levenshtein_distance(a, b):
+	def levenshtein_distance(a, b, max_distance=None):
 		# returns the levenshtein distance between two strings
-		la, lb = len(a) +1, len(b) +1 # represents m and n (distance being an m * n matrix)
-		distance = [[0 for x in range(la)] for y in range(lb)] # initiate array
-
-		# first row, first column
-		for x in range(la):
-			distance[0][x] = x
-
-		for y in range(lb):
-			distance[y][0] = y
-
-		for y in range(1, lb):
-			for x in range(1, la):
-				sc = 1 if a[x -1] != b[y -1] else 0 # substitution cost
-
-				distance[y][x] = min(
-					distance[y -1][x] +1,
-					distance[y][x -1] +1,
-					distance[y -1][x -1] +sc
-				)
+		# max_distance: int? (cutoff), distances greater than max_distance are not computed fully, max_distance +1 is returned instead
+		if (len(a) < len(b)):
+			# keep rows over the shorter string (distance is symmetric)
+			a, b = b, a
+		la, lb = len(a), len(b)
+
+		if (max_distance == None):
+			max_distance = la # distance can never exceed the longer length
+		elif (la -lb > max_distance):
+			# length difference alone exceeds the cutoff
+			return max_distance +1
+		over = max_distance +1 # stands in for every cell outside the band
+
+		# only two rows are kept, cells further than max_distance away from the diagonal are never evaluated
+		prev = [x if x <= max_distance else over for x in range(lb +1)]
+		curr = [over] *(lb +1)
+		for y in range(1, la +1):
+			ay = a[y -1]
+			lo, hi = max(1, y -max_distance), min(lb, y +max_distance)
+
+			curr[0] = y if y <= max_distance else over
+			if (lo > 1):
+				curr[lo -1] = over # left edge of the band
+
+			row_min = curr[0]
+			for x in range(lo, hi +1):
+				d = prev[x -1] +(ay != b[x -1]) # substitution (free if same character)
+				if (prev[x] +1 < d):
+					d = prev[x] +1 # deletion
+				if (curr[x -1] +1 < d):
+					d = curr[x -1] +1 # insertion
+				curr[x] = d
+
+				if (d < row_min):
+					row_min = d
+
+			if (hi < lb):
+				curr[hi +1] = over # right edge of the band (read by the next row)
+
+			if (row_min > max_distance):
+				# every cell in the band exceeds the cutoff, distance can only grow from here
+				return over
+
+			prev, curr = curr, prev
+
+		return min(prev[lb], over)
+
+	def levenshtein_batch(query, strings, max_distance=None):
+		# query: str, strings: str[]
+		# returns the levenshtein distance between query and every element of strings (list of int, same order as strings)
+		# max_distance: int? (cutoff), same meaning as in UtilCLI.levenshtein_distance()
+		n = len(strings)
+		if (np == None or n < 64):
+			# numpy not installed (or too few rows to be worth it), score row by row
+			return [UtilCLI.levenshtein_distance(s, query, max_distance) for s in strings]
+
+		m = len(query)
+		distances = np.full(n, m, dtype=np.int32) # empty strings are m insertions away
+		lengths = np.fromiter((len(s) for s in strings), dtype=np.int64, count=n)
+		q = np.frombuffer(query.encode("utf-32-le"), dtype=np.uint32)
+		q_idx = np.arange(m +1, dtype=np.int32) # column offsets (query positions)
+
+		# process rows in chunks of similar length, so padding (and iterations past the longest row) stays small
+		order = np.argsort(lengths, kind="stable")
+		chunk_size = 8192
+		for chunk_start in range(0, n, chunk_size):
+			rows = order[chunk_start: chunk_start +chunk_size]
+			row_lengths = lengths[rows]
+			width = int(row_lengths[-1])
+			if (width == 0):
+				continue
 
-		return distance[lb -1][la -1]
-
-	def get_command(command_inpt, command_list):
-		# returns an index within command_list, if no commands found, suggest close proximity commands
-		# returns if exact match: [True, idx_of_element: int]
-		# returns if no exact found: [False, suggestion: str?]; suggestion may be None if threshold not met
-		try:
-			idx = command_list.index(command_inpt.lower())
-			return [True, idx]
-		except ValueError:
-			min_distance = 10 # acting threshold (stores minimum value)
-			min_ele = None # store contents of minimal element
-			for x in command_list:
-				d = UtilCLI.levenshtein_distance(command_inpt, x)
-				if (d) < min_distance:
-					min_distance = d
-					min_ele = x
-
-					if (d <= 1):
-						# closest you'll get
-						return [False, min_ele]
-
-			return [False, min_ele]
+			# pack the chunk into a padded code point matrix (rows x width)
+			flat = np.frombuffer("".join([strings[idx] for idx in rows]).encode("utf-32-le"), dtype=np.uint32)
+			matrix = np.zeros((len(rows), width), dtype=np.uint32)
+			matrix[np.arange(width) < row_lengths[:, None]] = flat
+
+			# dp over the characters of the strings, vectorized across rows and query positions
+			# prev[r, i] is the distance between the first j characters of row r and the first i characters of query
+			prev = np.broadcast_to(q_idx, (len(rows), m +1)).copy()
+			result = np.full(len(rows), m, dtype=np.int32) # rows never completed below are empty strings
+			for j in range(1, width +1):
+				cost = (matrix[:, j -1, None] != q).astype(np.int32)
+				curr = np.empty_like(prev)
+				curr[:, 0] = j
+				np.minimum(prev[:, 1:] +1, prev[:, :-1] +cost, out=curr[:, 1:]) # deletion, substitution
+				# insertion chains along the row: curr[i] = min over k <= i of (curr[k] +i -k)
+				np.minimum.accumulate(curr -q_idx, axis=1, out=curr)
+				curr += q_idx
+
+				# rows ending at this character are complete
+				done = row_lengths == j
+				result[done] = curr[done, m]
+				prev = curr
+
+			distances[rows] = result
+
+		if (max_distance != None):
+			np.minimum(distances, max_distance +1, out=distances)
+		return distances.tolist()
 
 	def compare_str(a, b):
 		# a, b: str
@@ -122,20 +227,44 @@ class UtilCLI:
 			# a is bigger (should never be the same since equality check has been performed on a and b (proper string subsets))
 			return 1
 
+	def collation_key(s):
+		# s: str
+		# returns the key used to order strings alphabetically (case-insensitive)
+		# computed once per record so sorting never has to lower case strings during comparisons
+		return s.casefold()
+
+	def key_sort(keys, items, engine="timsort"):
+		# keys: comparable[] (precomputed, e.g. with UtilCLI.collation_key), items: any[] (items[i] is sorted by keys[i])
+		# engine: "timsort" (built-in list.sort) or "quick_sort" (UtilCLI.quick_sort)
+		# returns [sorted_keys, sorted_items] as new lists, equal keys keep their original order
+		n = len(keys)
+		if (engine == "quick_sort"):
+			# decorate with original position so equal keys stay in order
+			order = [[keys[idx], idx] for idx in range(n)]
+			UtilCLI.quick_sort(order, lambda a, b: 1 if a > b else 2)
+			order = [entry[1] for entry in order]
+		else:
+			# timsort, only compares precomputed keys
+			order = sorted(range(n), key=keys.__getitem__)
+
+		return [[keys[idx] for idx in order], [items[idx] for idx in order]]
+
 	def _quick_sort_partition(arr, comparison_fn, low, high):
 		# partition function, returns partition index
+		# move a random pivot to the end so it stays in place while partitioning
 		pivot_idx = random.randint(low, high)
+		arr[pivot_idx], arr[high] = arr[high], arr[pivot_idx]
 		ge_ele_ptr = low -1
 
 		for j in range(low, high):
-			r = comparison_fn(arr[j], arr[pivot_idx])
+			r = comparison_fn(arr[j], arr[high])
 			if r == 2:
-				# element greater than pivot
+				# element smaller than pivot
 				ge_ele_ptr += 1
 				arr[ge_ele_ptr], arr[j] = arr[j], arr[ge_ele_ptr]
 
 		# swap pivot element with greater element
-		arr[ge_ele_ptr +1], arr[pivot_idx] = arr[pivot_idx], arr[ge_ele_ptr +1]
+		arr[ge_ele_ptr +1], arr[high] = arr[high], arr[ge_ele_ptr +1]
 
 		# return partition index
 		return ge_ele_ptr +1
@@ -169,6 +298,42 @@ class UtilCLI:
 
 
 
+class SearchResults:
+	# paginated search results, pages are only ranked when they are first accessed
+	# behaves like the list of pages search_book() used to return (len() and indexing by page)
+	def __init__(self, scored, page_size):
+		# scored: [distance, rank, isbn][] in any order (rank breaks ties between equal distances)
+		# page_size: int (entries per page)
+		self._heap = scored
+		heapq.heapify(self._heap) # O(n), each ranked entry afterwards costs O(log n)
+		self._ranked = [] # [isbn, distance][] in ascending order of distance, grows as pages are accessed
+
+		self.page_size = page_size
+		self.total = len(scored) # total number of entries
+
+	def __len__(self):
+		# number of pages (at least one, possibly empty, page)
+		return max(1, math.ceil(self.total /self.page_size))
+
+	def __getitem__(self, page_idx):
+		# returns the entries ([isbn, distance][]) on page page_idx (zero-based)
+		if (page_idx < 0 or page_idx >= len(self)):
+			raise IndexError("page index out of range")
+
+		start = page_idx *self.page_size
+		end = min(start +self.page_size, self.total)
+
+		# pop just enough entries off the heap to fill this page
+		while len(self._ranked) < end:
+			ld, rank, isbn_code = heapq.heappop(self._heap)
+			self._ranked.append([isbn_code, ld])
+
+		return self._ranked[start: end]
+
+	def approx_size(self):
+		# rough memory held by the results in bytes (every entry ends up in both the heap and the ranked list)
+		return sys.getsizeof(self._heap) +sys.getsizeof(self._ranked) +self.total *(sys.getsizeof([0, 0, 0]) +sys.getsizeof([0, 0]))
+
 class LibraryData:
 	BOOK_TYPE = {
 		"Hard Cover": 1,
@@ -178,6 +343,7 @@ class LibraryData:
 
 	def __init__(self):
 		self.data = database_engine.created_readers["isbn"]
+		self.users = database_engine.created_readers["users"]
 
 		# parse self.BOOK_TYPE
 		self.BOOK_TYPE_MAPPED = []
@@ -188,180 +354,581 @@ class LibraryData:
 					break
 
 		# will be populated when self.process_data() is called
-		self.sorted_isbn = []
-		self.sorted_title = []
+		# kept up to date by add_book(), update_book() and delete_book() afterwards
+		self.isbn_index = SortedIndex(UtilCLI.collation_key)
+		self.title_index = SortedIndex(UtilCLI.collation_key)
+		self.sort_engine = "timsort" # engine used by UtilCLI.key_sort() in process_data(), "timsort" or "quick_sort"
 
-		self.total_entries = -1 # will be initialised
+		# title search index (trigrams), built alongside the sorted indexes
+		self.search_index = NGramIndex(3, UtilCLI.collation_key)
+		self.search_candidates = 200 # maximum number of candidates pulled from self.search_index per query
 
-	def validate_isbn(isbn_code):
-		# returns true if isbn is validated, accepts both 10 mod and 11 mod versions
-		# compares the check digit
-		if (isbn_code.find("-") == -1):
-			# no hyphen, 10 digit isbn
-			if len(isbn_code) != 10:
-				return False
-			else:
-				# exactly 10 chars, compute check digit
-				if not (isbn_code[:-1].isdigit()):
-					# can only contain digits (portion until check digit, exclusive)
-					return False
-				else:
-					checksum = 0
-					for idx in range(9):
-						factor = 10 -idx
-						checksum += int(isbn_code[idx]) *factor
-
-					# compute check digit (last digit of isbn)
-					checkdigit = 11 -(checksum %11)
-					print(checksum, checkdigit)
-					if checkdigit == 1:
-						checkdigit = "X"
-					else:
-						checkdigit = str(checkdigit)
-					return isbn_code[-1] == checkdigit
-		else:
-			s = isbn_code.split("-")
-			if (len(s) != 2 or len(s[0]) != 3 or len(s[1]) != 10):
-				# invalid length
-				return False
+		# canonical isbn (see isbn_codes.canonical_isbn()) -> catalogue key, so either form of an isbn finds the book
+		self.canonical_index = {}
 
-			if (not s[0].isdigit() or not (s[1][:-1].isdigit())): # don't pass 'X' check digit into .isdigit()
-				# not valid digits
-				return False
+		# catalogue version, bumped by every add_book(), update_book() and delete_book()
+		# cached search results computed against an older version are never served
+		self.version = 0
+		self.search_cache = QueryCache(8 *1024 *1024, SearchResults.approx_size) # 8MB cap
+
+		# populated when self.process_loans() is called (on first access of self.borrowers or self.due_index)
+		self._borrowers = BorrowerIndex() # isbn -> users referencing it in their loan entries
+		self._due_index = DueIndex() # active loans ordered by due timestamp
+		self.loans_processed = False
+
+		# loan history older than archive.max_age is moved out of users.json by archive_loans()
+		self.archive = LoanArchive()
 
-			# compute checkdigit
-			alternate = True
-			digits = s[0] +s[1] # string concatenation
-			checksum = 10
-			for idx in range(12):
-				factor = 1 if alternate else 3
-				checksum += int(digits[idx]) *factor
+		# held by every operation in server mode (see serve()), exports take it one batch at a time
+		self.lock = threading.RLock()
 
-				alternate = not alternate # toggle
+		self.total_entries = -1 # will be initialised
+
+	def validate_isbn(isbn_code):
+		# returns true if isbn is validated, accepts both isbn-10 and isbn-13 (hyphens and spaces anywhere between the digits)
+		# compares the check digit, see isbn_codes.valid_isbn()
+		return valid_isbn(isbn_code)
 
-			# compute check digit
-			checkdigit = 10 -(checksum %10)
-			return int(isbn_code[-1]) == checkdigit
+	def find_isbn(self, isbn):
+		# returns the catalogue key of isbn (either form, any hyphenation, e.g. "0306406152" for "978-0-306-40615-7"), None if not found
+		if (isbn in self.data):
+			return isbn
+
+		key = canonical_isbn(isbn)
+		if (key == None):
+			return None
+		return self.canonical_index.get(key)
 
 	def duplicate_isbn(self, isbn):
-		# returns true if unique isbn
-		return isbn in self.data
+		# returns true if isbn (or another form of it) is already in the catalogue
+		return self.find_isbn(isbn) != None
+
+	def unindex_isbn(self, isbn):
+		# removes the canonical_index entry of isbn (a catalogue key), unless it belongs to another record
+		# (catalogues written before keys were normalised may hold both forms of an isbn)
+		key = canonical_isbn(isbn)
+		if (key != None and self.canonical_index.get(key) == isbn):
+			del self.canonical_index[key]
+
+	@property
+	def sorted_isbn(self):
+		# isbn references in ascending order of isbn
+		return self.isbn_index.values
+
+	@property
+	def sorted_title(self):
+		# isbn references in ascending order of title
+		return self.title_index.values
 
 	def process_data(self):
-		# populate self.sorted_isbn and self.sorted_title in ascending order
-		# implements quick sort
-		alpha_data = []
+		# populate self.sorted_isbn and self.sorted_title in ascending order (full rebuild, used on start up)
+		# single mutations afterwards go through self.isbn_index and self.title_index directly
 		isbn_data = []
+		title_data = []
+		title_keys = [] # collation keys, computed once per record
+		isbn_keys = []
 
-		self.total_entries = 0 # reset counter first
-		for isbn in self.data:
-			alpha_data.append([self.data[isbn]["title"], isbn])
+		for isbn, title in self.data.project("title"):
 			isbn_data.append(isbn)
+			title_data.append(title)
+			title_keys.append(UtilCLI.collation_key(title))
+			isbn_keys.append(UtilCLI.collation_key(isbn))
+
+		self.total_entries = len(isbn_data)
+
+		# sort on the precomputed keys and load them straight into the indexes
+		self.title_index.load(*UtilCLI.key_sort(title_keys, isbn_data, self.sort_engine))
+		self.isbn_index.load(*UtilCLI.key_sort(isbn_keys, isbn_data, self.sort_engine))
+
+		# build title search index
+		self.search_index.load(isbn_data, title_data)
+
+		# keys that are not valid isbns (None) are left out
+		self.canonical_index = dict(zip(canonical_isbns(isbn_data), isbn_data))
+		self.canonical_index.pop(None, None)
+
+	def process_loans(self):
+		# populate the loan indexes from users.json (every user's loan entries are visited once)
+		if hasattr(self.users, "loan_rows"):
+			# sqlite backend, read from the loans table without decoding every user
+			rows = self.users.loan_rows()
+			self._borrowers.load(rows)
+			self._due_index.load(rows)
+		else:
+			self._borrowers.build(self.users)
+			self._due_index.build(self.users)
 
-			# increment total entries
-			self.total_entries += 1
-
-		UtilCLI.bubble_sort(alpha_data, lambda a, b: UtilCLI.compare_str(a[0], b[0])) # wrap in lambda since elements of alpha_data is [title, isbn]
-		UtilCLI.bubble_sort(isbn_data, UtilCLI.compare_str) # no need to be wrapped
+		self.loans_processed = True
 
-		# transform alpha_data to primitive elements instead of an array
-		primitive_alpha_data = []; # stores alpha_data but without the title reference, simply stores the isbn reference (since alpha_data is already sorted)
-		total_length = len(alpha_data)
-		for i in range(total_length):
-			primitive_alpha_data.append(alpha_data[i][1]) # push only the isbn reference (of string type - primitive)
+	def refresh(self):
+		# rebuilds every index after the stores were replaced as a whole (e.g. convert import=...)
+		self.process_data()
+		self.loans_processed = False # rebuilt on next use
+		self.version += 1
+		self.search_cache.clear()
+
+	@property
+	def borrowers(self):
+		# built on first use, so that logging in does not decode every user's loan history
+		if not self.loans_processed:
+			self.process_loans()
+		return self._borrowers
+
+	@property
+	def due_index(self):
+		if not self.loans_processed:
+			self.process_loans()
+		return self._due_index
+
+	def archive_loans(self, max_age=None):
+		# moves old loan history into the archive, returns the number of entries moved
+		with self.lock, database_engine.transaction(self.users):
+			self.apply_remote_changes()
+			removed = self.archive.archive(self.users, max_age)
+			if self.loans_processed:
+				for username, isbn in removed:
+					self._borrowers.discard(isbn, username)
+			return len(removed)
+
+	def loan_history(self, username):
+		# yields [isbn, loan_timestamp, duration, return_timestamp] of every returned loan of username, oldest first
+		# archived entries are streamed from the archive first, then the recent ones in users.json
+		# archived entries of books deleted since are skipped (the archive is append only, delete_book() can not remove them)
+		with self.lock, database_engine.transaction(self.users):
+			# the segment list and the recent entries are taken together, no other terminal archives in between
+			self.apply_remote_changes()
+			segments = self.archive.refresh()
+			recent = [list(loan_entry) for loan_entry in self.users[username]["loaned_books"]]
+
+		for entry in self.archive.entries(username, segments):
+			if (entry[1] in self.data):
+				yield entry[1:]
+		for loan_entry in recent:
+			yield loan_entry
+
+	def apply_remote_changes(self):
+		# shared mode, updates the indexes for the records other terminals changed (see DatabaseReader.sync())
+		if not getattr(self.data, "shared", False):
+			return
 
-		self.sorted_isbn = isbn_data # elements already in primitive data type
-		self.sorted_title = primitive_alpha_data
+		changed = False
+		while len(self.data.changes) > 0:
+			isbn, old, new = self.data.changes.popleft()
+			if (old != None):
+				self.title_index.remove(old["title"], isbn)
+				self.isbn_index.remove(isbn, isbn)
+				self.search_index.remove(isbn, old["title"])
+				self.unindex_isbn(isbn)
+				self.total_entries -= 1
+			if (new != None):
+				self.title_index.insert(new["title"], isbn)
+				self.isbn_index.insert(isbn, isbn)
+				self.search_index.add(isbn, new["title"])
+				key = canonical_isbn(isbn)
+				if (key != None):
+					# keys written before isbns were validated may not be valid isbns (left out, like in process_data())
+					self.canonical_index[key] = isbn
+				self.total_entries += 1
+			changed = True
+
+		if changed:
+			self.version += 1 # cached search results are stale
+
+		while len(self.users.changes) > 0:
+			username, old, new = self.users.changes.popleft()
+			if not self.loans_processed:
+				continue # built from the current records on first use
+
+			if (old != None):
+				for row in loan_rows({username: old}):
+					self._borrowers.discard(row[1], username)
+					if (row[3] == None):
+						self._due_index.discard(username, row[1])
+			if (new != None):
+				for row in loan_rows({username: new}):
+					self._borrowers.add(row[1], username)
+					if (row[3] == None):
+						self._due_index.add(username, row[1], row[2])
+
+	def user_due_before(self, username, timestamp):
+		# returns the isbns loaned by username that are due at or before timestamp (in loan order)
+		# reads the user's own loan entries until the loan indexes are needed for something else
+		if self.loans_processed:
+			return self._due_index.user_due_before(username, timestamp)
+
+		return [loan_entry[0] for loan_entry in self.users[username]["loaning"] if loan_entry[1] +loan_entry[2] <= timestamp]
 
 
 	def add_book(self, book_data):
 		# book_data: {isbn: str, title: str, quantity: integer, type: integer}
-		# adds a book to self.data, returns boolean indicating result of operation (true for success)
-		self.data[book_data["isbn"]] = {
-			"title": book_data["title"],
-			"type": book_data["type"],
-			"quantity": book_data["quantity"]
-		}
+		# adds a book to self.data under the catalogue form of its isbn (see isbn_codes.catalogue_isbn())
+		# returns boolean indicating result of operation (true for success), false if isbn is not valid
+		# or if the other form of it is already in the catalogue (one record per book)
+		with self.lock, database_engine.transaction(self.data):
+			self.apply_remote_changes() # shared mode, what other terminals saved is in the indexes before anything is checked
+			isbn = catalogue_isbn(book_data["isbn"])
+			if (isbn == None):
+				return False
 
-		# update references
-		self.process_data()
+			existing = self.find_isbn(isbn)
+			if (existing != None and existing != isbn):
+				return False
 
-		# return status true
-		return True
+			if (isbn in self.data):
+				# overwriting an existing entry, drop its old index positions first
+				self.title_index.remove(self.data[isbn]["title"], isbn)
+				self.isbn_index.remove(isbn, isbn)
+				self.search_index.remove(isbn, self.data[isbn]["title"])
+				self.total_entries -= 1
+
+			self.data[isbn] = {
+				"title": book_data["title"],
+				"type": book_data["type"],
+				"quantity": book_data["quantity"]
+			}
+
+			# update references (bisect insert, no re-sort)
+			self.title_index.insert(book_data["title"], isbn)
+			self.isbn_index.insert(isbn, isbn)
+			self.search_index.add(isbn, book_data["title"])
+			self.canonical_index[canonical_isbn(isbn)] = isbn
+			self.total_entries += 1
+			self.version += 1
+
+			# return status true
+			return True
 
 	def delete_book(self, isbn):
 		# removes isbn from database, and from all user's loan references
-		del self.data[isbn]
+		with self.lock, database_engine.transaction(self.data, self.users):
+			self.apply_remote_changes()
+			book_data = self.data[isbn]
+			if (book_data == None):
+				return False
 
-		# update references
-		self.process_data()
+			# update references (bisect removal, no re-sort)
+			self.title_index.remove(book_data["title"], isbn)
+			self.isbn_index.remove(isbn, isbn)
+			self.search_index.remove(isbn, book_data["title"])
+			self.unindex_isbn(isbn)
+			self.total_entries -= 1
+			self.version += 1
+
+			del self.data[isbn]
+
+			# only visit the users that have isbn in their loan entries
+			for username in self.borrowers.drop(isbn):
+				self.due_index.discard(username, isbn)
+				user_data = self.users[username]
+				loan_idx = 0
+				for loan_entry in user_data["loaning"]:
+					if (loan_entry[0] == isbn):
+						# pop entry (should only have one unique entry in "loaning")
+						user_data["loaning"].pop(loan_idx)
+						break
+					loan_idx += 1
+
+				n = len(user_data["loaned_books"])
+				for loan_idx in range(n):
+					loan_entry = user_data["loaned_books"][n -loan_idx -1] # start from the last element
+					if (loan_entry[0] == isbn):
+						user_data["loaned_books"].pop(n -loan_idx -1) # minimal shifting
+
+			return True
+					
+
+	def loan_book(self, username, isbn, duration):
+		# username: str, isbn: str, duration: int (seconds)
+		# loans isbn to username, the checks and the stock decrement happen together under self.lock
+		# (in server mode two terminals can not both get the last copy, in shared mode the database transaction does the same across processes)
+		# returns [loan_entry: [isbn, loan_timestamp, duration], None], or [None, error message] if the loan is refused
+		with self.lock, database_engine.transaction(self.data, self.users):
+			self.apply_remote_changes()
+			book_data = self.data.get(isbn)
+			user_data = self.users.get(username)
+			if (book_data == None or user_data == None):
+				return [None, "Unable to loan books as the book or user no longer exists."]
+
+			if (len(self.user_due_before(username, time.time())) > 0):
+				return [None, "Unable to loan books, please return your overdue loans by calling 'return'."]
+
+			# maximum loan a user can have is 5 books
+			if (len(user_data["loaning"]) >= 5):
+				return [None, "Unable to loan books as you have reached the maximum capacity of 5 loans, please return some of the loaned books by calling 'return'."]
 
-		for username in database_engine.created_readers["users"]:
-			user_data = database_engine.created_readers["users"][username]
-			loan_idx = 0
 			for loan_entry in user_data["loaning"]:
 				if (loan_entry[0] == isbn):
-					# pop entry (should only have one unique entry in "loaning")
-					user_data["loaning"].pop(loan_idx)
-					break
-				loan_idx += 1
+					return [None, "Unable to loan books as you have already loaned this book."]
+
+			if (book_data["quantity"] <= 0):
+				return [None, "Unable to loan books as the library currently have no more copies available, sorry!"]
+
+			borrowers, due_index = self.borrowers, self.due_index # built (if not yet) before the new entry exists
+			book_data["quantity"] -= 1 # decrement stock count
+
+			loan_entry = [isbn, time.time(), duration]
+			user_data["loaning"].append(loan_entry)
+			borrowers.add(isbn, username)
+			due_index.add(username, isbn, loan_entry[1] +duration)
+
+			return [loan_entry, None]
+
+	def return_book(self, username, isbn):
+		# username: str, isbn: str (book loaned by username, a user can not loan the same book twice)
+		# moves the loan entry to the user's "loaned_books" with a return timestamp
+		# returns [loan_entry, None], or [None, error message] if username is not loaning isbn (e.g. already returned from another terminal)
+		with self.lock, database_engine.transaction(self.data, self.users):
+			self.apply_remote_changes()
+			user_data = self.users.get(username)
+			loan_idx = -1
+			if (user_data != None):
+				for idx in range(len(user_data["loaning"])):
+					if (user_data["loaning"][idx][0] == isbn):
+						loan_idx = idx
+						break
 
-			n = len(user_data["loaned_books"])
-			for loan_idx in range(n):
-				loan_entry = user_data["loaned_books"][n -loan_idx -1] # start from the last element
-				if (loan_entry[0] == isbn):
-					user_data["loaned_books"].pop(n -loan_idx -1) # minimal shifting
+			if (loan_idx == -1):
+				return [None, "'{}' is not on loan anymore.".format(isbn)]
 
-		return True
-					
+			loan_entry = user_data["loaning"].pop(loan_idx)
+			user_data["loaned_books"].append(loan_entry +[time.time()]) # append an extra element (return timestamp)
+			# borrower reference count unchanged, entry only moved from "loaning" to "loaned_books"
+			self.due_index.discard(username, loan_entry[0])
+
+			# update database (the book may have been deleted meanwhile)
+			if (isbn in self.data):
+				self.data[isbn]["quantity"] += 1
+
+			return [loan_entry, None]
 
 	def update_book(self, isbn, payload):
 		# payload: {title: str?, quantity: int?, type: int?}
 		# return boolean (success state)
-		if (self.data.get(isbn)):
-			book_data = self.data[isbn]
-
-			title = book_data["title"]
-			if ("title" in payload):
-				# validate title
-				if type(payload["title"]) != str or payload["title"] == "":
-					# not a string or an empty string
-					return False
-				else:
-					# valid title
-					title = payload["title"]
-
-			quantity = book_data["quantity"]
-			if ("quantity" in payload):
-				# validate quantity
-				if type(payload["quantity"]) != int or payload["quantity"] < 0:
-					# not an int, OR value is a zero/negative number
-					return False
-				else:
-					# valid quantity
-					quantity = payload["quantity"]
-
-			book_type = book_data["type"]
-			if ("type" in payload):
-				# validate type
-				if type(payload["type"]) != int or payload["type"] <= 0 or payload["type"] >= 4:
-					# not an int, OR value <= 0, OR value >= 0
-					return False
-				else:
-					# valid type
-					book_type = payload["type"]
+		with self.lock, database_engine.transaction(self.data):
+			self.apply_remote_changes()
+			if (self.data.get(isbn)):
+				book_data = self.data[isbn]
+
+				title = book_data["title"]
+				if ("title" in payload):
+					# validate title
+					if type(payload["title"]) != str or payload["title"] == "":
+						# not a string or an empty string
+						return False
+					else:
+						# valid title
+						title = payload["title"]
+
+				quantity = book_data["quantity"]
+				if ("quantity" in payload):
+					# validate quantity
+					if type(payload["quantity"]) != int or payload["quantity"] < 0:
+						# not an int, OR value is a zero/negative number
+						return False
+					else:
+						# valid quantity
+						quantity = payload["quantity"]
+
+				book_type = book_data["type"]
+				if ("type" in payload):
+					# validate type
+					if type(payload["type"]) != int or payload["type"] <= 0 or payload["type"] >= 4:
+						# not an int, OR value <= 0, OR value >= 0
+						return False
+					else:
+						# valid type
+						book_type = payload["type"]
+
+				# move entry within the title and search indexes if the title changed
+				self.title_index.update(book_data["title"], title, isbn)
+				self.search_index.update(isbn, book_data["title"], title)
+
+				# assign attributes
+				book_data["title"] = title
+				book_data["quantity"] = quantity
+				book_data["type"] = book_type
+				self.version += 1
+
+				# success
+				return True
+
+	def parse_book(self, row):
+		# row: {isbn, title, type, quantity} (values may be strings, e.g. csv cells), validated like add and update_book()
+		# returns [isbn, {title, type, quantity}], or [None, error message] if the row is invalid
+		isbn, title, book_type, quantity = row.get("isbn"), row.get("title"), row.get("type"), row.get("quantity")
+		key = catalogue_isbn(isbn.strip()) if type(isbn) == str else None # validated once, see LibraryData.validate_isbn()
+		if (key == None):
+			return [None, "invalid isbn '{}'".format(isbn)]
+
+		if (type(title) != str or title.strip() == ""):
+			return [None, "title cannot be empty"]
+
+		if (type(quantity) == str and quantity.strip().isdigit()):
+			quantity = int(quantity)
+		if (type(quantity) != int or quantity < 0):
+			return [None, "quantity must be a positive (or zero) integer, got '{}'".format(quantity)]
+
+		if (type(book_type) == str):
+			# number or name (e.g. "EBook")
+			book_type = int(book_type) if book_type.strip().isdigit() else self.BOOK_TYPE.get(book_type.strip())
+		if (type(book_type) != int or book_type <= 0 or book_type >= 4):
+			return [None, "type must be an integer within the range 1 and 3 (inclusive), got '{}'".format(row.get("type"))]
+
+		return [key, {"title": title, "type": book_type, "quantity": quantity}]
+
+	def import_books(self, filepath, fmt=None, chunk_size=10000):
+		# bulk adds the books of a csv or jsonl file (see catalogue_import.read_rows()), streamed chunk_size rows at a time
+		# invalid rows and isbns already in the catalogue (or earlier in the file) are reported and skipped, the rest is imported
+		# the books of a chunk are sorted once and merged into the indexes, instead of being inserted one by one (or rebuilding every index)
+		# returns [imported: int, errors: [row_number, message][]]
+
+		# the cyclic garbage collector is paused meanwhile, every imported book allocates a few containers (none of them in a cycle)
+		# that would otherwise trigger collections walking the whole, growing, catalogue
+		gc_enabled = gc.isenabled()
+		gc.disable()
+		try:
+			imported = 0
+			errors = []
+			seen = set() # canonical isbns imported from this file
+			for chunk in chunked(read_rows(filepath, fmt), chunk_size):
+				parsed = []
+				for row_number, row in chunk:
+					if (row == None):
+						errors.append([row_number, "malformed row"])
+						continue
+
+					isbn, book_data = self.parse_book(row)
+					if (isbn == None):
+						errors.append([row_number, book_data])
+					else:
+						parsed.append([row_number, isbn, book_data])
+
+				# one lock acquisition per chunk (autosave, and other terminals in shared mode, may write in between chunks)
+				with self.lock, database_engine.transaction(self.data), self.data.lock:
+					self.apply_remote_changes()
+
+					# duplicates are matched on the canonical isbn, so "0306406152" and "978-0306406157" are the same book
+					books = []
+					for row_number, isbn, book_data in parsed:
+						key = catalogue_canonical_isbn(isbn)
+						if (key in seen or isbn in self.data or key in self.canonical_index):
+							errors.append([row_number, "duplicate isbn '{}'".format(isbn)])
+						else:
+							seen.add(key)
+							books.append([isbn, book_data])
+							self.canonical_index[key] = isbn
+
+					isbn_data = []
+					title_data = []
+					for isbn, book_data in books:
+						self.data[isbn] = book_data
+						isbn_data.append(isbn)
+						title_data.append(book_data["title"])
+
+					# indexed before the lock is released, books deleted or changed in between chunks are found in them
+					self.title_index.merge(*UtilCLI.key_sort([UtilCLI.collation_key(title) for title in title_data], isbn_data, self.sort_engine))
+					self.isbn_index.merge(*UtilCLI.key_sort([UtilCLI.collation_key(isbn) for isbn in isbn_data], isbn_data, self.sort_engine))
+					self.search_index.add_many(isbn_data, title_data)
+					self.total_entries += len(books)
+					if (len(books) > 0):
+						self.version += 1
+				imported += len(books)
+		finally:
+			if gc_enabled:
+				gc.enable()
+
+		return [imported, errors]
+
+	def export_books(self, order="title", batch_size=1000):
+		# yields [isbn, title, type, quantity] of every book in title (or isbn) order, as the catalogue was when called
+		# walks the sorted index batch_size entries at a time, the catalogue may change in between (e.g. loans of server clients):
+		# books changed since are exported from their pre-image (data snapshot) at their old position, books added since are left out
+		index = self.title_index if order == "title" else self.isbn_index
+		sort_key = (lambda isbn, book_data: index.key_fn(book_data["title"])) if order == "title" else (lambda isbn, book_data: index.key_fn(isbn))
+
+		with self.lock:
+			snapshot = self.data.open_snapshot()
+		try:
+			cursor = None # [sort key, isbn] of the last exported book
+			pending = [] # [sort key, isbn, book_data][] of changed books not exported yet
+			preimages_seen = 0
+			while True:
+				with self.lock, self.data.lock:
+					preimages = list(snapshot.preimages.items())
+					for isbn, book_data in preimages[preimages_seen:]:
+						if not (book_data is MISSING) and (cursor == None or [sort_key(isbn, book_data), isbn] > cursor):
+							pending.append([sort_key(isbn, book_data), isbn, book_data])
+					preimages_seen = len(preimages)
+
+					batch = index.entries_after(cursor[0] if cursor != None else None, cursor[1] if cursor != None else None, batch_size)
+					rows = []
+					for key, isbn in batch:
+						if not snapshot.changed(isbn):
+							book_data = self.data[isbn]
+							rows.append([key, isbn, [isbn, book_data["title"], book_data["type"], book_data["quantity"]]])
+
+				# changed books up to the end of this batch go in between
+				done = len(batch) < batch_size
+				limit = batch[-1] if len(batch) > 0 else None
+				remaining = []
+				for key, isbn, book_data in pending:
+					if (done or [key, isbn] <= limit):
+						rows.append([key, isbn, [isbn, book_data["title"], book_data["type"], book_data["quantity"]]])
+					else:
+						remaining.append([key, isbn, book_data])
+				pending = remaining
 
-			# assign attributes
-			book_data["title"] = title
-			book_data["quantity"] = quantity
-			book_data["type"] = book_type
+				rows.sort(key=lambda row: row[:2])
+				for row in rows:
+					yield row[2]
 
-			# success
-			return True
+				if done:
+					break
+				cursor = limit
+		finally:
+			snapshot.close()
+
+	def export_loans(self, username=None, batch_size=1000):
+		# yields [username, isbn, loan_timestamp, duration, return_timestamp?] of every loan, as the loans were when called
+		# archived history first (oldest segment first), then every user's returned and active (return_timestamp None) loans
+		# username: str? (only the loans of username)
+		with self.lock, database_engine.transaction(self.users):
+			# segments written by other terminals are listed together with the loans they took out of users.json
+			self.apply_remote_changes()
+			segments = self.archive.refresh() # later segments only hold entries still in the snapshot
+			snapshot = self.users.open_snapshot()
+			usernames = [username] if username != None else list(self.users) # names only, records are read batch by batch
+		try:
+			for entry in self.archive.entries(username, segments):
+				yield entry
+
+			for batch in chunked(usernames, batch_size):
+				rows = []
+				with self.lock, self.users.lock:
+					for name in batch:
+						user_data = snapshot.get(name)
+						if (user_data == None):
+							continue
+						for loan_entry in user_data["loaned_books"]:
+							rows.append([name] +list(loan_entry))
+						for loan_entry in user_data["loaning"]:
+							rows.append([name] +list(loan_entry) +[None])
+
+				for row in rows:
+					yield row
+		finally:
+			snapshot.close()
+
+	def export(self, kind, filepath, fmt=None, order="title", username=None):
+		# kind: "books"|"loans", streams export_books() or export_loans() into filepath (csv or jsonl)
+		# returns the number of rows written
+		if (kind == "books"):
+			return write_rows(filepath, BOOK_FIELDS, self.export_books(order), fmt)
+		return write_rows(filepath, LOAN_FIELDS, self.export_loans(username), fmt)
 
 	def search_book(self, search_params):
 		# search_params: {query: str?, type: integer?, size: integer?, search_by_isbn: boolean?}
-		# returns sorted array based on search_params (sorted based on relevance) of size n (defined in search_params.size or by default 10)
+		# returns SearchResults (pages sorted based on relevance) of size n (defined in search_params.size or by default 10)
 		# defaults search to by title of books
 		interested = []; # build a list of interested search candidates to search
 
@@ -369,33 +936,180 @@ class LibraryData:
 		queryStr = search_params.get("query")
 		typeFilter = search_params.get("type")
 		searchISBN = search_params.get("search_by_isbn", False)
+		entries_per_page = search_params.get("size", 10)
+
+		# repeated queries are served from the cache as long as the catalogue has not changed
+		cache_key = (queryStr, typeFilter, searchISBN, entries_per_page)
+		cached = self.search_cache.get(cache_key, self.version)
+		if (cached != None):
+			return cached
 
 		ld_threshold = 100 # levenshtein threshold (i.e. any distance greater than this value is not a candidate of interest)
 		search_target = self.sorted_isbn if searchISBN else self.sorted_title # this matters since we want items to appear in alphabetical order
-		for isbn_code in search_target:
-			# compare levenshtein distances with white spaces removed
-			if (queryStr != None):
-				# has query string (title to query)
-				ld = UtilCLI.levenshtein_distance(isbn_code if searchISBN else self.data[isbn_code]["title"], queryStr)
+		if (queryStr != None and not searchISBN):
+			# narrow down title search to the candidates sharing the most trigrams with the query
+			candidates = self.search_index.candidates(queryStr, self.search_candidates)
+			if (len(candidates) > 0):
+				# keep alphabetical order for candidates of equal distance
+				candidates.sort(key=lambda isbn_code: UtilCLI.collation_key(self.data[isbn_code]["title"]))
+				search_target = candidates
+			# else: no trigram shared with any title (e.g. empty query), fall back to a full scan
+
+		if (queryStr != None):
+			# has query string (title to query), score every target at once (vectorized when numpy is available)
+			distances = UtilCLI.levenshtein_batch(queryStr, search_target if searchISBN else [self.data[isbn_code]["title"] for isbn_code in search_target], ld_threshold -1)
+
+			for idx in range(len(search_target)):
+				isbn_code, ld = search_target[idx], distances[idx]
 				if (ld < ld_threshold):
 					# interest candidate (title match)
 
 					# filter out candidates
 					if ((typeFilter != None and self.data[isbn_code]["type"] == typeFilter) or (typeFilter == None)):
 						# passes filter OR no filter at all
-						interested.append([isbn_code, ld])
+						interested.append([ld, idx, isbn_code]) # idx keeps alphabetical order between equal distances
 
-		# sort interested candidates based on their relevance factor (levenshtein distance)
-		UtilCLI.bubble_sort(interested, lambda a, b: 1 if a[1] > b[1] else (3 if a[1] == b[1] else 2))
+		# ranked lazily by relevance factor (levenshtein distance), one page at a time
+		results = SearchResults(interested, entries_per_page)
+		self.search_cache.put(cache_key, self.version, results)
+		return results
 
-		# returns (iterators not ideal here since it can not traverse backwards)
-		page_container = []
-		entries_per_page = search_params.get("size", 10)
-		candidate_n = len(interested)
-		for page_no in range(candidate_n //entries_per_page +1):
-			page_container.append(interested[(page_no) *entries_per_page: min((page_no +1) *entries_per_page +1, candidate_n)])
+class RemoteLibrary:
+	# stands in for LibraryData in a terminal connected to a library server, every operation is one request
+	# the server owns the indexes (kept warm across terminals), so nothing is built here
+	BOOK_TYPE = LibraryData.BOOK_TYPE
+
+	def __init__(self, client):
+		self.client = client
+		self.data = database_engine.created_readers["isbn"]
+		self.users = database_engine.created_readers["users"]
+		self.BOOK_TYPE_MAPPED = sorted(self.BOOK_TYPE, key=self.BOOK_TYPE.get)
+
+		self.sorted_isbn = RemoteSequence(client, "sorted_isbn")
+		self.sorted_title = RemoteSequence(client, "sorted_title")
+		self.borrowers = RemoteObject(client, "borrowers")
+		self.due_index = RemoteObject(client, "due_index")
+
+	@property
+	def total_entries(self):
+		return self.client.call("total_entries")
+
+	def process_data(self):
+		pass # indexes are built by the server
 
-		return page_container
+	def refresh(self):
+		pass
+
+	def apply_remote_changes(self):
+		pass # the server applies them
+
+	def find_isbn(self, isbn):
+		return self.client.call("find_isbn", isbn)
+
+	def duplicate_isbn(self, isbn):
+		return self.find_isbn(isbn) != None
+
+	def search_book(self, search_params):
+		return RemotePages(self.client, "search_page", search_params)
+
+	def add_book(self, book_data):
+		return self.client.call("add_book", book_data)
+
+	def delete_book(self, isbn):
+		return self.client.call("delete_book", isbn)
+
+	def loan_book(self, username, isbn, duration):
+		return self.client.call("loan_book", username, isbn, duration)
+
+	def return_book(self, username, isbn):
+		return self.client.call("return_book", username, isbn)
+
+	def update_book(self, isbn, payload):
+		return self.client.call("update_book", isbn, payload)
+
+	def archive_loans(self, max_age=None):
+		return self.client.call("archive_loans", max_age)
+
+	def import_books(self, filepath, fmt=None, chunk_size=10000):
+		# the server reads the file itself
+		return self.client.call("import_books", path.abspath(filepath), fmt, chunk_size)
+
+	def export(self, kind, filepath, fmt=None, order="title", username=None):
+		# the server writes the file itself
+		return self.client.call("export", kind, path.abspath(filepath), fmt, order, username)
+
+	def loan_history(self, username):
+		return self.client.call("loan_history", username)
+
+	def user_due_before(self, username, timestamp):
+		return self.client.call("user_due_before", username, timestamp)
+
+def serve(socket_path=LIBRARY_SOCKET):
+	# runs the library server until interrupted (python . serve)
+	library = LibraryData()
+	library.process_data()
+	library.process_loans()
+	readers = {"isbn": library.data, "users": library.users}
+
+	def set_user(name, key, value):
+		# only user records are written directly (create_user(), change_password()), books go through LibraryData
+		if (name != "users"):
+			raise PermissionError("{} can not be written directly".format(name))
+		readers[name][key] = value
+
+	def set_user_field(name, key, field, value):
+		if (name != "users"):
+			raise PermissionError("{} can not be written directly".format(name))
+		readers[name][key][field] = value
+
+	def search_page(search_params, page_idx):
+		# results are cached by the server (LibraryData.search_cache), so fetching the next page does not search again
+		results = library.search_book(search_params)
+		return [len(results), results[page_idx]]
+
+	indexes = {"sorted_isbn": lambda: library.sorted_isbn, "sorted_title": lambda: library.sorted_title}
+	handlers = {
+		"get": lambda name, key: readers[name].get(key),
+		"contains": lambda name, key: key in readers[name],
+		"len": lambda name: len(readers[name]),
+		"set": set_user,
+		"set_field": set_user_field,
+		"index_len": lambda name: len(indexes[name]()),
+		"index_slice": lambda name, start, end: indexes[name]()[start: end],
+		"total_entries": lambda: library.total_entries,
+		"search_page": search_page,
+		"find_isbn": library.find_isbn,
+		"add_book": library.add_book,
+		"delete_book": library.delete_book,
+		"loan_book": library.loan_book,
+		"return_book": library.return_book,
+		"update_book": library.update_book,
+		"archive_loans": library.archive_loans,
+		"import_books": library.import_books,
+		"export": library.export,
+		"loan_history": lambda username: list(library.loan_history(username)),
+		"user_due_before": library.user_due_before,
+		"borrowers.has_references": lambda isbn: library.borrowers.has_references(isbn),
+		"due_index.due_before": lambda timestamp: library.due_index.due_before(timestamp)
+	}
+	writes = ["set", "set_field", "add_book", "delete_book", "loan_book", "return_book", "update_book", "archive_loans", "import_books"]
+
+	def prepare():
+		# shared mode, another standalone terminal may have written too
+		database_engine.sync()
+		library.apply_remote_changes()
+
+	# exports take the library lock one batch at a time, other clients are served in between
+	server = LibraryServer(socket_path, handlers, writes, prepare, database_engine.flush, lock=library.lock, unlocked=["export"])
+	print("Library server listening on {} ({} books).".format(socket_path, library.total_entries))
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		database_engine.stop() # anything left unsaved
+		print("Library server stopped after {} requests.".format(server.requests))
 
 class AuthManager:
 	USER_ACCESS_LEVEL = ["User", "Librarian", "Administrator", "Root"]
@@ -471,6 +1185,9 @@ class AuthManager:
 			# not match
 			return False
 
+# draws every Screen, keeps the frame on the terminal so the next screen only redraws what changed
+renderer = FrameRenderer()
+
 class Screen:
 	def __init__(self, header):
 		self.content = header # content will be built here
@@ -480,10 +1197,13 @@ class Screen:
 		self.content += str(content)
 
 	def out(self, reuse=False):
-		# clear screen first
+		# replaces the previous screen, only the changed lines are redrawn on a terminal (see FrameRenderer)
 		# reuse: boolean (if false, will throw away reference to self.content)
-		UtilCLI.clear();
-		print(self.content);
+		if renderer.active():
+			renderer.render(self.content)
+		else:
+			UtilCLI.clear();
+			print(self.content);
 
 		if not reuse:
 			# remove reference from self.content
@@ -494,7 +1214,7 @@ class LibCLI:
 	def __init__(self):
 		# objects
 		self.authManager = AuthManager()
-		self.libraryManager = LibraryData() # initiated class
+		self.libraryManager = LibraryData() if library_client == None else RemoteLibrary(library_client) # initiated class
 
 		# states
 		self.active = True
@@ -508,7 +1228,15 @@ class LibCLI:
 		# user data
 		self.overdue_loans = [] # stores isbn of books overdue
 
+		# commands (by access level) and update book interface actions, built once
+		self.commands = self.build_commands()
+		self.update_actions = CommandRegistry(UtilCLI.levenshtein_distance)
+		self.update_actions.register("help")
+		for action in ("title", "quantity", "type", "save"):
+			self.update_actions.register(action, help=help_messages.update_book[action])
+
 		# do some preprocessing on the book database (isbn.json)
+		# loan indexes (users.json) are built on first use, see LibraryData.borrowers
 		self.libraryManager.process_data();
 
 	def create_new_screen(self):
@@ -603,14 +1331,9 @@ class LibCLI:
 		screen.build("\n\n\n\nWelcome to The Library\nWhere knowledge overflows.\n\nType 'help' for help message.")
 
 		# check for loan book status
-		user_data = database_engine.created_readers["users"][username]
-		overdue_loans_n = 0
 		now = time.time() # seconds (unix epoch) in UTC
-		for loan_data in user_data["loaning"]:
-			if (loan_data[1] +loan_data[2]) <= now:
-				# overdued book
-				overdue_loans_n += 1
-				self.overdue_loans.append(loan_data[0])
+		self.overdue_loans = self.libraryManager.user_due_before(username, now)
+		overdue_loans_n = len(self.overdue_loans)
 
 		if (overdue_loans_n > 0):
 			screen.build("You have \033[31m{}\033[0m loans overdue, please return them promptly by calling 'return'.\n".format(overdue_loans_n))
@@ -633,9 +1356,8 @@ class LibCLI:
 		2. output goodbye message
 		"""
 
-		# push all saves
-		database_engine.created_readers["isbn"].push()
-		database_engine.created_readers["users"].push()
+		# stop autosaving and push all remaining saves (readers without changes are skipped)
+		database_engine.stop()
 
 		# time out
 		self.session_end = time.perf_counter()
@@ -828,25 +1550,8 @@ class LibCLI:
 		del_screen.out()
 
 		if not ("f" in flags):
-			# show consequences (people loaning books etc)
-			# global search (may take some time)
-			red_flag = False # will be set to True if exists in loan entries
-			for username in database_engine.created_readers["users"]:
-				user_data = database_engine.created_readers["users"][username]
-				for loan_entry in user_data["loaning"]:
-					if (loan_entry[0] == isbn):
-						red_flag = True
-						break
-
-				if not red_flag:
-					for loan_entry in user_data["loaned_books"]:
-						if (loan_entry[0] == isbn):
-							red_flag = True
-							break
-
-				if red_flag:
-					break
-
+			# show consequences (people loaning books etc), looked up from the borrower index
+			red_flag = self.libraryManager.borrowers.has_references(isbn)
 			if red_flag: print("\033[33m[WARN]: There are users with books loaned tied to the ISBN value, removing it will remove it from their loan entries and history.\033[0m")
 
 		confirmation = input("Delete (y/n): ").lower()
@@ -859,6 +1564,44 @@ class LibCLI:
 		else:
 			print("[UNSUCCESSFUL]: Book entry was not removed.\n\n")
 
+	def convert_interface(self, args={}):
+		# exports the stores to, or imports them from, the other snapshot format (database/<name>.json or database/<name>.bin)
+		export_fmt, import_fmt = args.get("export"), args.get("import")
+		fmt = export_fmt if export_fmt != None else import_fmt
+		if ((export_fmt == None) == (import_fmt == None) or not (fmt in ("json", "binary"))):
+			print("[ERROR]: specify either export=json|binary or import=json|binary.")
+			return False
+
+		extension = ".json" if fmt == "json" else ".bin"
+		readers = [self.libraryManager.data, self.libraryManager.users]
+		for reader in readers:
+			if not hasattr(reader, "import_from"):
+				print("[ERROR]: {} does not support snapshot conversion.".format(reader))
+				return False
+
+		screen = self.create_new_screen()
+		for reader in readers:
+			filepath = path.join(reader.directory, reader.hash +extension)
+			if (export_fmt != None):
+				written = reader.export(filepath, fmt)
+				screen.build("\nExported {} entries to {} ({:.1f}KB).".format(len(reader.content), filepath, written /1024))
+			elif not path.exists(filepath):
+				print("[ERROR]: {} does not exist.".format(filepath))
+				return False
+			elif (filepath == reader.filepath):
+				print("[ERROR]: {} is already the snapshot in use.".format(filepath))
+				return False
+			else:
+				reader.import_from(filepath)
+				screen.build("\nImported {} entries from {}.".format(len(reader.content), filepath))
+
+		if (import_fmt != None):
+			self.libraryManager.refresh()
+
+		screen.build("\n\n\n")
+		screen.out()
+		return True
+
 	def update_book_interface(self, isbn):
 		# new screen
 		edit_screen = self.create_new_screen()
@@ -870,11 +1613,8 @@ class LibCLI:
 		# construct the change payload (to be sent to self.libraryManager.update_book())
 		payload = {}
 
-		# action list
-		action_list = ["help", "title", "quantity", "type", "save"]
-
 		# construct history to rebuild screen afterwards
-		action_hist = [] # elements: [action_code, trigger, input, output_msg]
+		action_hist = [] # elements: [action_name, trigger, input, output_msg]
 
 		supplying_changes = True
 		while supplying_changes:
@@ -891,16 +1631,16 @@ class LibCLI:
 				# exit
 				return
 
-			mapped_action = UtilCLI.get_command(action, action_list)
-			if mapped_action[0]:
+			mapped_action = self.update_actions.lookup(action)
+			if (mapped_action != None):
 				# switch statement :(
 				input_value = "" # for history management
 				output_msg = ""
-				if mapped_action[1] == 0:
+				if mapped_action.name == "help":
 					# help statement
-					output_msg = help_messages.update_book
+					output_msg = self.update_actions.help_text(0, "{:<9} | {}\n", "")
 					pass
-				elif mapped_action[1] == 1:
+				elif mapped_action.name == "title":
 					# change title
 					title = input("New title: ")
 					if (title == ""):
@@ -910,7 +1650,7 @@ class LibCLI:
 						input_value = title
 						output_msg = "[SUCCESS]: Title changed to '{}'.".format(title)
 						payload["title"] = title
-				elif mapped_action[1] == 2:
+				elif mapped_action.name == "quantity":
 					# change quantity
 					qty = input("Quantity: ")
 					if not (qty.isdigit()):
@@ -920,8 +1660,8 @@ class LibCLI:
 						input_value = qty
 						output_msg = "[SUCCESS]: Quantity changed to {}.".format(qty)
 						payload["quantity"] = int(qty)
-				elif mapped_action[1] == 3:
-					# change type (idx of 3)
+				elif mapped_action.name == "type":
+					# change type
 					book_type = input("Type\n{}: ".format(self.getBookTypeOptionsRepr()))
 					if not (book_type.isdigit()) or int(book_type) <= 0 or int(book_type) >= 4:
 						# input is not an integer within the range 1 <= x <= 3
@@ -930,7 +1670,7 @@ class LibCLI:
 						input_value = book_type
 						output_msg = "[SUCCESS]: Book type changed to {}.".format(book_type)
 						payload["type"] = int(book_type)
-				elif mapped_action[1] == 4:
+				elif mapped_action.name == "save":
 					# save changes
 
 					# confirmation
@@ -974,16 +1714,16 @@ class LibCLI:
 						for hist_data in action_hist:
 							edit_screen.build("Action: {}\n".format(hist_data[1]))
 							follow_up_inpt = "{}"
-							if (hist_data[0] == 0):
+							if (hist_data[0] == "help"):
 								# help, do nothing
 								pass
-							elif (hist_data[0] == 1):
+							elif (hist_data[0] == "title"):
 								# change title
 								follow_up_inpt = "New title: {}\n"
-							elif (hist_data[0] == 2):
+							elif (hist_data[0] == "quantity"):
 								# change quantity
 								follow_up_inpt = "Quantity: {}\n"
-							elif (hist_data[0] == 3):
+							elif (hist_data[0] == "type"):
 								# change type
 								follow_up_inpt = "Type\n{}: {{}}\n".format(self.getBookTypeOptionsRepr())
 							edit_screen.build(follow_up_inpt.format(hist_data[2]))
@@ -995,12 +1735,13 @@ class LibCLI:
 				print(output_msg)
 
 				# build history
-				action_hist.append([mapped_action[1], action, input_value, output_msg])
+				action_hist.append([mapped_action.name, action, input_value, output_msg])
 			else:
 				# failed to map input to a known command
-				if (mapped_action[1]):
+				suggestion = self.update_actions.suggest(action)
+				if (suggestion != None):
 					# suggestion given
-					print("[WARN]: No command found for '{}', did you mean '{}'.".format(action, mapped_action[1]))
+					print("[WARN]: No command found for '{}', did you mean '{}'.".format(action, suggestion))
 				else:
 					# no suggestion given
 					print("[WARN]: No command found for '{}'.".format(action))
@@ -1232,9 +1973,9 @@ class LibCLI:
 					elif (selection.isdigit()):
 						# can only be a positive integer
 						selection_idx = int(selection) -1
-						if (selection_idx < 0 or selection_idx >= entries_limit):
-							# out of range error
-							prev_error = "[WARN]: Selection out of range, please select between 1-{} (inclusive).\n".format(entries_limit)
+						if (selection_idx < 0 or selection_idx >= search_results_n):
+							# out of range error (last page may hold less than entries_limit entries)
+							prev_error = "[WARN]: Selection out of range, please select between 1-{} (inclusive).\n".format(search_results_n)
 						else:
 							# valid selection, return isbn
 							return search_results[selection_idx][0] # return the isbn
@@ -1264,10 +2005,12 @@ class LibCLI:
 
 		# show list of books to return
 		loan_idx = 0
+		shown = [] # isbn of every listed loan, the selection is returned by isbn (the loans may change meanwhile)
 		for loan_entry in user_data["loaning"]:
 			# mark over due with red
 			# mark near due date (<= 1 day left) with orange
 			loan_idx += 1
+			shown.append(loan_entry[0])
 
 			# calculate loan return date
 			loan_return_timestamp = loan_entry[1] +loan_entry[2]
@@ -1307,17 +2050,16 @@ class LibCLI:
 					# valid selection, process loan
 					selection_value -= 1 # revert to zero-based indexing
 
-					# move data entry to user_data["loaned_books"]
-					loan_entry = user_data["loaning"].pop(selection_value)
-					user_data["loaned_books"].append(loan_entry +[time.time()]) # append an extra element (return timestamp)
-
-					# update database
-					self.libraryManager.data[loan_entry[0]]["quantity"] += 1
+					# move data entry to user_data["loaned_books"], restock book
+					loan_entry, error_msg = self.libraryManager.return_book(self.username, shown[selection_value])
+					if (loan_entry == None):
+						print("[ERROR]: {}".format(error_msg))
+						time.sleep(2)
+						return self.loan_return_interface() # list the current loans again
 
 					# if overdue, remove it
-					for overdue_idx in len(self.overdue_loans):
-						if (self.overdue_loans[overdue_idx] == loan_entry[0]):
-							self.overdue_loans.pop(overdue_idx)
+					if (loan_entry[0] in self.overdue_loans):
+						self.overdue_loans.remove(loan_entry[0])
 
 					# output message
 					print("[SUCCESS]: Returned book '{}'".format(self.libraryManager.data[loan_entry[0]]["title"]))
@@ -1340,317 +2082,431 @@ class LibCLI:
 		loan_screen = self.create_new_screen()
 		loan_screen.build("\n\nLoaning [{}] '{}' ♪(^∇^*)\n\n".format(isbn, self.libraryManager.data[isbn]["title"]))
 
-		# dont grant loan if there are overdue books
-		user_data = database_engine.created_readers["users"][self.username]
-		if (len(self.overdue_loans) > 0):
+		book_data = self.libraryManager.data[isbn]
+		loan_dur_day = 2 # loan it for exactly 48 hours
+		loan_dur_sec = loan_dur_day *86400
+
+		# loan logic, checks overdue loans, the 5 loans cap, duplicate loans and stock before decrementing the stock count
+		# (done by LibraryData.loan_book() in one step, by the server in server mode)
+		loan_entry, error_msg = self.libraryManager.loan_book(self.username, isbn, loan_dur_sec)
+		if (loan_entry == None):
 			# cannot loan
-			loan_screen.build("[ERROR]: Unable to loan books, please return your overdue loans by calling 'return'.")
+			loan_screen.build("[ERROR]: {}".format(error_msg))
 
 			# out screen
 			loan_screen.out()
 			return
 
-		# maximum loan a user can have is 5 books
-		if (len(user_data["loaning"]) >= 5):
-			# cannot loan
-			loan_screen.build("[ERROR]: Unable to loan books as you have reached the maximum capacity of 5 loans, please return some of the loaned books by calling 'return'.")
+		loan_return_local_timestamp = time.localtime(loan_entry[1] +loan_entry[2])
 
-			# out screen
-			loan_screen.out()
-			return
+		# build screen
+		loan_screen.build("\n\n\nLoaned '{}'.\nDuration: {}day(s)\n".format(book_data["title"], loan_dur_day))
+		loan_screen.build("Return on: {}\n\n".format(time.strftime("%d %b %Y %H:%M", loan_return_local_timestamp)))
 
-		# check if there are any existing entries in user's currently loaned book
-		for loan_data in user_data["loaning"]:
-			if (loan_data[0] == isbn):
-				# cannot loan
-				loan_screen.build("[ERROR]: Unable to loan books as you have already loaned this book.")
+		# out screen
+		loan_screen.out();
 
-				# out screen
-				loan_screen.out()
-				return
+	def history_interface(self, args={}):
+		# lists the last n returned loans of the logged in user (archived history included)
+		n = args.get("n", 20)
+		if (type(n) == str and (not n.isdigit() or n[0] == "0")):
+			print("[ERROR]: n field must be a positive non-zero integer")
+			return False
+		n = int(n)
+
+		# stream the whole history, only the last n entries are held
+		total = 0
+		recent = collections.deque(maxlen=n)
+		for entry in self.libraryManager.loan_history(self.username):
+			recent.append(entry)
+			total += 1
+
+		history_screen = self.create_new_screen()
+		history_screen.build("\n\nLoan history [last {} out of {} loans].\n".format(len(recent), total))
+		idx = total -len(recent)
+		for isbn_code, loan_timestamp, duration, return_timestamp in recent:
+			idx += 1
+			history_screen.build(" {}. {} [{}] '{}'\n".format(idx, time.strftime("%d %b %Y %H:%M", time.localtime(return_timestamp)), isbn_code, self.libraryManager.data[isbn_code]["title"]))
 
-		# check if there are copies left in the library
-		book_data = self.libraryManager.data[isbn]
-		if (book_data["quantity"] <= 0):
-			# no quantities left, cannot loan
-			loan_screen.build("[ERROR]: Unable to loan books as the library currently have no more copies available, sorry!")
+		# vertical padding
+		history_screen.build("\n\n")
+		history_screen.out()
+		return True
 
-			# out screen
-			loan_screen.out();
-			return
-		else:
-			# decrement stock count
-			book_data["quantity"] -= 1
+	def import_interface(self, args={}):
+		# bulk adds the books of a csv or jsonl file
+		filepath, fmt = args.get("file"), args.get("format")
+		if (filepath == None):
+			print("[ERROR]: specify the file to import, file=path.")
+			return False
+		elif not path.isfile(filepath):
+			print("[ERROR]: {} does not exist.".format(filepath))
+			return False
+		elif not (fmt in (None, "csv", "jsonl")):
+			print("[ERROR]: format field must be csv or jsonl.")
+			return False
 
-		loan_dur_day = 2 # loan it for exactly 48 hours
-		loan_dur_sec = loan_dur_day *86400
+		start = time.perf_counter()
+		try:
+			imported, errors = self.libraryManager.import_books(filepath, fmt)
+		except ValueError as e:
+			print("[ERROR]: {}".format(e))
+			return False
+		duration = time.perf_counter() -start
 
-		loan_timestamp = time.time() # seconds, unix epoch (UTC)
-		loan_return_timestamp = time.time() +loan_dur_sec # seconds
-		loan_return_local_timestamp = time.localtime(loan_return_timestamp)
+		import_screen = self.create_new_screen()
+		import_screen.build("\n\nImported {} books from {} in {:.2f}s.\n".format(imported, filepath, duration))
+		if (len(errors) > 0):
+			import_screen.build("\n\033[33m{} rows skipped\033[0m\n".format(len(errors)))
+			for row_number, message in errors[:20]:
+				import_screen.build(" row {}: {}\n".format(row_number, message))
+			if (len(errors) > 20):
+				import_screen.build(" ... and {} more\n".format(len(errors) -20))
 
-		# loan logic
-		user_data["loaning"].append([isbn, loan_timestamp, loan_dur_sec])
+		# vertical padding
+		import_screen.build("\n\n")
+		import_screen.out()
+		return True
 
-		# build screen
-		loan_screen.build("\n\n\nLoaned '{}'.\nDuration: {}day(s)\n".format(book_data["title"], loan_dur_day))
-		loan_screen.build("Return on: {}\n\n".format(time.strftime("%d %b %Y %H:%M", loan_return_local_timestamp)))
+	def export_interface(self, args={}):
+		# streams the catalogue or the loan history into a csv or jsonl file
+		kind, filepath, fmt, order, username = args.get("data", "books"), args.get("file"), args.get("format"), args.get("order", "title"), args.get("user")
+		if (filepath == None):
+			print("[ERROR]: specify the file to export to, file=path.")
+			return False
+		elif not (kind in ("books", "loans")):
+			print("[ERROR]: data field must be books or loans.")
+			return False
+		elif (kind == "loans" and self.access_level < 2):
+			# every user's loans
+			print("[ERROR]: Permissions denied.")
+			return False
+		elif not (order in ("title", "isbn")):
+			print("[ERROR]: order field must be title or isbn.")
+			return False
+		elif not (fmt in (None, "csv", "jsonl")):
+			print("[ERROR]: format field must be csv or jsonl.")
+			return False
+		elif (username != None and not (username in self.libraryManager.users)):
+			print("[ERROR]: No user found for username, {}.".format(username))
+			return False
 
-		# out screen
-		loan_screen.out();
+		start = time.perf_counter()
+		try:
+			count = self.libraryManager.export(kind, filepath, fmt, order, username)
+		except (ValueError, OSError) as e:
+			print("[ERROR]: {}".format(e))
+			return False
 
-	def kernel(self, command, args={}, flags=[]):
-		# executes the actual command
-		if (command == "help"):
-			output_help_msg = help_messages.user_home
-			if (self.access_level >= 1):
-				output_help_msg += help_messages.librarian_home
-			if (self.access_level >= 2):
-				output_help_msg += help_messages.administrator_home
-			if (self.access_level >= 3):
-				output_help_msg += help_messages.root_home
-
-			# output
-			print(output_help_msg)
+		print("[SUCCESS]: Exported {} {} to {} in {:.2f}s.\n".format(count, "books" if kind == "books" else "loans", filepath, time.perf_counter() -start))
+		return True
+
+	def archive_interface(self, args={}):
+		# moves loan history older than age days (default LoanArchive.max_age) into the archive
+		age = args.get("age")
+		if (age != None and (not age.isdigit() or age[0] == "0")):
+			print("[ERROR]: age field must be a positive non-zero integer (days)")
+			return False
+
+		moved = self.libraryManager.archive_loans(int(age) *86400 if age != None else None)
+		print("[SUCCESS]: Archived {} loan history entries.\n".format(moved))
+		return True
+
+	def overdue_interface(self):
+		# library-wide report of overdue loans and loans falling due within the next 24 hours
+		timestamp_now = time.time() # seconds, unix epoch UTC
+
+		report_screen = self.create_new_screen()
+		report_screen.build("\n\nLoans report.\n")
+
+		# single query up to 24h from now, split on the current time
+		due_entries = self.libraryManager.due_index.due_before(timestamp_now +86400)
+		overdue_entries = [entry for entry in due_entries if entry[0] <= timestamp_now]
+		due_soon_entries = [entry for entry in due_entries if entry[0] > timestamp_now]
+
+		report_screen.build("\n\033[31m{} loans overdue\033[0m\n".format(len(overdue_entries)))
+		for idx in range(len(overdue_entries)):
+			due, username, isbn_code = overdue_entries[idx]
+			report_screen.build(" {}. {} {} [{}] '{}'\n".format(idx +1, time.strftime("%d %b %Y %H:%M", time.localtime(due)), username, isbn_code, self.libraryManager.data[isbn_code]["title"]))
 
+		report_screen.build("\n\033[33m{} loans due within 24 hours\033[0m\n".format(len(due_soon_entries)))
+		for idx in range(len(due_soon_entries)):
+			due, username, isbn_code = due_soon_entries[idx]
+			report_screen.build(" {}. {} {} [{}] '{}'\n".format(idx +1, time.strftime("%d %b %Y %H:%M", time.localtime(due)), username, isbn_code, self.libraryManager.data[isbn_code]["title"]))
+
+		# vertical padding
+		report_screen.build("\n\n")
+		report_screen.out()
+
+	def build_commands(self):
+		# command registry by access level (0 user, 1 librarian, 2 administrator, 3 root), see kernel()
+		# handlers take (args, flags), help text is taken from help_messages.commands
+		commands = CommandRegistry(UtilCLI.levenshtein_distance, len(AuthManager.USER_ACCESS_LEVEL))
+		help_text = help_messages.commands
+
+		# regular users
+		commands.register("help", self.help_command, 0, help_text["help"])
+		commands.register("loan", self.loan_command, 0, help_text["loan"])
+		commands.register("return", lambda args, flags: self.loan_return_interface(), 0, help_text["return"])
+		commands.register("browse", self.browse_interface, 0, help_text["browse"])
+		commands.register("search", self.search_interface, 0, help_text["search"])
+		commands.register("cpw", lambda args, flags: self.change_password(), 0, help_text["cpw"])
+		commands.register("history", lambda args, flags: self.history_interface(args), 0, help_text["history"])
+		commands.register("logout", lambda args, flags: self.logout_handler(), 0, help_text["logout"], aliases=["exit"]) # will call exit()
+
+		# librarians, administrators and root users
+		commands.register("update", self.update_command, 1, help_text["update"])
+		commands.register("overdue", lambda args, flags: self.overdue_interface(), 1, help_text["overdue"])
+		commands.register("add", self.add_command, 1, help_text["add"])
+		commands.register("import", lambda args, flags: self.import_interface(args), 1, help_text["import"])
+		commands.register("export", lambda args, flags: self.export_interface(args), 1, help_text["export"])
+
+		# administrators, root users
+		commands.register("create", lambda args, flags: self.create_user(), 2, help_text["create"])
+		commands.register("archive", lambda args, flags: self.archive_interface(args), 2, help_text["archive"])
+
+		# root users ONLY (highest)
+		commands.register("delete", self.delete_command, 3, help_text["delete"])
+		commands.register("convert", lambda args, flags: self.convert_interface(args), 3, help_text["convert"])
+
+		return commands
+
+	def help_command(self, args={}, flags=[]):
+		# help text of every command available to the user
+		print(self.commands.help_text(self.access_level))
+
+	def loan_command(self, args={}, flags=[]):
+		isbn = self.search_interface(args, flags)
+		if isbn == None:
+			# exit (home screen already out)
+			print("Update failed [no search performed].")
 			return
 
-		if (self.access_level >= 0):
-			# open up command space for regular users
-			if (command == "loan"):
-				isbn = self.search_interface(args, flags)
-				if isbn == None:
-					# exit (home screen already out)
-					print("Update failed [no search performed].")
-					return
+		return self.loan_interface(isbn);
 
-				return self.loan_interface(isbn);
-			elif (command == "return"):
-				return self.loan_return_interface()
-			elif (command == "browse"):
-				return self.browse_interface(args, flags)
-			elif (command == "search"):
-				isbn = self.search_interface(args, flags)
-				return isbn
-			elif (command == "cpw"):
-				return self.change_password()
-			elif (command == "logout" or command == "exit"):
-				self.logout_handler(); # will call exit()
-		if (self.access_level >= 1):
-			# librarians, administrators and root users
-			if (command == "update"):
-				isbn = self.search_interface(args, flags)
-				if isbn == None:
-					# exit (home screen already out)
-					print("Update failed [no search performed].")
-					return
+	def update_command(self, args={}, flags=[]):
+		isbn = self.search_interface(args, flags)
+		if isbn == None:
+			# exit (home screen already out)
+			print("Update failed [no search performed].")
+			return
 
-				return self.update_book_interface(isbn)
-			elif (command == "add"):
-				book_data = {
-					"isbn": args.get("isbn"),
-					"title": args.get("title"),
-					"quantity": args.get("quantity"),
-					"type": args.get("type")
-				}
+		return self.update_book_interface(isbn)
 
-				try:
-					# ask for all the book details in sequence, use data provided in args as default
-					print("Data required for book entry.")
+	def delete_command(self, args={}, flags=[]):
+		isbn = self.search_interface(args, flags)
+		if isbn == None:
+			# exit (home screen already out)
+			print("Delete failed [no search performed].")
+			return
 
-					# isbn code
-					if (book_data["isbn"] != None and LibraryData.validate_isbn(book_data["isbn"]) and not self.libraryManager.duplicate_isbn(book_data["isbn"])):
-						# has default data (valid isbn)
-						isbn_inpt = input("ISBN ({}): ".format(book_data["isbn"]))
+		return self.delete_book_interface(isbn, args, flags)
 
-						if (isbn_inpt == ""):
-							# empty input, use default
-							pass
-						else:
-							# value keyed in, overwrite arguments
-							book_data["isbn"] = isbn_inpt
+	def add_command(self, args={}, flags=[]):
+		book_data = {
+			"isbn": args.get("isbn"),
+			"title": args.get("title"),
+			"quantity": args.get("quantity"),
+			"type": args.get("type")
+		}
+
+		try:
+			# ask for all the book details in sequence, use data provided in args as default
+			print("Data required for book entry.")
+
+			# isbn code
+			if (book_data["isbn"] != None and LibraryData.validate_isbn(book_data["isbn"]) and not self.libraryManager.duplicate_isbn(book_data["isbn"])):
+				# has default data (valid isbn)
+				isbn_inpt = input("ISBN ({}): ".format(book_data["isbn"]))
+
+				if (isbn_inpt == ""):
+					# empty input, use default
+					pass
+				else:
+					# value keyed in, overwrite arguments
+					book_data["isbn"] = isbn_inpt
+			else:
+				# no default data can be used
+				if (book_data["isbn"] != None):
+					# invalid isbn, warn user
+					print("[WARN]: ISBN code may be a duplicate or may have been provided in the wrong format, please ensure the checkdigit is correct.")
+
+				isbn_inpt = "";
+				while True:
+					# input required
+					isbn_inpt = input("ISBN (-1 to exit): ")
+					if (isbn_inpt == "-1"):
+						break
+					elif not LibraryData.validate_isbn(isbn_inpt):
+						print("[WARN]: {} is not a valid isbn, please ensure the checkdigit is correct.".format(isbn_inpt))
+					elif self.libraryManager.duplicate_isbn(isbn_inpt):
+						print("[WARN]: {} entry already exists with book title: '{}', please enter the correct ISBN.".format(isbn_inpt, self.libraryManager.data[self.libraryManager.find_isbn(isbn_inpt)]["title"]))
 					else:
-						# no default data can be used
-						if (book_data["isbn"] != None):
-							# invalid isbn, warn user
-							print("[WARN]: ISBN code may be a duplicate or may have been provided in the wrong format, please ensure the checkdigit is correct.")
-
-						isbn_inpt = "";
-						while True:
-							# input required
-							isbn_inpt = input("ISBN (-1 to exit): ")
-							if (isbn_inpt == "-1"):
-								break
-							elif not LibraryData.validate_isbn(isbn_inpt):
-								print("[WARN]: {} is not a valid isbn, please ensure the checkdigit is correct.".format(isbn_inpt))
-							elif self.libraryManager.duplicate_isbn(isbn_inpt):
-								print("[WARN]: {} entry already exists with book title: '{}', please enter the correct ISBN.".format(isbn_inpt, self.libraryManager.data[isbn_inpt]["title"]))
-							else:
-								break # valid isbn
-
-
-						if (isbn_inpt == "-1"):
-							# cancel command
-							return
-						else:
-							# validated isbn_inpt
-							book_data["isbn"] = isbn_inpt
+						break # valid isbn
 
-					# title input
-					if (book_data["title"] != None and len(book_data["title"]) >= 1):
-						# has default data (valid title)
-						title_inpt = input("Title ({}): ".format(book_data["title"]))
 
-						if (title_inpt == ""):
-							# empty input, use default
-							pass
-						else:
-							# value keyed in, overwrite arguments
-							book_data["title"] = title_inpt
+				if (isbn_inpt == "-1"):
+					# cancel command
+					return
+				else:
+					# validated isbn_inpt
+					book_data["isbn"] = isbn_inpt
+
+			# title input
+			if (book_data["title"] != None and len(book_data["title"]) >= 1):
+				# has default data (valid title)
+				title_inpt = input("Title ({}): ".format(book_data["title"]))
+
+				if (title_inpt == ""):
+					# empty input, use default
+					pass
+				else:
+					# value keyed in, overwrite arguments
+					book_data["title"] = title_inpt
+			else:
+				# no default data can be used
+				if (book_data["title"] != None):
+					# invalid isbn, warn user
+					print("[WARN]: Title provided in wrong format, please conform to the restriction of at least 1 character.")
+
+				title_inpt = "";
+				while True:
+					# input required
+					title_inpt = input("Title (-1 to exit): ")
+					if (title_inpt == "-1"):
+						break
+					elif title_inpt == "":
+						print("[WARN]: Title input cannot be empty, please enter at least one character.")
 					else:
-						# no default data can be used
-						if (book_data["title"] != None):
-							# invalid isbn, warn user
-							print("[WARN]: Title provided in wrong format, please conform to the restriction of at least 1 character.")
-
-						title_inpt = "";
-						while True:
-							# input required
-							title_inpt = input("Title (-1 to exit): ")
-							if (title_inpt == "-1"):
-								break
-							elif title_inpt == "":
-								print("[WARN]: Title input cannot be empty, please enter at least one character.")
-							else:
-								break # valid title
-
-						if (title_inpt == "-1"):
-							# cancel command
-							return
-						else:
-							# validated title input
-							book_data["title"] = title_inpt
-
-					# quantity input
-					if (book_data["quantity"] != None and book_data["quantity"].isdigit() and book_data["quantity"][0] != "0"):
-						# has default data (valid qty, positive integer with no leading zeroes as to suggest non-zero values)
-						qty_inpt = input("Quantity ({}): ".format(book_data["quantity"]))
-
-						if (qty_inpt == ""):
-							# empty input, use default
-							# typecast default to int too (since parsed from command line)
-							book_data["quantity"] = int(book_data["quantity"])
-						else:
-							# value keyed in, overwrite arguments
-							book_data["quantity"] = int(qty_inpt)
+						break # valid title
+
+				if (title_inpt == "-1"):
+					# cancel command
+					return
+				else:
+					# validated title input
+					book_data["title"] = title_inpt
+
+			# quantity input
+			if (book_data["quantity"] != None and book_data["quantity"].isdigit() and book_data["quantity"][0] != "0"):
+				# has default data (valid qty, positive integer with no leading zeroes as to suggest non-zero values)
+				qty_inpt = input("Quantity ({}): ".format(book_data["quantity"]))
+
+				if (qty_inpt == ""):
+					# empty input, use default
+					# typecast default to int too (since parsed from command line)
+					book_data["quantity"] = int(book_data["quantity"])
+				else:
+					# value keyed in, overwrite arguments
+					book_data["quantity"] = int(qty_inpt)
+			else:
+				# no default data can be used
+				if (book_data["quantity"] != None):
+					# invalid isbn, warn user
+					print("[WARN]: Quantity provided in wrong format, please enter a positive non-zero integer without zero padding.")
+
+				qty_inpt = "";
+				while True:
+					# input required
+					qty_inpt = input("Quantity (-1 to exit): ")
+					if (qty_inpt == "-1"):
+						break
+					elif (not qty_inpt.isdigit() or qty_inpt[0] == "0"):
+						print("[WARN]: Please enter a valid positive non-zero integer without any zero-padding.")
 					else:
-						# no default data can be used
-						if (book_data["quantity"] != None):
-							# invalid isbn, warn user
-							print("[WARN]: Quantity provided in wrong format, please enter a positive non-zero integer without zero padding.")
-
-						qty_inpt = "";
-						while True:
-							# input required
-							qty_inpt = input("Quantity (-1 to exit): ")
-							if (qty_inpt == "-1"):
-								break
-							elif (not qty_inpt.isdigit() or qty_inpt[0] == "0"):
-								print("[WARN]: Please enter a valid positive non-zero integer without any zero-padding.")
-							else:
-								break # valid qty input
-
-						if (qty_inpt == "-1"):
-							# cancel command
-							return
-						else:
-							# validated quantity input
-							book_data["quantity"] = int(qty_inpt) # typecast it to an integer first
-
-					# type input
-					if (book_data["type"] != None and book_data["type"].isdigit() and 1 <= int(book_data["type"][0]) <= 3):
-						# has default data (valid qty, positive integer with no leading zeroes as to suggest non-zero values)
-						type_inpt = input("Type\n\t1. Hard cover\n\t2. Paper back\n\t3. EBook\n({}): ".format(book_data["type"]))
-
-						if (type_inpt == ""):
-							# empty input, use default
-							# typecast default to int too (since parsed from command line)
-							book_data["type"] = int(book_data["type"])
-						else:
-							# value keyed in, overwrite arguments
-							book_data["type"] = int(type_inpt)
+						break # valid qty input
+
+				if (qty_inpt == "-1"):
+					# cancel command
+					return
+				else:
+					# validated quantity input
+					book_data["quantity"] = int(qty_inpt) # typecast it to an integer first
+
+			# type input
+			if (book_data["type"] != None and book_data["type"].isdigit() and 1 <= int(book_data["type"][0]) <= 3):
+				# has default data (valid qty, positive integer with no leading zeroes as to suggest non-zero values)
+				type_inpt = input("Type\n\t1. Hard cover\n\t2. Paper back\n\t3. EBook\n({}): ".format(book_data["type"]))
+
+				if (type_inpt == ""):
+					# empty input, use default
+					# typecast default to int too (since parsed from command line)
+					book_data["type"] = int(book_data["type"])
+				else:
+					# value keyed in, overwrite arguments
+					book_data["type"] = int(type_inpt)
+			else:
+				# no default data can be used
+				if (book_data["type"] != None):
+					# invalid type, warn user
+					print("[WARN]: Type value provided in wrong format, please enter a selection of book types from 1-3 (inclusive).")
+
+				type_inpt = "";
+				while True:
+					# input required
+					type_inpt = input("Type\n\t1. Hard cover\n\t2. Paper back\n\t3. EBook\n(-1 to exit): ")
+					if (type_inpt == "-1"):
+						break
+					elif not type_inpt.isdigit() or not(1 <= int(type_inpt) <= 3):
+						print("[WARN]: Please enter within the valid range 1-3 (inclusive).")
 					else:
-						# no default data can be used
-						if (book_data["type"] != None):
-							# invalid type, warn user
-							print("[WARN]: Type value provided in wrong format, please enter a selection of book types from 1-3 (inclusive).")
-
-						type_inpt = "";
-						while True:
-							# input required
-							type_inpt = input("Type\n\t1. Hard cover\n\t2. Paper back\n\t3. EBook\n(-1 to exit): ")
-							if (type_inpt == "-1"):
-								break
-							elif not type_inpt.isdigit() or not(1 <= int(type_inpt) <= 3):
-								print("[WARN]: Please enter within the valid range 1-3 (inclusive).")
-							else:
-								break # valid type selection
-
-						if (type_inpt == "-1"):
-							# cancel command
-							return
-						else:
-							# validated type input
-							book_data["type"] = int(type_inpt) # typecast it to an integer first
-				except KeyboardInterrupt:
-					# exit
-					print()
+						break # valid type selection
+
+				if (type_inpt == "-1"):
+					# cancel command
 					return
+				else:
+					# validated type input
+					book_data["type"] = int(type_inpt) # typecast it to an integer first
+		except KeyboardInterrupt:
+			# exit
+			print()
+			return
 
-				success = self.libraryManager.add_book(book_data)
+		book_data["isbn"] = catalogue_isbn(book_data["isbn"]) # stored (and shown) in its catalogue form
+		success = self.libraryManager.add_book(book_data)
+		if not success:
+			print("[ERROR]: {} could not be added, another form of this ISBN may already be in the catalogue.".format(book_data["isbn"]))
+			return
 
-				# change book_data["type"] to enum representative
-				for enum_repr in LibraryData.BOOK_TYPE:
-					if (book_data["type"] == LibraryData.BOOK_TYPE[enum_repr]):
-						book_data["type"] = enum_repr
-						break
+		# change book_data["type"] to enum representative
+		for enum_repr in LibraryData.BOOK_TYPE:
+			if (book_data["type"] == LibraryData.BOOK_TYPE[enum_repr]):
+				book_data["type"] = enum_repr
+				break
 
-				# out new screen
-				screen = self.create_new_screen();
-				screen.build("\n\n\n\nUpdate book success!\nEntry details:\n")
-
-				max_width = 0
-				for key in book_data:
-					r_width = len(key) + len(str(book_data[key])) # row width
-					if (r_width) > max_width:
-						max_width = r_width
-				max_width += 2 # colon, space after colon
-
-				screen.build("+-{}-+\n".format("-" *max_width))
-				screen.build("| {:<{}} |\n".format("ISBN: {}".format(book_data["isbn"]), max_width))
-				screen.build("| {:<{}} |\n".format("Title: {}".format(book_data["title"]), max_width))
-				screen.build("| {:<{}} |\n".format("Type: {}".format(book_data["type"]), max_width))
-				screen.build("| {:<{}} |\n".format("Quantity: {}".format(book_data["quantity"]), max_width))
-				screen.build("+-{}-+\n\n\n".format("-" *max_width))
-				screen.out();
-
-		if (self.access_level >= 2):
-			# administrators, root users
-			if (command == "create"):
-				return self.create_user()
-
-		if (self.access_level >= 3):
-			# root users ONLY (highest)
-			if (command == "delete"):
-				isbn = self.search_interface(args, flags)
-				if isbn == None:
-					# exit (home screen already out)
-					print("Delete failed [no search performed].")
-					return
+		# out new screen
+		screen = self.create_new_screen();
+		screen.build("\n\n\n\nUpdate book success!\nEntry details:\n")
 
-				return self.delete_book_interface(isbn, args, flags)
+		max_width = 0
+		for key in book_data:
+			r_width = len(key) + len(str(book_data[key])) # row width
+			if (r_width) > max_width:
+				max_width = r_width
+		max_width += 2 # colon, space after colon
 
+		screen.build("+-{}-+\n".format("-" *max_width))
+		screen.build("| {:<{}} |\n".format("ISBN: {}".format(book_data["isbn"]), max_width))
+		screen.build("| {:<{}} |\n".format("Title: {}".format(book_data["title"]), max_width))
+		screen.build("| {:<{}} |\n".format("Type: {}".format(book_data["type"]), max_width))
+		screen.build("| {:<{}} |\n".format("Quantity: {}".format(book_data["quantity"]), max_width))
+		screen.build("+-{}-+\n\n\n".format("-" *max_width))
+		screen.out();
 
+	def kernel(self, command, args={}, flags=[]):
+		# executes the actual command, one lookup in the commands available at the user's access level
+		entry = self.commands.lookup(command, self.access_level)
+		if (entry != None):
+			return entry.handler(args, flags)
+
+		if (command != ""):
+			# unknown (or not permitted) command, suggest the closest one the user can run
+			suggestion = self.commands.suggest(command, self.access_level)
+			if (suggestion != None):
+				print("[WARN]: No command found for '{}', did you mean '{}'.".format(command, suggestion))
+			else:
+				print("[WARN]: No command found for '{}'.".format(command))
 
 	def interface(self):
 		# responsible for retrieving ONE single command
@@ -1690,10 +2546,23 @@ class LibCLI:
 				print("[ERROR]: malformed input, unknown character sequence in command, '{}'.".format(value))
 				return
 
-		self.kernel(command, args=args, flags=flags)
+		# shared mode, see what the other terminals changed before acting on it
+		database_engine.sync()
+		self.libraryManager.apply_remote_changes()
+
+		try:
+			self.kernel(command, args=args, flags=flags)
+		except RemoteError as e:
+			# the library server refused or failed the request
+			print("[ERROR]: {}".format(e))
 
 
 if __name__ == "__main__":
+	if (sys.argv[1:2] == ["serve"]):
+		# library server mode, no login
+		serve()
+		exit(0)
+
 	# call login handler to perform login
 	CLI = LibCLI();
 
@@ -1705,6 +2574,13 @@ if __name__ == "__main__":
 		print("Failed to authenticate, please try re-running the program again.")
 		exit(1); # exit program with status code of 1
 
+	# autosave changes in the background (every database_engine.update_rate seconds)
+	database_engine.start()
+
 	# run commands (initiate main control loop)
-	while CLI.active:
-		CLI.interface()
\ No newline at end of file
+	try:
+		while CLI.active:
+			CLI.interface()
+	except KeyboardInterrupt:
+		# Ctrl + C outside of a prompt, drain saves before exiting
+		CLI.logout_handler()
\ No newline at end of file
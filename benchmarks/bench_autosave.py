@@ -0,0 +1,72 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# throughput of the autosave path: legacy in place rewrite vs atomic snapshots (with/without fsync) vs write-ahead log appends
+# usage: python benchmarks/bench_autosave.py [books] [cycles]
+import sys
+import json
+import random
+import tempfile
+from os import path
+from bench_common import random_titles, timed
+
+from includes.database_engine import DatabaseReader
+
+def build_catalogue(directory, n):
+	# writes a synthetic isbn.json with n books into directory
+	rng = random.Random(0)
+	titles = random_titles(n)
+	content = {}
+	for idx in range(n):
+		content["978-{:010d}".format(idx)] = {"title": titles[idx], "type": rng.randint(1, 3), "quantity": rng.randint(0, 20)}
+
+	with open(path.join(directory, "isbn.json"), "w") as f:
+		f.write(json.dumps(content, indent="\t"))
+
+def legacy_push(reader):
+	# what DatabaseReader.push() used to do (truncate the live file, then write into it)
+	# returns the number of bytes written
+	data = json.dumps(reader.content, indent="\t")
+	with open(reader.filepath, "w") as f:
+		f.write(data)
+
+	reader.fsyncs = 0
+	reader.dirty_keys.clear()
+	return len(data)
+
+def autosave_cycles(reader, cycles, changes, push_fn):
+	# runs cycles autosave cycles, each changing changes books, returns [bytes written, fsyncs]
+	keys = list(reader.content.keys())
+	written, fsyncs = 0, 0
+	for cycle in range(cycles):
+		for idx in range(changes):
+			reader[keys[(cycle *changes +idx) %len(keys)]]["quantity"] += 1
+		r = push_fn(reader)
+		written += r
+		fsyncs += reader.fsyncs
+	return [written, fsyncs]
+
+if __name__ == "__main__":
+	books = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+	cycles = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+	changes = 10 # books changed per autosave cycle
+
+	with tempfile.TemporaryDirectory() as directory:
+		build_catalogue(directory, books)
+		size = path.getsize(path.join(directory, "isbn.json"))
+		print("{} books, snapshot {:.2f}MB, {} cycles of {} changes\n".format(books, size /1e6, cycles, changes))
+
+		cases = [
+			["legacy rewrite (w)", False, legacy_push],
+			["atomic snapshot, no fsync", False, lambda reader: reader.checkpoint(durable=False)],
+			["atomic snapshot, fsync", False, lambda reader: reader.checkpoint(durable=True)],
+			["wal append, no fsync", True, lambda reader: reader.push(durable=False)],
+			["wal append, fsync", True, lambda reader: reader.push(durable=True)]
+		]
+
+		print("{:<28} | {:>12} | {:>10} | {:>10} | {:>7}".format("path", "ms / cycle", "MB / s", "MB total", "fsyncs"))
+		for name, wal, push_fn in cases:
+			reader = DatabaseReader("isbn.json", wal=wal, directory=directory)
+			reader.checkpoint_every = cycles *changes +1 # no compaction during the run
+			seconds, r = timed(autosave_cycles, reader, cycles, changes, push_fn)
+			print("{:<28} | {:>12.2f} | {:>10.1f} | {:>10.2f} | {:>7}".format(name, seconds *1000 /cycles, r[0] /1e6 /seconds, r[0] /1e6, r[1]))
+			reader.checkpoint(durable=False) # fold the log back in before the next case
@@ -0,0 +1,44 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# memory held per catalogue record: plain dicts (json.load), tracked dicts (DatabaseReader) and BookRecord (DatabaseReader(wrap=wrap_book))
+# usage: python benchmarks/bench_book_memory.py [books]
+import sys
+import gc
+import json
+import tempfile
+import tracemalloc
+from os import path
+from bench_autosave import build_catalogue
+
+from includes.database_engine import DatabaseReader
+from includes.book_store import wrap_book
+
+def measure(fn):
+	# returns [bytes still allocated by fn's return value, return value]
+	gc.collect()
+	tracemalloc.start()
+	r = fn()
+	gc.collect()
+	size = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	return [size, r]
+
+if __name__ == "__main__":
+	books = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+	with tempfile.TemporaryDirectory() as directory:
+		build_catalogue(directory, books)
+		filepath = path.join(directory, "isbn.json")
+
+		cases = [
+			["json.load (dict)", lambda: json.load(open(filepath, "r"))],
+			["DatabaseReader (TrackedDict)", lambda: DatabaseReader("isbn.json", directory=directory)],
+			["DatabaseReader (BookRecord)", lambda: DatabaseReader("isbn.json", directory=directory, wrap=wrap_book)]
+		]
+
+		print("{} books\n".format(books))
+		print("{:<30} | {:>10} | {:>14}".format("records", "MB", "bytes / book"))
+		for name, fn in cases:
+			size, r = measure(fn)
+			print("{:<30} | {:>10.2f} | {:>14.1f}".format(name, size /1e6, size /books))
+			del r
@@ -0,0 +1,47 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# shared helpers for the benchmark scripts in this folder
+# run them from the project root, e.g. python benchmarks/bench_sort.py
+import sys
+import time
+import random
+import importlib.util
+from os import path
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS = ["the", "data", "python", "harry", "potter", "stone", "guide", "history", "of", "and", "modern", "approach", "learning", "wild", "things", "kill", "mockingbird", "edition", "global", "marketing", "cyber", "reading", "children's", "analytics", "swords", "storm", "official", "cert", "intelligence", "artificial"]
+
+def load_libcli():
+	# imports __main__.py as a module (without running the login loop)
+	spec = importlib.util.spec_from_file_location("libcli", path.join(ROOT, "__main__.py"))
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+SYLLABLES = ["ka", "lo", "ri", "ten", "mar", "vo", "sel", "dra", "nu", "pe", "gor", "shi", "an", "tum", "bel", "qua", "zi", "ro", "fen", "hal"]
+
+def random_vocabulary(rng, n=20000):
+	# returns WORDS followed by n pseudo words (a catalogue has far more distinct words than WORDS)
+	return WORDS +["".join(rng.choice(SYLLABLES) for x in range(rng.randint(2, 4))) for y in range(n)]
+
+def random_title(rng, vocabulary=WORDS):
+	# rng: random.Random
+	# common words are picked half of the time, the rest comes from the whole vocabulary
+	words = []
+	for x in range(rng.randint(2, 6)):
+		words.append(rng.choice(WORDS) if rng.random() < 0.5 else rng.choice(vocabulary))
+	return " ".join(words).title()
+
+def random_titles(n, seed=0):
+	# returns n pseudo random titles (deterministic for a given seed)
+	rng = random.Random(seed)
+	vocabulary = random_vocabulary(rng)
+	return [random_title(rng, vocabulary) for x in range(n)]
+
+def timed(fn, *args):
+	# returns [seconds taken, return value of fn]
+	start = time.perf_counter()
+	r = fn(*args)
+	return [time.perf_counter() -start, r]
@@ -0,0 +1,38 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# streaming catalogue export (LibraryData.export()): time and peak memory allocated while exporting, for growing catalogues
+# usage: python benchmarks/bench_export.py [books...]
+import sys
+import tempfile
+import tracemalloc
+from os import path
+from bench_common import load_libcli, timed
+from bench_autosave import build_catalogue
+
+from includes.book_store import wrap_book
+
+def export_peak(library, filepath):
+	# returns [seconds, rows written, peak bytes allocated during the export]
+	# timed and traced in separate runs (tracemalloc slows every allocation down)
+	t, count = timed(library.export, "books", filepath)
+	tracemalloc.start()
+	library.export("books", filepath)
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return [t, count, peak]
+
+if __name__ == "__main__":
+	sizes = [int(arg) for arg in sys.argv[1:]] if len(sys.argv) > 1 else [20000, 200000]
+	libcli = load_libcli()
+
+	print("{:>8} | {:<6} | {:>10} | {:>10} | {:>10}".format("books", "format", "time (s)", "rows/s", "peak (KB)"))
+	for n in sizes:
+		with tempfile.TemporaryDirectory() as directory:
+			build_catalogue(directory, n)
+			libcli.database_engine.create_reader("isbn.json", directory=directory, wrap=wrap_book, wal=True)
+			library = libcli.LibraryData()
+			library.process_data()
+
+			for fmt in ("csv", "jsonl"):
+				t, count, peak = export_peak(library, path.join(directory, "export." +fmt))
+				print("{:>8} | {:<6} | {:>10.3f} | {:>10.0f} | {:>10.1f}".format(n, fmt, t, count /t, peak /1024))
@@ -0,0 +1,58 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# bulk catalogue import throughput (LibraryData.import_books()) for csv and jsonl files, index updates included
+# the time of a full index rebuild (LibraryData.process_data()) of the imported catalogue is shown for comparison
+# usage: python benchmarks/bench_import.py [rows]
+import sys
+import csv
+import json
+import random
+import tempfile
+from os import path
+from bench_common import load_libcli, random_titles, timed
+
+from includes.book_store import wrap_book
+
+def isbn13(n):
+	# returns a valid hyphenated isbn-13 ("978-" +10 digits) for n
+	digits = "978{:09d}".format(n)
+	checksum = sum(int(digits[idx]) *(1 if idx %2 == 0 else 3) for idx in range(12))
+	return "{}-{}{}".format(digits[:3], digits[3:], (10 -checksum %10) %10)
+
+def build_rows(n):
+	rng = random.Random(0)
+	titles = random_titles(n)
+	return [{"isbn": isbn13(idx), "title": titles[idx], "type": rng.randint(1, 3), "quantity": rng.randint(0, 20)} for idx in range(n)]
+
+def write_files(directory, rows):
+	with open(path.join(directory, "books.csv"), "w", newline="") as f:
+		writer = csv.writer(f)
+		writer.writerow(["isbn", "title", "type", "quantity"])
+		for row in rows:
+			writer.writerow([row["isbn"], row["title"], row["type"], row["quantity"]])
+
+	with open(path.join(directory, "books.jsonl"), "w") as f:
+		for row in rows:
+			f.write(json.dumps(row) +"\n")
+
+if __name__ == "__main__":
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+	libcli = load_libcli()
+
+	with tempfile.TemporaryDirectory() as directory:
+		write_files(directory, build_rows(n))
+
+		print("{} rows\n".format(n))
+		print("{:<6} | {:>10} | {:>10} | {:>15} | {:>8}".format("format", "time (s)", "rows/s", "full rebuild (s)", "errors"))
+		for fmt in ("csv", "jsonl"):
+			# empty catalogue in the temporary directory instead of database/isbn.json
+			with open(path.join(directory, "isbn.json"), "w") as f:
+				f.write("{}")
+			libcli.database_engine.create_reader("isbn.json", directory=directory, wrap=wrap_book, wal=True, lazy=True)
+			library = libcli.LibraryData()
+			library.process_data()
+
+			t, result = timed(library.import_books, path.join(directory, "books." +fmt))
+			imported, errors = result
+			index_t = timed(library.process_data)[0] # what rebuilding every index after the import would add to t
+			print("{:<6} | {:>10.3f} | {:>10.0f} | {:>15.3f} | {:>8}".format(fmt, t, n /t, index_t, len(errors)))
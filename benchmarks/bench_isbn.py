@@ -0,0 +1,55 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# isbn validation throughput: the previous per digit LibraryData.validate_isbn() against isbn_codes.valid_isbn() and canonical_isbns()
+# usage: python benchmarks/bench_isbn.py [codes]
+import sys
+import random
+from bench_common import timed
+
+from includes.isbn_codes import valid_isbn, canonical_isbns, check_digit_10, check_digit_13
+
+def per_digit(isbn_code):
+	# previous validator (string splitting and int() per digit, "978-" +10 digits or 10 digits only), debug print removed
+	if (isbn_code.find("-") == -1):
+		if len(isbn_code) != 10 or not (isbn_code[:-1].isdigit()):
+			return False
+		checksum = 0
+		for idx in range(9):
+			checksum += int(isbn_code[idx]) *(10 -idx)
+		checkdigit = 11 -(checksum %11)
+		return isbn_code[-1] == ("X" if checkdigit == 1 else str(checkdigit))
+
+	s = isbn_code.split("-")
+	if (len(s) != 2 or len(s[0]) != 3 or len(s[1]) != 10 or not s[0].isdigit() or not (s[1][:-1].isdigit())):
+		return False
+	digits = s[0] +s[1]
+	checksum = 10
+	for idx in range(12):
+		checksum += int(digits[idx]) *(1 if idx %2 == 0 else 3)
+	return int(isbn_code[-1]) == 10 -(checksum %10)
+
+def build_codes(n):
+	# half isbn-10, half "978-" isbn-13 (the two layouts the previous validator accepts), 1 in 10 with a wrong check digit
+	rng = random.Random(0)
+	codes = []
+	for idx in range(n):
+		if (idx %2 == 0):
+			digits = "{:09d}".format(rng.randrange(10 **9))
+			code = digits +check_digit_10(digits)
+		else:
+			digits = "978{:09d}".format(rng.randrange(10 **9))
+			code = "978-" +digits[3:] +check_digit_13(digits)
+		if (idx %10 == 0):
+			code = code[:-1] +("1" if code[-1] == "0" else "0")
+		codes.append(code)
+	return codes
+
+if __name__ == "__main__":
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+	codes = build_codes(n)
+
+	print("{} codes\n".format(n))
+	print("{:<24} | {:>10} | {:>12} | {:>8}".format("validator", "time (s)", "codes/s", "valid"))
+	for name, fn in (("per digit (previous)", lambda: [per_digit(code) for code in codes]), ("valid_isbn()", lambda: [valid_isbn(code) for code in codes]), ("canonical_isbns() batch", lambda: [key != None for key in canonical_isbns(codes)])):
+		t, result = timed(fn)
+		print("{:<24} | {:>10.3f} | {:>12.0f} | {:>8}".format(name, t, n /t, sum(result)))
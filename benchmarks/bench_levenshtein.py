@@ -0,0 +1,28 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# compares scoring a whole title column row by row (UtilCLI.levenshtein_distance) against UtilCLI.levenshtein_batch()
+# usage: python benchmarks/bench_levenshtein.py [query]
+import sys
+from bench_common import load_libcli, random_titles, timed
+
+SIZES = [1000, 10000, 100000]
+
+def per_row(UtilCLI, query, titles):
+	return [UtilCLI.levenshtein_distance(title, query) for title in titles]
+
+if __name__ == "__main__":
+	query = sys.argv[1] if len(sys.argv) > 1 else "harry potter"
+	libcli = load_libcli()
+	UtilCLI = libcli.UtilCLI
+	if (libcli.np == None):
+		print("[WARN]: numpy is not installed, levenshtein_batch() falls back to the per row loop.")
+
+	print("{:>8} | {:>12} | {:>12} | {:>8}".format("titles", "per row (s)", "batch (s)", "speedup"))
+	for n in SIZES:
+		titles = random_titles(n)
+		row_t, expected = timed(per_row, UtilCLI, query, titles)
+		batch_t, distances = timed(UtilCLI.levenshtein_batch, query, titles)
+		if (distances != expected):
+			print("[ERROR]: batch distances differ from the per row distances at {} titles.".format(n))
+
+		print("{:>8} | {:>12.4f} | {:>12.4f} | {:>7.1f}x".format(n, row_t, batch_t, row_t /batch_t))
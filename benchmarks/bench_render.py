@@ -0,0 +1,64 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# Screen.out() rendering cost per frame: clear (shell) and reprint against FrameRenderer (frame diff), in bytes written and time
+# frames are built like browse_interface() pages, flipping to the next page and redrawing the same page with a warning
+# usage: python benchmarks/bench_render.py [frames]
+import os
+import io
+import sys
+import shutil
+import subprocess
+from bench_common import random_titles, timed
+
+from includes.frame_renderer import FrameRenderer
+
+PAGE_SIZE = 10
+TERMINAL = os.terminal_size((100, 40))
+
+def browse_frame(titles, page_idx, error_msg="\n"):
+	# same layout as a browse_interface() page
+	start = page_idx *PAGE_SIZE
+	content = "librarian | Librarian\n"
+	content += "\n{}\n\nBrowsing [{}-{} out of {} books]\n".format(error_msg, start +1, start +PAGE_SIZE, len(titles))
+	for idx in range(PAGE_SIZE):
+		content += "{:<4} [978-{:010d}] {}\n".format(" {}.".format(idx +1), start +idx, titles[start +idx])
+	return content +"\n\n[Ctrl + C] to exit."
+
+def clear_reprint(frames):
+	# previous Screen.out(): clear through a shell, then print the whole frame
+	# returns bytes written
+	clear_bytes = len(subprocess.run(["clear"], capture_output=True).stdout)
+	written = 0
+	for content in frames:
+		os.system("clear >/dev/null")
+		written += clear_bytes +len((content +"\n").encode("utf-8"))
+	return written
+
+def frame_diff(frames):
+	# returns bytes written (the renderer writes into memory, the frame before the first one is already on screen)
+	renderer = FrameRenderer(io.StringIO(), TERMINAL)
+	renderer.render(frames[0])
+	renderer.bytes_written = 0
+	for content in frames[1:]:
+		renderer.render(content)
+	return renderer.bytes_written
+
+if __name__ == "__main__":
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+	titles = random_titles((n +1) *PAGE_SIZE)
+	scenarios = [
+		["page flip", [browse_frame(titles, page_idx) for page_idx in range(n +1)]],
+		["warning only", [browse_frame(titles, 0, "[WARN]: No next page to proceed!\n" if idx %2 else "\n") for idx in range(n +1)]]
+	]
+	if (shutil.which("clear") == None):
+		print("[WARN]: clear is not installed, only the frame diff renderer is measured.")
+
+	print("{} frames, terminal {}x{}\n".format(n, TERMINAL.columns, TERMINAL.lines))
+	print("{:<14} | {:<16} | {:>12} | {:>14}".format("scenario", "renderer", "bytes/frame", "ms/frame"))
+	for name, frames in scenarios:
+		if (shutil.which("clear") != None):
+			t, written = timed(clear_reprint, frames[1:])
+			print("{:<14} | {:<16} | {:>12.0f} | {:>14.3f}".format(name, "clear + reprint", written /n, t /n *1000))
+
+		t, written = timed(frame_diff, frames)
+		print("{:<14} | {:<16} | {:>12.0f} | {:>14.3f}".format(name, "frame diff", written /n, t /n *1000))
@@ -0,0 +1,48 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# load/save time and size of the binary snapshot format against today's json snapshots (json.load / json.dumps(indent="\t"))
+# usage: python benchmarks/bench_snapshot.py [books] [users]
+import sys
+import json
+import random
+from bench_common import random_titles, timed
+
+from includes import binary_snapshot
+
+def build_catalogue(n):
+	rng = random.Random(0)
+	titles = random_titles(n)
+	return {"978-{:010d}".format(idx): {"title": titles[idx], "type": rng.randint(1, 3), "quantity": rng.randint(0, 20)} for idx in range(n)}
+
+def build_users(n, isbns):
+	# every user has a few active loans and a longer loan history
+	rng = random.Random(1)
+	users = {}
+	for idx in range(n):
+		loaning = [[rng.choice(isbns), 1.69e9 +rng.random() *1e7, 172800] for x in range(rng.randint(0, 3))]
+		loaned_books = [[rng.choice(isbns), 1.69e9 +rng.random() *1e7, 172800, 1.7e9 +rng.random() *1e7] for x in range(rng.randint(0, 30))]
+		users["user{}".format(idx)] = {"password": "{:0128x}".format(rng.getrandbits(512)), "access_level": 0, "loaning": loaning, "loaned_books": loaned_books}
+	return users
+
+def json_save(content):
+	return json.dumps(content, indent="\t").encode("utf-8")
+
+if __name__ == "__main__":
+	books = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+	users = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+	catalogue = build_catalogue(books)
+	datasets = [["isbn ({} books)".format(books), catalogue], ["users ({} users)".format(users), build_users(users, list(catalogue))]]
+
+	print("{:<22} | {:<6} | {:>9} | {:>9} | {:>9}".format("dataset", "format", "MB", "load (s)", "save (s)"))
+	for name, content in datasets:
+		json_t, json_data = timed(json_save, content)
+		binary_t, binary_data = timed(binary_snapshot.encode, content)
+
+		json_load_t, json_loaded = timed(json.loads, json_data)
+		binary_load_t, binary_loaded = timed(binary_snapshot.decode, binary_data)
+		if (json_save(binary_loaded) != json_data):
+			print("[ERROR]: {} did not round trip losslessly.".format(name))
+
+		print("{:<22} | {:<6} | {:>9.2f} | {:>9.3f} | {:>9.3f}".format(name, "json", len(json_data) /1e6, json_load_t, json_t))
+		print("{:<22} | {:<6} | {:>9.2f} | {:>9.3f} | {:>9.3f}".format(name, "binary", len(binary_data) /1e6, binary_load_t, binary_t))
@@ -0,0 +1,41 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# compares the old process_data() sort path (bubble_sort + compare_str) against UtilCLI.key_sort()
+# usage: python benchmarks/bench_sort.py [old_limit]
+# old_limit (default 10000): largest size the quadratic bubble sort is actually run for, larger sizes are extrapolated
+import sys
+from bench_common import load_libcli, random_titles, timed
+
+SIZES = [1000, 10000, 100000]
+
+def old_path(UtilCLI, titles):
+	alpha_data = [[titles[idx], idx] for idx in range(len(titles))]
+	UtilCLI.bubble_sort(alpha_data, lambda a, b: UtilCLI.compare_str(a[0], b[0]))
+	return alpha_data
+
+def new_path(UtilCLI, titles, engine):
+	keys = [UtilCLI.collation_key(title) for title in titles]
+	return UtilCLI.key_sort(keys, list(range(len(titles))), engine)
+
+if __name__ == "__main__":
+	old_limit = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+	UtilCLI = load_libcli().UtilCLI
+
+	print("{:>8} | {:>16} | {:>12} | {:>12}".format("titles", "bubble_sort (s)", "timsort (s)", "quick_sort (s)"))
+	last_old = None # [n, seconds] of the largest measured old path run
+	for n in SIZES:
+		titles = random_titles(n)
+
+		if (n <= old_limit):
+			old_t = timed(old_path, UtilCLI, titles)[0]
+			last_old = [n, old_t]
+			old_repr = "{:.4f}".format(old_t)
+		elif last_old != None:
+			# O(n^2), extrapolate from the largest measured run
+			old_repr = "{:.1f} (est.)".format(last_old[1] *(n /last_old[0]) **2)
+		else:
+			old_repr = "skipped"
+
+		tim_t = timed(new_path, UtilCLI, titles, "timsort")[0]
+		quick_t = timed(new_path, UtilCLI, titles, "quick_sort")[0]
+		print("{:>8} | {:>16} | {:>12.4f} | {:>12.4f}".format(n, old_repr, tim_t, quick_t))
@@ -0,0 +1,187 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# compact binary snapshot format for DatabaseReader (lossless with the json files)
+# top level records sharing the same keys are stored column by column, strings go into one deduplicated string table
+# and numbers into packed arrays, so loading is mostly array.frombytes() instead of parsing text
+#
+# layout (little endian):
+#	magic "LCBS", version (1 byte)
+#	string table: utf-8 blob, then b"\x00" (strings separated by NUL characters) or b"\x01" and character offsets (n +1)
+#	key order: string indexes of every top level key (in file order)
+#	groups: count, then per group
+#		kind: b"d" (dict records with the same keys) or b"v" (anything else, one json column)
+#		fields: string indexes of the keys (b"d" only), column kinds (one byte each)
+#		row keys: string indexes of the top level keys of the group
+#		columns: "s" string indexes, "b"/"h"/"i"/"q" signed ints, "d" floats, "j" compact json list
+import sys
+import json
+import struct
+from array import array
+from itertools import repeat
+
+MAGIC = b"LCBS"
+VERSION = 1
+
+# fixed width typecodes (the width of "I"/"L" varies across platforms)
+UINT32 = "I" if array("I").itemsize == 4 else "L"
+INT_KINDS = [["b", -2 **7, 2 **7 -1], ["h", -2 **15, 2 **15 -1], ["i", -2 **31, 2 **31 -1], ["q", -2 **63, 2 **63 -1]]
+
+def is_binary(data):
+	# data: bytes-like (start of a snapshot file)
+	return data[:len(MAGIC)] == MAGIC
+
+def _pack_array(typecode, values):
+	packed = array(typecode, values)
+	if (sys.byteorder == "big"):
+		packed.byteswap()
+	return struct.pack("<Q", len(packed)) +packed.tobytes()
+
+def _pack_blob(data):
+	return struct.pack("<Q", len(data)) +data
+
+def _column_kind(values):
+	# returns the narrowest column kind able to hold every value losslessly
+	kinds = {type(value) for value in values}
+	if (kinds == {str}):
+		return "s"
+	elif (kinds == {float}):
+		return "d"
+	elif (kinds == {int}):
+		lo, hi = min(values), max(values)
+		for typecode, kind_lo, kind_hi in INT_KINDS:
+			if (kind_lo <= lo and hi <= kind_hi):
+				return typecode
+
+	return "j" # mixed types, containers, bools, None or ints beyond 64 bits
+
+def encode(content):
+	# content: dict (top level keys -> json compatible values)
+	# returns bytes
+	strings = {} # str -> index in the string table
+	def intern(s):
+		return strings.setdefault(s, len(strings))
+
+	key_order = [intern(key) for key in content]
+
+	# group records by their keys (in order, so records decode with the same key order)
+	groups = {} # shape (tuple of keys, None for non dict records) -> [keys, records]
+	for key, record in content.items():
+		shape = tuple(record.keys()) if hasattr(record, "keys") else None # dicts and mapping records (e.g. BookRecord)
+		group = groups.get(shape)
+		if (group == None):
+			groups[shape] = [[key], [record]]
+		else:
+			group[0].append(key)
+			group[1].append(record)
+
+	body = [struct.pack("<I", len(groups))]
+	for shape, (keys, records) in groups.items():
+		if (shape == None):
+			body.append(b"v")
+			columns = [["j", records]]
+		else:
+			body.append(b"d")
+			body.append(_pack_array(UINT32, [intern(field) for field in shape]))
+			columns = []
+			for field in shape:
+				values = [record[field] for record in records]
+				columns.append([_column_kind(values), values])
+
+		body.append(_pack_blob("".join(kind for kind, values in columns).encode("ascii")))
+		body.append(_pack_array(UINT32, [intern(key) for key in keys]))
+		for kind, values in columns:
+			if (kind == "s"):
+				body.append(_pack_array(UINT32, [intern(value) for value in values]))
+			elif (kind == "j"):
+				body.append(_pack_blob(json.dumps(values, separators=(",", ":"), default=dict).encode("utf-8")))
+			else:
+				body.append(_pack_array(kind, values))
+
+	# string table last in encoding order (columns above intern into it), first in the file
+	header = [MAGIC, struct.pack("<B", VERSION)]
+	if any("\x00" in s for s in strings):
+		# rare, strings can not be told apart by a separator
+		offsets = [0]
+		for s in strings:
+			offsets.append(offsets[-1] +len(s))
+		header += [_pack_blob("".join(strings).encode("utf-8", "surrogatepass")), b"\x01", _pack_array("q", offsets)]
+	else:
+		# split back in one str.split() call
+		header += [_pack_blob("\x00".join(strings).encode("utf-8", "surrogatepass")), b"\x00"]
+	header.append(_pack_array(UINT32, key_order))
+
+	return b"".join(header +body)
+
+class _Cursor:
+	# sequential reader over the encoded data
+	def __init__(self, data, pos):
+		self.data = data
+		self.pos = pos
+
+	def blob(self):
+		n = struct.unpack_from("<Q", self.data, self.pos)[0]
+		self.pos += 8 +n
+		return self.data[self.pos -n: self.pos]
+
+	def array(self, typecode):
+		n = struct.unpack_from("<Q", self.data, self.pos)[0]
+		unpacked = array(typecode)
+		unpacked.frombytes(self.data[self.pos +8: self.pos +8 +n *unpacked.itemsize])
+		self.pos += 8 +n *unpacked.itemsize
+		if (sys.byteorder == "big"):
+			unpacked.byteswap()
+		return unpacked
+
+	def uint32(self):
+		self.pos += 4
+		return struct.unpack_from("<I", self.data, self.pos -4)[0]
+
+	def byte(self):
+		self.pos += 1
+		return self.data[self.pos -1: self.pos]
+
+def decode(data):
+	# data: bytes-like (written by encode())
+	# returns dict (same keys, order and values as the encoded content)
+	if not is_binary(data):
+		raise ValueError("not a binary snapshot")
+	version = data[len(MAGIC)]
+	if (version != VERSION):
+		raise ValueError("unsupported binary snapshot version {}".format(version))
+
+	cursor = _Cursor(data, len(MAGIC) +1)
+	text = bytes(cursor.blob()).decode("utf-8", "surrogatepass")
+	if (cursor.byte() == b"\x00"):
+		strings = text.split("\x00")
+	else:
+		offsets = cursor.array("q")
+		strings = [text[offsets[idx]: offsets[idx +1]] for idx in range(len(offsets) -1)]
+	lookup = strings.__getitem__
+
+	key_order = cursor.array(UINT32)
+	group_n = cursor.uint32()
+	# file order, values filled in per group (a single group already is in file order)
+	content = dict.fromkeys(map(lookup, key_order)) if group_n > 1 else {}
+	for group_idx in range(group_n):
+		kind = cursor.byte()
+		fields = list(map(lookup, cursor.array(UINT32))) if kind == b"d" else None
+		column_kinds = bytes(cursor.blob()).decode("ascii")
+		keys = list(map(lookup, cursor.array(UINT32)))
+
+		columns = []
+		for column_kind in column_kinds:
+			if (column_kind == "s"):
+				columns.append(list(map(lookup, cursor.array(UINT32))))
+			elif (column_kind == "j"):
+				columns.append(json.loads(bytes(cursor.blob())))
+			else:
+				columns.append(cursor.array(column_kind).tolist())
+
+		if (kind == b"v"):
+			content.update(zip(keys, columns[0]))
+		elif (len(fields) == 0):
+			content.update((key, {}) for key in keys)
+		else:
+			content.update(zip(keys, map(dict, map(zip, repeat(fields), zip(*columns))))) # no python level loop per record
+
+	return content
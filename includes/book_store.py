@@ -0,0 +1,84 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+from includes.database_engine import track
+
+class BookRecord:
+	# compact catalogue record (isbn.json), attributes in __slots__ instead of a per record dict
+	# behaves like the {"title", "type", "quantity"} dict it replaces (book["quantity"] -= 1, .keys(), .get(), dict(book), ...)
+	# and reports in place changes to the reader owning it like TrackedDict does
+	__slots__ = ("_owner", "_key", "title", "type", "quantity", "__weakref__")
+	FIELDS = ("title", "type", "quantity") # key order of the json records
+
+	def __init__(self, owner, key, title, type, quantity):
+		# owner: DatabaseReader, key: str (isbn the record lives under)
+		self._owner = owner
+		self._key = key
+		self.title = title
+		self.type = type
+		self.quantity = quantity
+
+	def __getitem__(self, field):
+		if not (field in BookRecord.FIELDS):
+			raise KeyError(field)
+		return getattr(self, field)
+
+	def __setitem__(self, field, value):
+		if not (field in BookRecord.FIELDS):
+			raise KeyError("books only have the fields {}, got '{}'".format(", ".join(BookRecord.FIELDS), field))
+
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			setattr(self, field, value)
+
+	def get(self, field, default=None):
+		return getattr(self, field) if field in BookRecord.FIELDS else default
+
+	def keys(self):
+		return BookRecord.FIELDS
+
+	def values(self):
+		return [self.title, self.type, self.quantity]
+
+	def items(self):
+		return [["title", self.title], ["type", self.type], ["quantity", self.quantity]]
+
+	def __contains__(self, field):
+		return field in BookRecord.FIELDS
+
+	def __iter__(self):
+		return iter(BookRecord.FIELDS)
+
+	def __len__(self):
+		return len(BookRecord.FIELDS)
+
+	def __eq__(self, other):
+		if isinstance(other, BookRecord):
+			other = other.to_dict()
+		return self.to_dict() == other
+
+	def refill(self, value):
+		# replaces the fields with value (a record saved by another terminal) without reporting a change
+		# returns false if value is not a book record (the reader replaces this record instead)
+		if not (isinstance(value, dict) and tuple(value) == BookRecord.FIELDS):
+			return False
+		self.title = value["title"]
+		self.type = value["type"]
+		self.quantity = value["quantity"]
+		return True
+
+	def to_dict(self):
+		return {"title": self.title, "type": self.type, "quantity": self.quantity}
+
+	def __repr__(self):
+		return repr(self.to_dict())
+
+def wrap_book(value, owner, key):
+	# value: any (top level value of isbn.json), owner: DatabaseReader, key: str
+	# to be passed as DatabaseReader(wrap=...), returns a BookRecord for records with exactly the book fields (in order)
+	# anything else keeps the generic tracked representation so the round trip to json stays lossless
+	if (type(value) == BookRecord):
+		return BookRecord(owner, key, value.title, value.type, value.quantity)
+	elif isinstance(value, dict) and tuple(value) == BookRecord.FIELDS and type(value["title"]) == str and type(value["type"]) == int and type(value["quantity"]) == int:
+		return BookRecord(owner, key, value["title"], value["type"], value["quantity"])
+
+	return track(value, owner, key)
@@ -0,0 +1,47 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# streaming writers for exports (LibraryData.export()), rows are written as they are produced
+import os
+import csv
+import json
+from os import path
+
+from includes.database_engine import fsync_dir
+from includes.catalogue_import import detect_format
+
+BOOK_FIELDS = ("isbn", "title", "type", "quantity")
+LOAN_FIELDS = ("username", "isbn", "loan_timestamp", "duration", "return_timestamp") # return_timestamp empty for active loans
+
+def write_rows(filepath, fields, rows, fmt=None):
+	# filepath: str, fields: str[] (column names), rows: iterable of lists (one value per field), fmt: "csv"|"jsonl"? (from the extension)
+	# writes into a temporary file that replaces filepath once complete, an interrupted export leaves no partial file behind
+	# returns the number of rows written
+	fmt = fmt if fmt != None else detect_format(filepath)
+	if not (fmt in ("csv", "jsonl")):
+		raise ValueError("can not tell the export format of {}, expected .csv or .jsonl (or format=csv|jsonl)".format(filepath))
+
+	count = 0
+	tmp_path = filepath +".tmp"
+	try:
+		with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+			if (fmt == "csv"):
+				writer = csv.writer(f)
+				writer.writerow(fields)
+				for row in rows:
+					writer.writerow(["" if value == None else value for value in row])
+					count += 1
+			else:
+				for row in rows:
+					f.write(json.dumps(dict(zip(fields, row)), separators=(",", ":")) +"\n")
+					count += 1
+
+			f.flush()
+			os.fsync(f.fileno())
+	except BaseException:
+		if path.exists(tmp_path):
+			os.remove(tmp_path)
+		raise
+
+	os.replace(tmp_path, filepath)
+	fsync_dir(path.dirname(path.abspath(filepath)))
+	return count
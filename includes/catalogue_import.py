@@ -0,0 +1,65 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# streaming readers for bulk catalogue imports (LibraryData.import_books()), rows are never all held in memory
+import csv
+import json
+from os import path
+
+FIELDS = ("isbn", "title", "type", "quantity")
+
+def detect_format(filepath):
+	# returns "csv" or "jsonl" from the file extension, None if unknown
+	extension = path.splitext(filepath)[1].lower()
+	if (extension == ".csv"):
+		return "csv"
+	elif (extension in (".jsonl", ".ndjson")):
+		return "jsonl"
+	return None
+
+def read_rows(filepath, fmt=None):
+	# yields [row_number, row: dict?] for every record of filepath, row is None if the record could not be parsed
+	# csv: header row naming the columns (isbn, title, type, quantity), row_number is the line of the record
+	# jsonl: one json object per line, blank lines are skipped
+	fmt = fmt if fmt != None else detect_format(filepath)
+	if (fmt == "csv"):
+		with open(filepath, "r", encoding="utf-8-sig", newline="") as f:
+			reader = csv.reader(f)
+			header = next(reader, None)
+			if (header == None):
+				return
+			header = [column.strip().lower() for column in header]
+			width = len(header)
+
+			for record in reader:
+				if (len(record) == width):
+					yield [reader.line_num, dict(zip(header, record))]
+				elif (len(record) > 0):
+					yield [reader.line_num, None] # wrong number of columns
+	elif (fmt == "jsonl"):
+		with open(filepath, "rb") as f:
+			line_num = 0
+			for line in f:
+				line_num += 1
+				if (line.strip() == b""):
+					continue
+				try:
+					row = json.loads(line.decode("utf-8-sig")) # decoded here, json.loads() would detect the encoding of every line
+				except ValueError:
+					row = None
+				yield [line_num, row if isinstance(row, dict) else None]
+	elif (fmt == None):
+		raise ValueError("can not tell the format of {} from its extension, expected .csv or .jsonl".format(filepath))
+	else:
+		raise ValueError("unknown import format '{}', expected csv or jsonl".format(fmt))
+
+def chunked(iterable, size):
+	# yields lists of up to size consecutive items of iterable
+	chunk = []
+	for item in iterable:
+		chunk.append(item)
+		if (len(chunk) == size):
+			yield chunk
+			chunk = []
+
+	if (len(chunk) > 0):
+		yield chunk
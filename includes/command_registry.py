@@ -0,0 +1,117 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+class BKTree:
+	# burkhard-keller tree over words, finds every word within a bounded edit distance of a query
+	# without computing the distance to every word (children are keyed by their distance to the parent)
+	def __init__(self, distance):
+		# distance: function (a: str, b: str) -> int, must be a metric (e.g. levenshtein distance)
+		self.distance = distance
+		self.root = None # [word, {distance: child node}]
+		self.size = 0
+
+	def add(self, word):
+		if (self.root == None):
+			self.root = [word, {}]
+			self.size += 1
+			return
+
+		node = self.root
+		while True:
+			d = self.distance(word, node[0])
+			if (d == 0):
+				return # already present
+
+			child = node[1].get(d)
+			if (child == None):
+				node[1][d] = [word, {}]
+				self.size += 1
+				return
+			node = child
+
+	def search(self, word, max_distance):
+		# returns [distance, word][] of every word within max_distance of word (unordered)
+		found = []
+		stack = [self.root] if self.root != None else []
+		while len(stack) > 0:
+			node = stack.pop()
+			d = self.distance(word, node[0])
+			if (d <= max_distance):
+				found.append([d, node[0]])
+
+			# triangle inequality, only children at distance d -max_distance .. d +max_distance can be close enough
+			for child_d, child in node[1].items():
+				if (d -max_distance <= child_d <= d +max_distance):
+					stack.append(child)
+
+		return found
+
+class Command:
+	# registered command, handler: function (args: dict, flags: str[])?
+	def __init__(self, name, handler, level, help, aliases, order):
+		self.name = name
+		self.handler = handler
+		self.level = level # minimum access level
+		self.help = help # help text (None to leave it out of help_text())
+		self.aliases = aliases
+		self.order = order # registration order (help text order, breaks suggestion ties)
+
+class CommandRegistry:
+	# commands by access level, built once; lookup() is one dict access for the user's access level
+	# and near misses are suggested from a BK-tree of the commands the user can run
+	def __init__(self, distance, levels=1, max_distance=2):
+		# distance: function (a: str, b: str) -> int (e.g. UtilCLI.levenshtein_distance)
+		# levels: int (number of access levels), max_distance: int (edit distance up to which suggestions are made)
+		self.distance = distance
+		self.max_distance = max_distance
+		self.commands = [] # Command[] in registration order
+		self.tables = [{} for level in range(levels)] # access level -> {name or alias: Command} (commands at or below it)
+		self._trees = [None] *levels # access level -> BKTree, built on first suggest()
+
+	def register(self, name, handler=None, level=0, help=None, aliases=()):
+		# name: str, handler: function (args, flags)?, level: int (minimum access level), help: str?, aliases: str[]
+		command = Command(name, handler, level, help, aliases, len(self.commands))
+		self.commands.append(command)
+		for access_level in range(level, len(self.tables)):
+			for key in (name,) +tuple(aliases):
+				self.tables[access_level][key] = command
+			self._trees[access_level] = None
+
+		return command
+
+	def lookup(self, name, access_level=0):
+		# returns the Command registered under name (case-insensitive) for a user at access_level, or None
+		return self.tables[access_level].get(name.lower())
+
+	def suggest(self, name, access_level=0):
+		# returns the closest command name (or alias) within self.max_distance of name, or None
+		tree = self._trees[access_level]
+		if (tree == None):
+			tree = BKTree(self.distance)
+			for key in self.tables[access_level]:
+				tree.add(key)
+			self._trees[access_level] = tree
+
+		found = tree.search(name.lower(), self.max_distance)
+		if (len(found) == 0):
+			return None
+
+		table = self.tables[access_level]
+		return min(found, key=lambda entry: [entry[0], table[entry[1]].order])[1]
+
+	def help_text(self, access_level=0, entry_format="{:<7}| {}\n", separator="\n"):
+		# help text of every command available at access_level, grouped by level (lowest first)
+		# entry_format: str (formatted with name, help), separator: str (before every group and between entries)
+		text = ""
+		for level in range(access_level +1):
+			entries = []
+			for command in self.commands:
+				if (command.level == level and command.help != None):
+					entry = entry_format.format(command.name, command.help)
+					for alias in command.aliases:
+						entry += "\t [@{}] alias for this command\n".format(alias)
+					entries.append(entry)
+
+			if (len(entries) > 0):
+				text += separator +separator.join(entries)
+
+		return text
@@ -1,24 +1,67 @@
 # Author: Chong Cheng Hock
 # Admin No / Grp: 230643M / AA2301
 from os import path
+import os
 import json
+import re
+import mmap
+import time
+import atexit
+import threading
+from collections import deque
+
+try:
+	# advisory file locks (shared mode), fcntl on posix and msvcrt on windows
+	import fcntl
+except ImportError:
+	fcntl = None
+	import msvcrt
+
+from includes import binary_snapshot
+from includes.record_merge import MISSING, plain, merge_values
 
 class DatabaseEngine:
 	def __init__(self):
-		# scheduler loop, to trigger attached readers every minute (depending on rate)
+		# scheduler thread, to trigger attached readers every 30 seconds (depending on rate)
 		self.running = False # running state
-		self.update_rate = 30 # pushes updates every 30 seconds
+		self.update_rate = 30 # pushes updates every 30 seconds (wall clock)
+
+		# durability of autosaves, fsync on every n-th autosave cycle only (0 to never fsync while autosaving)
+		# writes stay atomic either way, a crash can only lose the cycles since the last fsync (drains always fsync)
+		self.fsync_interval = 1
+		self._cycle = 0 # autosave cycles so far
 
 		# created readers go here
 		self.created_readers = {}
 
-		# internal clock (seconds)
-		self._lastupdate = -1
+		# background autosave thread (see start())
+		self._thread = None
+		self._stop_event = threading.Event()
+		self._flush_lock = threading.Lock() # one flush at a time (autosave vs logout)
+
+		# autosave metrics, updated by flush()
+		self.metrics = {
+			"flushes": 0, # flush() calls that pushed at least one reader
+			"bytes_written": 0, # total bytes written by pushes
+			"last_flush_bytes": 0,
+			"last_flush_duration": 0.0, # seconds
+			"total_flush_duration": 0.0, # seconds
+			"fsyncs": 0, # total fsync calls made by flushes
+			"last_error": None # str? (repr of the last exception raised by an autosave)
+		}
 	
-	def create_reader(self, filename):
+	def create_reader(self, filename, backend="json", **options):
 		# creates a new reader and queues it in the scheduler for constant updates (writes)
+		# backend: str ("json" -> DatabaseReader, "binary" -> DatabaseReader with binary snapshots, "sqlite" -> SQLiteReader)
+		# options are passed on to the reader (e.g. wal=True)
 		# returns a reader_uid which is a string to uniquely identify the reader
-		new_reader = DatabaseReader(filename)
+		if (backend == "sqlite"):
+			from includes.sqlite_reader import SQLiteReader # sqlite3 is only loaded when used
+			new_reader = SQLiteReader(filename, **options)
+		elif (backend == "binary"):
+			new_reader = DatabaseReader(filename, snapshot="binary", **options)
+		else:
+			new_reader = DatabaseReader(filename, **options)
 
 		self.created_readers[new_reader.hash] = new_reader
 
@@ -28,74 +71,929 @@ class DatabaseEngine:
 		# reader_uid: string to uniquely identify the reader object
 		# to delete the created reader instance
 		if (self.created_readers.get(reader_uid)):
-			del created_readers[reader_uid] # remove entry for existing key
-	
-	def run(self):
+			del self.created_readers[reader_uid] # remove entry for existing key
+
+	def transaction(self, *readers):
+		# returns a Transaction over readers, usage: with database_engine.transaction(reader, ...): check, then write
+		return Transaction(readers)
+
+	def sync(self):
+		# picks up changes written by other terminals and saves the unsaved changes of this one (shared readers only)
+		# called by the thread working on the readers (before every command or request), see flush()
+		# returns the number of records changed
+		changed = 0
+		for reader in list(self.created_readers.values()):
+			if getattr(reader, "shared", False):
+				changed += reader.sync()
+				if reader.dirty:
+					reader.push()
+		return changed
+
+	def start(self):
+		# starts autosaving in a daemon thread, does not block the caller (input() loop of LibCLI)
 		if self.running:
 			return # already running
 		else:
 			self.running = True
 
+		self._stop_event.clear()
+		self._thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+		self._thread.start()
+
+		# drain on interpreter exit too (e.g. uncaught exceptions), stop() is safe to call twice
+		atexit.register(self.stop)
+
+	def stop(self):
+		# stops the autosave thread and drains every unsaved change (called on logout and Ctrl + C)
+		if self.running:
+			self.running = False
+			self._stop_event.set()
+			self._thread.join()
+
+		self.flush(durable=True)
+
+	def run(self):
+		# autosave loop (runs in the thread created by start())
+		# waits on wall clock time, wakes up early only to stop
+		while not self._stop_event.wait(self.update_rate):
+			self._cycle += 1
+			durable = self.fsync_interval > 0 and self._cycle %self.fsync_interval == 0
+			try:
+				self.flush(durable, shared=False) # push readers with changes
+			except Exception as e:
+				# keep autosaving, the next cycle will retry the dirty readers
+				self.metrics["last_error"] = repr(e)
+
+	def flush(self, durable=True, shared=True):
+		# pushes every reader with unsaved changes, clean readers are skipped entirely
+		# durable: boolean, if true the written files are fsync-ed (directory entries once for all readers)
+		# shared: boolean, if false shared readers are left to the thread working on them (sync(), transactions)
+		# pushing one applies what other terminals wrote, which must not happen while that thread iterates the records
+		# returns the number of readers pushed
+		with self._flush_lock:
+			start = time.perf_counter()
+			pushed, written, fsyncs = 0, 0, 0
+			directories = set()
+			for reader in list(self.created_readers.values()):
+				if not shared and getattr(reader, "shared", False):
+					continue
+
+				if reader.dirty:
+					written += reader.push(durable, sync_dir=False)
+					fsyncs += reader.fsyncs
+					directories.add(reader.directory)
+					pushed += 1
+
+			if durable:
+				# batched, readers sharing a directory only need one directory fsync
+				for directory in directories:
+					fsync_dir(directory)
+					fsyncs += 1
+
+			if (pushed > 0):
+				self.metrics["fsyncs"] += fsyncs
+				duration = time.perf_counter() -start
+				self.metrics["flushes"] += 1
+				self.metrics["bytes_written"] += written
+				self.metrics["last_flush_bytes"] = written
+				self.metrics["last_flush_duration"] = duration
+				self.metrics["total_flush_duration"] += duration
+
+		return pushed
+
+class TrackedDict(dict):
+	# dict that reports in place changes to the reader owning it (see track())
+	__slots__ = ("_owner", "_key", "__weakref__") # weakly referenced by SQLiteReader
+
+	def __setitem__(self, key, value):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			dict.__setitem__(self, key, track(value, self._owner, self._key))
+
+	def __delitem__(self, key):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			dict.__delitem__(self, key)
+
+	def pop(self, *args):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			return dict.pop(self, *args)
+
+	def popitem(self):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			return dict.popitem(self)
+
+	def clear(self):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			dict.clear(self)
+
+	def setdefault(self, key, default=None):
+		if not (key in self):
+			self[key] = default
+		return dict.__getitem__(self, key)
+
+	def update(self, *args, **kwargs):
+		for key, value in dict(*args, **kwargs).items():
+			self[key] = value
+
+	def __ior__(self, other):
+		self.update(other)
+		return self
+
+class TrackedList(list):
+	# list that reports in place changes to the reader owning it (see track())
+	__slots__ = ("_owner", "_key", "__weakref__") # weakly referenced by SQLiteReader
+
+	def __setitem__(self, idx, value):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			if isinstance(idx, slice):
+				value = [track(x, self._owner, self._key) for x in value]
+			else:
+				value = track(value, self._owner, self._key)
+			list.__setitem__(self, idx, value)
+
+	def __delitem__(self, idx):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			list.__delitem__(self, idx)
+
+	def append(self, value):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			list.append(self, track(value, self._owner, self._key))
+
+	def extend(self, values):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			list.extend(self, [track(x, self._owner, self._key) for x in values])
+
+	def __iadd__(self, values):
+		self.extend(values)
+		return self
+
+	def __imul__(self, n):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			return list.__imul__(self, n)
 
-		self._lastupdate = time.process_time() # cpu clock time
-		while self.running:
-			# single thread so no de-sync worries :)
-			if (time.process_time() - self._lastupdate > self._lastupdate):
-				for reader in self.created_readers.values():
-					reader.push() # call .push() method on readers
-				
-				self._lastupdate = time.process_time(); # update timer
-			time.sleep() # called on every few cycles if possible
+	def insert(self, idx, value):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			list.insert(self, idx, track(value, self._owner, self._key))
+
+	def pop(self, *args):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			return list.pop(self, *args)
+
+	def remove(self, value):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			list.remove(self, value)
+
+	def clear(self):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			list.clear(self)
+
+	def sort(self, *args, **kwargs):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			list.sort(self, *args, **kwargs)
+
+	def reverse(self):
+		with self._owner.lock:
+			self._owner.touch(self._key)
+			list.reverse(self)
+
+def track(value, owner, key):
+	# value: any (json compatible), owner: DatabaseReader, key: str (top level key value lives under)
+	# returns value with every nested dict/list replaced by a tracked copy that calls owner.touch(key) before changing
+	# (while holding owner.lock, so a push in the autosave thread never serializes a half changed value)
+	# e.g. users["john"]["loaning"].append(...) marks "john" as changed without going through DatabaseReader.__setitem__
+	if isinstance(value, dict):
+		tracked = TrackedDict()
+		for k, v in value.items():
+			dict.__setitem__(tracked, k, track(v, owner, key))
+	elif isinstance(value, list):
+		tracked = TrackedList([track(v, owner, key) for v in value])
+	else:
+		return value # immutable (str, int, float, bool, None)
+
+	tracked._owner = owner
+	tracked._key = key
+	return tracked
+
+def fsync_dir(directory):
+	# persists renames/removals of files within directory (no-op where directories can not be opened, e.g. windows)
+	if (os.name == "nt"):
+		return
+
+	fd = os.open(directory, os.O_RDONLY)
+	try:
+		os.fsync(fd)
+	finally:
+		os.close(fd)
+
+def write_atomic(filepath, data, durable=True):
+	# filepath: str, data: bytes
+	# replaces filepath with data, readers (and crashes) see either the old or the new file, never a truncated one
+	# returns the number of fsync calls made (directory entry excluded, see fsync_dir())
+	tmp_path = filepath +".tmp"
+	with open(tmp_path, "wb") as f:
+		f.write(data)
+		if durable:
+			f.flush()
+			os.fsync(f.fileno())
+
+	os.replace(tmp_path, filepath) # atomic rename (same directory)
+	return 1 if durable else 0
+
+class LazyRecord:
+	# top level value of a lazily loaded file that has not been decoded yet, [start, end) byte range within the mapped file
+	__slots__ = ("start", "end")
+
+	def __init__(self, start, end):
+		self.start = start
+		self.end = end
+
+	def __repr__(self):
+		return "<LazyRecord {}:{}>".format(self.start, self.end)
+
+# top level key line of a snapshot written by DatabaseReader (json.dumps(indent="\t")), deeper lines have more tabs
+# and strings never contain a raw newline, so only top level keys can match
+TOP_LEVEL_KEY = re.compile(rb'\n\t("(?:[^"\\\n]|\\.)*"): ') # literal prefix, much faster to search than a ^ anchor
+
+def index_snapshot(data):
+	# data: bytes-like (whole snapshot file)
+	# returns {key: LazyRecord} locating every top level value without decoding it, None if data is not laid out
+	# the way DatabaseReader writes it (caller falls back to decoding the whole file)
+	records = {}
+	prev = None # [key, value start] of the previous entry
+	for match in TOP_LEVEL_KEY.finditer(data):
+		# match starts at the newline ending the previous line
+		if (prev != None):
+			if (data[match.start() -1: match.start()] != b","):
+				return None
+			records[prev[0]] = LazyRecord(prev[1], match.start() -1)
+		elif (match.start() != 1 or data[:1] != b"{"):
+			# first key line must directly follow the opening brace
+			return None
+
+		raw_key = match.group(1)
+		key = raw_key[1: -1].decode("utf-8") if not (b"\\" in raw_key) else json.loads(raw_key) # only escaped keys need the decoder
+		prev = [key, match.end()]
+
+	if (prev == None):
+		return None # empty (or not indented), nothing to gain
+
+	end = len(data)
+	while end > 0 and data[end -1: end] in (b"\n", b"\r", b" ", b"\t"):
+		end -= 1 # trailing whitespace
+	if (data[end -2: end] != b"\n}"):
+		return None
+	records[prev[0]] = LazyRecord(prev[1], end -2)
+	return records
+
+class FileLock:
+	# advisory exclusive lock on a file, held across processes (several LibCLI terminals sharing database/)
+	# usage: with FileLock(path): ...
+	def __init__(self, filepath):
+		self.filepath = filepath
+		self._f = None
+
+	def __enter__(self):
+		self._f = open(self.filepath, "a+b")
+		if (fcntl != None):
+			fcntl.flock(self._f.fileno(), fcntl.LOCK_EX) # blocks until released
+		else:
+			self._f.seek(0)
+			while True:
+				try:
+					msvcrt.locking(self._f.fileno(), msvcrt.LK_LOCK, 1) # retries for ~10s before raising
+					break
+				except OSError:
+					pass
+		return self
+
+	def __exit__(self, *args):
+		if (fcntl != None):
+			fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+		else:
+			self._f.seek(0)
+			msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+		self._f.close()
+		self._f = None
+
+class ReaderSnapshot:
+	# point in time view of a reader for long reads (e.g. exports) while the reader keeps changing
+	# copy-on-write, a key changed after the snapshot was opened keeps its old value (pre-image) here, see preserve()
+	# usage: with reader.open_snapshot() as snapshot: ...
+	def __init__(self, reader):
+		self.reader = reader
+		self.preimages = {} # key -> plain value before its first change since opening (MISSING if it did not exist)
+		with reader.lock:
+			reader.snapshots.append(self)
+
+	def get(self, key, default=None):
+		# unchanged keys return the live record, read it with reader.lock held if it may change meanwhile
+		with self.reader.lock:
+			if (key in self.preimages):
+				value = self.preimages[key]
+				return default if value is MISSING else value
+			return self.reader.get(key, default)
+
+	def changed(self, key):
+		# returns true if key changed since the snapshot was opened
+		return key in self.preimages
+
+	def close(self):
+		with self.reader.lock:
+			if self in self.reader.snapshots:
+				self.reader.snapshots.remove(self)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+def preserve(reader, key):
+	# keeps the current value of key in every open snapshot of reader that does not have it yet
+	# call before changing key, with reader.lock held
+	value = None
+	for snapshot in reader.snapshots:
+		if not (key in snapshot.preimages):
+			if (value == None):
+				value = plain(reader.get(key, MISSING)) # one copy shared by the snapshots (never modified)
+			snapshot.preimages[key] = value
+
+def refill(record, value, owner, key):
+	# replaces the contents of a tracked record with value in place (without reporting a change)
+	# so that references held elsewhere (e.g. user_data in LibCLI) stay attached to the reader
+	# returns false if record can not hold value (caller replaces the record instead)
+	if isinstance(record, TrackedDict) and isinstance(value, dict):
+		dict.clear(record)
+		for k, v in value.items():
+			dict.__setitem__(record, k, track(v, owner, key))
+		return True
+	elif isinstance(record, TrackedList) and isinstance(value, list):
+		list.__setitem__(record, slice(None), [track(v, owner, key) for v in value])
+		return True
+	elif hasattr(record, "refill"):
+		return record.refill(value)
+
+	return False
+
+def read_snapshot(filepath):
+	# returns the content of a snapshot file, json or binary (told apart by binary_snapshot.MAGIC)
+	with open(filepath, "rb") as f:
+		data = f.read()
+
+	if binary_snapshot.is_binary(data):
+		return binary_snapshot.decode(data)
+	return json.loads(data)
 
 class DatabaseReader:
 	# reader for database files (instances of the big engine)
-	def __init__(self, filename):
+	def __init__(self, filename, wal=False, directory=None, lazy=False, snapshot="json", wrap=track, shared=False):
+		# wal: boolean, if true changes are appended to a write-ahead log (<filename>.wal) on push() instead of rewriting the whole file
+		# directory: str? (defaults to the database folder)
+		# lazy: boolean, if true the file is memory mapped and records are only decoded when first accessed (json snapshots only)
+		# snapshot: str ("json" or "binary", binary snapshots are kept in <name>.bin next to the json file, see binary_snapshot)
+		# wrap: function (value, owner, key) -> value, turns top level records into their in memory form (e.g. book_store.wrap_book)
+		# shared: boolean, several processes (terminals) may use the same files, see sync() (implies wal, not lazy)
 		self.filename = filename
-		self.filepath = path.join(path.dirname(path.dirname(__file__)), "database", filename) # build filepath once
-		self.content = None; # will be assigned
+		self.directory = directory if directory != None else path.join(path.dirname(path.dirname(path.abspath(__file__))), "database")
+		self.snapshot = snapshot
+		self.wrap = wrap
 
-		# load content
-		with open(self.filepath, "r") as f:
-			self.content = json.load(f)
-		
 		# use self.filename as hash without the .json extension
 		self.hash = "".join(self.filename.split(".")[:-1])
 
-	def get(self, *args):
+		self.json_path = path.join(self.directory, filename)
+		self.filepath = self.json_path if snapshot == "json" else path.join(self.directory, self.hash +".bin") # build filepath once
+		self.content = None; # will be assigned
+		self.fsyncs = 0 # fsync calls made by the last push()
+
+		# write-ahead log
+		self.wal = wal or shared
+		self.wal_path = self.filepath +".wal"
+		self.checkpoint_every = 1000 # compact the log into the snapshot once it holds this many records
+		self._wal_records = 0 # records currently in the log file
+		self._wal_offset = 0 # bytes of the log file applied to self.content
+
+		# top level keys changed (set, deleted or modified in place) since the last push
+		self.dirty_keys = set()
+
+		# shared mode, every push/sync takes the file lock, applies the log records other terminals appended since
+		# (merging them into records with unsaved local changes) and only then appends its own records
+		self.shared = shared
+		self.lock_path = self.filepath +".lock"
+		self.base = {} # key -> plain copy of the last saved value of a dirty key (MISSING if it did not exist), merge base
+		self.changes = deque() # [key, old value?, new value?] applied from other terminals, drained by the application
+		self.merges = 0 # records with local changes merged with changes from other terminals
+		self._snapshot_id = None # identity of the snapshot file last loaded or written (replaced by another terminal's checkpoint)
+		self._sync_lock = threading.Lock() # file lock holder within this process (autosave thread vs main thread)
+
+		self.snapshots = [] # open ReaderSnapshot objects (copy-on-write), see open_snapshot()
+
+		# held while content changes and while push() takes a copy of it (autosave runs in another thread)
+		self.lock = threading.RLock()
+
+		# load content (shared: while no other terminal is writing)
+		self._map = None # mmap of the snapshot (lazy mode), source of LazyRecord values in self.content
+		with self._shared_lock():
+			if (snapshot == "binary" and not path.exists(self.filepath)):
+				# first use, import the json file (and its write-ahead log) then write the binary snapshot
+				self.content = DatabaseReader(filename, wal=True, directory=self.directory).content
+				self._checkpoint()
+			elif not (lazy and not shared and snapshot == "json" and self._load_lazy()):
+				# shared mode never maps the snapshot, other terminals replace it
+				self.content = read_snapshot(self.filepath)
+			self._snapshot_id = self._stat_snapshot()
+
+			if self.wal:
+				# replay changes made since the last checkpoint
+				self._replay_wal()
+
+		# report in place changes of nested values back to this reader
+		for key, value in self.content.items():
+			if not isinstance(value, LazyRecord):
+				self.content[key] = wrap(value, self, key)
+
+	def get(self, key, default=None):
 		# wrapper
-		return self.content.get(*args)
+		value = self.content.get(key, default)
+		if isinstance(value, LazyRecord):
+			value = self._decode(key)
+		return value
 
 	def __getitem__(self, key):
 		# wrapper for referencing the data directly
-		if (key in self.content):
-			return self.content[key]
-		else:
-			return None
+		return self.get(key)
+
+	def _load_lazy(self):
+		# maps the snapshot and indexes its top level keys, returns false if the file can not be loaded lazily
+		with open(self.filepath, "rb") as f:
+			if (path.getsize(self.filepath) == 0):
+				return False
+			mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		records = index_snapshot(mapped)
+		if (records == None):
+			mapped.close()
+			return False
+
+		self._map = mapped
+		self.content = records
+		return True
+
+	def _decode(self, key):
+		# decodes the LazyRecord stored under key, returns the (tracked) value
+		with self.lock:
+			value = self.content[key]
+			if isinstance(value, LazyRecord):
+				value = self.wrap(json.loads(self._map[value.start: value.end]), self, key)
+				self.content[key] = value
+			return value
 
 	def __setitem__(self, key, value):
-		self.content[key] = value
+		value = self.wrap(value, self, key)
+		with self.lock:
+			self.touch(key)
+			self.content[key] = value
 
 	def __delitem__(self, key):
 		# wrapper for the del operation
-		del self.content[key]
+		with self.lock:
+			self.touch(key)
+			del self.content[key]
+
+	def touch(self, key):
+		# marks key as changed, called by __setitem__/__delitem__ and by tracked values modified in place (before changing)
+		if (len(self.snapshots) > 0):
+			preserve(self, key)
+		if self.shared and not (key in self.base):
+			# keep the saved value as merge base
+			self.base[key] = plain(self.get(key, MISSING))
+		self.dirty_keys.add(key)
+
+	@property
+	def dirty(self):
+		# true if there are changes not pushed yet
+		return len(self.dirty_keys) > 0
 
 	def __contains__(self, item):
 		# for 'in' operator
 		return item in self.content
 
 	def __iter__(self):
-		return iter(self.content.keys())
+		# iterates over the keys as they are now, records added or removed meanwhile (e.g. by sync()) do not break the iteration
+		with self.lock:
+			return iter(list(self.content))
 		# self._idx = 0;
 		# self._idx_lim = len(self.content)
 		# return self
 
 	def __repr__(self):
 		# output the data instead
-		return str(self.content)
+		return str({key: self[key] for key in self.content})
+
+	def project(self, field):
+		# returns [key, record[field]][] for every record
+		# lazy records are decoded for the field only and left undecoded (so e.g. building the title index does not keep every book)
+		pairs = []
+		with self.lock:
+			for key, record in self.content.items():
+				if isinstance(record, LazyRecord):
+					pairs.append([key, json.loads(self._map[record.start: record.end])[field]])
+				else:
+					pairs.append([key, record[field]])
+		return pairs
 	
-	def push(self):
-		# save to file
-		with open(self.filepath, "w") as f:
-			f.write(json.dumps(self.content, indent="\t"))
+	def push(self, durable=True, sync_dir=True):
+		# save to file, does nothing if there are no changes
+		# durable: boolean (fsync written files), sync_dir: boolean (fsync the directory after renaming, DatabaseEngine.flush() batches this)
+		# returns the number of bytes written
+		self.fsyncs = 0
+		if self.shared:
+			with self._shared_lock():
+				# merge what other terminals wrote first, our records go after theirs
+				self._catch_up()
+				return self._push(durable, sync_dir)
+
+		return self._push(durable, sync_dir)
+
+	def _push(self, durable, sync_dir):
+		if not self.dirty:
+			return 0
+
+		if self.wal and self._wal_records +len(self.dirty_keys) < self.checkpoint_every:
+			# append one record per changed top level key only
+			return self._append_wal(durable)
+		else:
+			# plain json files can only be rewritten as a whole
+			return self._checkpoint(durable, sync_dir)
+
+	def checkpoint(self, durable=True, sync_dir=True):
+		# rewrites the whole snapshot atomically, log records are no longer needed afterwards
+		# returns the number of bytes written
+		self.fsyncs = 0
+		with self._shared_lock():
+			if self.shared:
+				self._catch_up()
+			return self._checkpoint(durable, sync_dir)
+
+	def _checkpoint(self, durable=True, sync_dir=True):
+		with self.lock:
+			# encode the log records and the snapshot from the same state
+			pushed_keys = self.dirty_keys
+			pushed_base = self._release_base(pushed_keys)
+			wal_data = self._encode_wal(pushed_keys) if self.wal else b""
+			if (self.snapshot == "binary"):
+				data = binary_snapshot.encode(self.content)
+			elif (self._map == None):
+				data = json.dumps(self.content, indent="\t", default=dict).encode("utf-8") # default: mapping records (e.g. BookRecord)
+			else:
+				data, offsets = self._encode_snapshot()
+			self.dirty_keys = set()
+
+		try:
+			if (len(wal_data) > 0):
+				# log the pending changes first, so that replaying the log over either snapshot (if we crash
+				# before the log is removed) ends up at the same state
+				self._write_wal(wal_data, durable)
+
+			if (self._map != None and os.name == "nt"):
+				# mapped files can not be replaced on windows, write with the map closed (and readers held back)
+				with self.lock:
+					self._map.close()
+					try:
+						self.fsyncs += write_atomic(self.filepath, data, durable)
+					except OSError:
+						offsets = None # old snapshot is still in place
+						raise
+					finally:
+						self._remap(offsets)
+			else:
+				self.fsyncs += write_atomic(self.filepath, data, durable)
+				if (self._map != None):
+					with self.lock:
+						self._remap(offsets)
+		except OSError:
+			# not saved, keep the keys dirty for the next push
+			self._restore_dirty(pushed_keys, pushed_base)
+			raise
+		written = len(wal_data) +len(data)
+		self._snapshot_id = self._stat_snapshot()
+
+		if self.wal:
+			if path.exists(self.wal_path):
+				os.remove(self.wal_path)
+
+			self._wal_records = 0
+			self._wal_offset = 0
+
+		if durable and sync_dir:
+			fsync_dir(self.directory)
+			self.fsyncs += 1
+
+		return written
+
+	def export(self, filepath, snapshot):
+		# writes the current content to filepath (atomically)
+		# snapshot: str ("json" or "binary")
+		# returns the number of bytes written
+		if (filepath == self.filepath):
+			# own snapshot, anything else would fall out of step with the write-ahead log
+			return self.checkpoint()
+
+		with self.lock:
+			content = {key: self.get(key) for key in self.content} # lazy records decoded
+			if (snapshot == "binary"):
+				data = binary_snapshot.encode(content)
+			else:
+				data = json.dumps(content, indent="\t", default=dict).encode("utf-8")
+
+		write_atomic(filepath, data, True)
+		if path.exists(filepath +".wal"):
+			# log of the snapshot that was just replaced, replaying it would bring back older values
+			os.remove(filepath +".wal")
+		fsync_dir(path.dirname(filepath))
+		return len(data)
+
+	def import_from(self, filepath):
+		# replaces the content with the snapshot at filepath (json or binary), every key is pushed on the next push()
+		content = read_snapshot(filepath)
+		with self.lock:
+			for key in set(self.content) | set(content):
+				self.touch(key)
+			self.content = {key: self.wrap(value, self, key) for key, value in content.items()}
+
+	def _encode_snapshot(self):
+		# lazy mode, encodes the snapshot like json.dumps(self.content, indent="\t") but copies undecoded records
+		# straight from the mapped file instead of decoding and encoding them again
+		# returns [data: bytes, offsets: {key: [start, end]} of the copied records within data]
+		if (len(self.content) == 0):
+			return [b"{}", {}]
+
+		parts = [b"{\n"]
+		offsets = {}
+		pos = 2
+		for key, value in self.content.items():
+			if (pos > 2):
+				parts.append(b",\n")
+				pos += 2
+
+			prefix = ("\t" +json.dumps(key) +": ").encode("utf-8")
+			parts.append(prefix)
+			pos += len(prefix)
+
+			if isinstance(value, LazyRecord):
+				encoded = self._map[value.start: value.end]
+				offsets[key] = [pos, pos +len(encoded)]
+			else:
+				# nested lines are indented one level deeper than at the top of a file
+				encoded = json.dumps(value, indent="\t", default=dict).replace("\n", "\n\t").encode("utf-8")
+			parts.append(encoded)
+			pos += len(encoded)
+
+		parts.append(b"\n}")
+		return [b"".join(parts), offsets]
+
+	def _remap(self, offsets):
+		# maps the snapshot file again after a checkpoint (call with self.lock held)
+		# offsets: {key: [start, end]}? (locations of the undecoded records in the new snapshot, None if it was not replaced)
+		with open(self.filepath, "rb") as f:
+			mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		if (offsets != None):
+			for key, value in self.content.items():
+				if isinstance(value, LazyRecord):
+					value.start, value.end = offsets[key]
+
+		if not self._map.closed:
+			self._map.close()
+		self._map = mapped
+
+	def _append_wal(self, durable):
+		# appends one record per dirty key to the log, returns the number of bytes written
+		with self.lock:
+			# encode under the lock, write outside of it
+			pushed_keys = self.dirty_keys
+			pushed_base = self._release_base(pushed_keys)
+			data = self._encode_wal(pushed_keys)
+			self.dirty_keys = set()
+
+		try:
+			self._write_wal(data, durable)
+		except OSError:
+			# not saved, keep the keys dirty for the next push
+			self._restore_dirty(pushed_keys, pushed_base)
+			raise
+
+		return len(data)
+
+	def _encode_wal(self, keys):
+		# returns the log records (bytes) for keys, a set record with the current value or a delete record
+		# (logs written by older versions may carry an extra version number after the value, it is ignored)
+		records = []
+		for key in keys:
+			if (key in self.content):
+				records.append(json.dumps(["s", key, self.get(key)], separators=(",", ":"), default=dict) +"\n")
+			else:
+				records.append(json.dumps(["d", key], separators=(",", ":")) +"\n")
+
+		return "".join(records).encode("utf-8")
+
+	def _write_wal(self, data, durable):
+		with open(self.wal_path, "ab") as f:
+			f.write(data)
+			if durable:
+				f.flush()
+				os.fsync(f.fileno())
+				self.fsyncs += 1
+
+		self._wal_records += data.count(b"\n")
+		self._wal_offset += len(data) # appended at the end, which we had caught up to
+
+	def _read_wal(self):
+		# returns the log records after self._wal_offset and advances it
+		if not path.exists(self.wal_path):
+			return []
+
+		records = []
+		valid_end = self._wal_offset # byte offset after the last complete record
+		with open(self.wal_path, "rb") as f:
+			f.seek(self._wal_offset)
+			for line in f:
+				try:
+					if not line.endswith(b"\n"):
+						raise ValueError("incomplete record")
+					records.append(json.loads(line))
+				except ValueError:
+					# torn record (crashed while appending), nothing after it was written
+					break
+				valid_end += len(line)
+
+		if (valid_end != path.getsize(self.wal_path)):
+			# cut off the torn record so new records are not appended onto it
+			with open(self.wal_path, "r+b") as f:
+				f.truncate(valid_end)
+
+		self._wal_offset = valid_end
+		self._wal_records += len(records)
+		return records
+
+	def _replay_wal(self):
+		# applies the records of the log file on top of the loaded snapshot
+		for record in self._read_wal():
+			if (record[0] == "s"):
+				self.content[record[1]] = record[2]
+			elif (record[0] == "d"):
+				self.content.pop(record[1], None)
+
+	def _shared_lock(self):
+		# file lock (and its holder within this process) in shared mode, a no-op otherwise
+		if not self.shared:
+			return _NO_LOCK
+		return _Locks(self._sync_lock, FileLock(self.lock_path))
+
+	def _stat_snapshot(self):
+		# identity of the snapshot file (a checkpoint replaces it with a new file)
+		try:
+			stat = os.stat(self.filepath)
+		except FileNotFoundError:
+			return None
+		return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+	def _release_base(self, keys):
+		# drops the merge bases of keys about to be saved (call with self.lock held), returns them for _restore_dirty()
+		return {key: self.base.pop(key) for key in keys if key in self.base}
+
+	def _restore_dirty(self, keys, base):
+		# a push failed, keys stay dirty with their old merge bases
+		with self.lock:
+			self.dirty_keys |= keys
+			for key, value in base.items():
+				self.base.setdefault(key, value)
+
+	def open_snapshot(self):
+		# returns a ReaderSnapshot of the current content (close it when done, changes are copied for it until then)
+		return ReaderSnapshot(self)
+
+	def sync(self):
+		# shared mode, applies the changes other terminals saved since the last sync/push
+		# returns the number of records that changed
+		if not self.shared:
+			return 0
+
+		with self._shared_lock():
+			return self._catch_up()
+
+	def _catch_up(self):
+		# call with the shared lock held
+		# reads what other terminals appended to the log (everything, if one of them checkpointed) and merges it in
+		incoming = {} # key -> value or MISSING (plain, as saved by the other terminals)
+		snapshot_id = self._stat_snapshot()
+		wal_size = path.getsize(self.wal_path) if path.exists(self.wal_path) else 0
+		if (snapshot_id != self._snapshot_id or wal_size < self._wal_offset):
+			# snapshot replaced by another terminal's checkpoint, start over from it (only saved values are compared)
+			incoming = read_snapshot(self.filepath)
+			for key in self.content:
+				if not (key in incoming):
+					incoming[key] = MISSING
+			self._snapshot_id = snapshot_id
+			self._wal_offset = 0
+			self._wal_records = 0
+
+		for record in self._read_wal():
+			incoming[record[1]] = record[2] if record[0] == "s" else MISSING
+
+		changed = 0
+		with self.lock:
+			for key, theirs in incoming.items():
+				ours = plain(self.get(key, MISSING))
+				if (key in self.dirty_keys):
+					# unsaved local changes, three way merge against the value both sides started from
+					merged = merge_values(self.base.get(key, MISSING), ours, theirs)
+					self.base[key] = theirs
+					self.merges += 1
+				else:
+					merged = theirs
+
+				if (merged == ours):
+					continue
+
+				if (len(self.snapshots) > 0):
+					preserve(self, key)
+
+				if (merged is MISSING):
+					self.content.pop(key, None)
+				elif not (key in self.content and refill(self.content[key], merged, self, key)):
+					self.content[key] = self.wrap(merged, self, key)
+
+				self.changes.append([key, None if ours is MISSING else ours, None if merged is MISSING else merged])
+				changed += 1
+
+		return changed
+
+class _Locks:
+	# acquires several context managers in order, releases them in reverse
+	def __init__(self, *locks):
+		self.locks = locks
+
+	def __enter__(self):
+		for lock in self.locks:
+			lock.__enter__()
+		return self
+
+	def __exit__(self, *args):
+		for lock in reversed(self.locks):
+			lock.__exit__(*args)
+
+_NO_LOCK = _Locks()
+
+class Transaction:
+	# check-then-write across terminals, e.g. a loan checks the stock and takes one off without another terminal writing in between
+	# the file locks of the shared readers are held throughout: what other terminals saved is applied first (see reader.changes)
+	# and the changes made inside are pushed before the locks are released
+	# readers that are not shared are left alone (one process, the caller's own lock is enough)
+	def __init__(self, readers, durable=True):
+		# readers are always locked in order of their hash, so two transactions can not wait on each other
+		self.readers = sorted([reader for reader in readers if getattr(reader, "shared", False)], key=lambda reader: reader.hash)
+		self.durable = durable
+		self._locks = []
+
+	def __enter__(self):
+		try:
+			for reader in self.readers:
+				lock = reader._shared_lock()
+				lock.__enter__()
+				self._locks.append(lock)
+				reader._catch_up()
+		except BaseException:
+			self._release()
+			raise
+		return self
+
+	def __exit__(self, *args):
+		try:
+			# pushed even if the caller failed halfway, the changes it made are in memory already
+			for reader in self.readers:
+				reader.fsyncs = 0
+				reader._push(self.durable, True)
+		finally:
+			self._release()
+
+	def _release(self):
+		for lock in reversed(self._locks):
+			lock.__exit__(None, None, None)
+		self._locks = []
 
 database_engine = DatabaseEngine();
\ No newline at end of file
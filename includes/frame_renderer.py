@@ -0,0 +1,120 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# frame diff renderer for Screen.out(), draws with ansi escape sequences instead of clearing the terminal through a shell
+# the previous frame is kept, only the lines (and the part of a line after the first changed character) that differ are written
+# the frame is pinned to the top of the terminal with a scroll region, prompts printed below it scroll without moving the frame
+import os
+import sys
+import shutil
+import atexit
+
+CSI = "\033["
+
+class FrameRenderer:
+	def __init__(self, stream=None, size=None):
+		# stream: file? (sys.stdout at the time of writing if None)
+		# size: os.terminal_size? (queried on every frame if None, e.g. to pick up resizes)
+		self.stream = stream
+		self.size = size
+		self.lines = None # lines of the frame on screen, None if unknown (next frame is drawn in full)
+		self.frame_size = None # terminal size the frame on screen was drawn for
+		self.pinned = False # scroll region set below the frame
+
+		# statistics (benchmarks/bench_render.py)
+		self.frames = 0
+		self.full_frames = 0
+		self.bytes_written = 0
+
+		atexit.register(self.release)
+
+	def output(self):
+		return self.stream if self.stream != None else sys.stdout
+
+	def active(self):
+		# returns true if frames can be drawn with escape sequences (an interactive posix terminal)
+		# otherwise callers fall back to clearing the screen and printing the frame (see Screen.out())
+		if (os.name == "nt"):
+			return False
+		isatty = getattr(self.output(), "isatty", None)
+		return isatty != None and isatty()
+
+	def write(self, data):
+		stream = self.output()
+		stream.write(data)
+		stream.flush()
+		self.bytes_written += len(data.encode("utf-8", "replace"))
+
+	def terminal_size(self):
+		return self.size if self.size != None else shutil.get_terminal_size()
+
+	def render(self, content):
+		# content: str (drawn like print(content), the cursor ends on the line after it)
+		size = self.terminal_size()
+		lines = content.split("\n")
+
+		# a frame is only pinned if every line fits on one row (no wrapping) and at least two rows are left below it
+		fits = len(lines) +1 < size.lines
+		if fits:
+			for line in lines:
+				if (len(line.expandtabs()) >= size.columns):
+					fits = False
+					break
+
+		out = [CSI +"r"] if self.pinned else [] # reset the scroll region (also moves the cursor home)
+		if (self.lines == None or size != self.frame_size or not fits):
+			# first frame, resized terminal, or a frame that may scroll: draw everything
+			out.append(CSI +"H" +CSI +"2J")
+			out.append("\n".join(lines))
+			self.full_frames += 1
+		else:
+			previous = self.lines
+			for idx in range(len(lines)):
+				line = lines[idx]
+				if (idx < len(previous)):
+					if (line == previous[idx]):
+						continue
+					column = FrameRenderer.common_prefix(line, previous[idx])
+				else:
+					column = 0
+
+				# write from the first changed character, erase whatever the old line had after it
+				out.append("{}{};{}H{}{}K".format(CSI, idx +1, column +1, line[column:], CSI))
+
+			# rows below the frame hold the old frame's extra lines and whatever was printed after it
+			out.append("{}{};1H{}J".format(CSI, len(lines) +1, CSI))
+
+		if fits:
+			# prompts and messages scroll in the rows below the frame, so the next frame can be diffed against this one
+			out.append("{}{};{}r{}{};1H".format(CSI, len(lines) +1, size.lines, CSI, len(lines) +1))
+			self.lines = lines
+			self.pinned = True
+		else:
+			out.append("\n")
+			self.lines = None
+			self.pinned = False
+
+		self.frame_size = size
+		self.frames += 1
+		self.write("".join(out))
+
+	def common_prefix(a, b):
+		# returns the number of leading characters a and b share, stops at the first tab or non ascii character
+		# (their width on screen is not one column)
+		n = min(len(a), len(b))
+		idx = 0
+		while (idx < n and a[idx] == b[idx] and " " <= a[idx] <= "~"):
+			idx += 1
+		return idx
+
+	def clear(self):
+		# clears the terminal, the next frame is drawn in full
+		self.write((CSI +"r" if self.pinned else "") +CSI +"H" +CSI +"2J")
+		self.lines = None
+		self.pinned = False
+
+	def release(self):
+		# removes the scroll region (on exit), the cursor stays where it is
+		if self.pinned:
+			self.write("\0337" +CSI +"r" +"\0338")
+			self.pinned = False
+			self.lines = None
@@ -1,49 +1,34 @@
 # Author: Chong Cheng Hock
 # Admin No / Grp: 230643M / AA2301
-user_home = """
-help   | displays this message :)
-
-loan   | interface to loan book via search interface
-\t [-d] detailed view on search interface
-\t [-p] precision search (search interface will use isbn to search)
-
-return | interface to return books
-
-browse | browse books in the library in alphabetically order (titles)
-\t [-i] browse by sorted ISBN numbers
-\t [-d] detailed view on browsing interface
-\t [n=10] page size (default 10 items per page)
-
-search | interface to search for books
-\t [-d] detailed view on search interface
-\t [-p] precision search (search interface will use isbn to search)
-
-cpw    | interface to change password
-
-logout | logouts of the library management system
-\t [@exit] alias for this command
-"""
-
-librarian_home = """
-update | interface to update book details
-\t [-d] detailed view on search interface
-\t [-p] precision search (search interface will use isbn to search)
-
-add    | interface to add a new book
-\t [isbn] supply isbn value (no default value)
-\t [title] supply title value (no default value)
-\t [quantity] supply quantity value (no default value)
-\t [type] supply book type value (no default value)
-"""
-administrator_home = """
-create | interface to create a new user
-"""
-
-root_home = """
-delete | interface to delete a book
-\t [-d] detailed view on search interface
-\t [-p] precision search (search interface will use isbn to search)
-\t [-f] forces delete without performing checks on whether users have loaned it or are loaning it (increased speed)
-"""
-
-update_book = "{:<9} | changes title of the book\n{:<9} | changes quantity of the book\n{:<9} | changes type of the book\n{:<9} | save changes, will prompt for confirmation\n".format("title", "quantity", "type", "save")
\ No newline at end of file
+# help text of every command, registered with it in LibCLI.commands (see CommandRegistry.help_text())
+# listed by access level: users, librarians, administrators, root
+commands = {
+	"help": "displays this message :)",
+	"loan": "interface to loan book via search interface\n\t [-d] detailed view on search interface\n\t [-p] precision search (search interface will use isbn to search)",
+	"return": "interface to return books",
+	"browse": "browse books in the library in alphabetically order (titles)\n\t [-i] browse by sorted ISBN numbers\n\t [-d] detailed view on browsing interface\n\t [n=10] page size (default 10 items per page)",
+	"search": "interface to search for books\n\t [-d] detailed view on search interface\n\t [-p] precision search (search interface will use isbn to search)",
+	"cpw": "interface to change password",
+	"history": "lists your returned loans (oldest first)\n\t [n=20] number of most recent loans shown",
+	"logout": "logouts of the library management system",
+
+	"update": "interface to update book details\n\t [-d] detailed view on search interface\n\t [-p] precision search (search interface will use isbn to search)",
+	"overdue": "lists overdue loans and loans due within 24 hours (all users)",
+	"add": "interface to add a new book\n\t [isbn] supply isbn value (no default value)\n\t [title] supply title value (no default value)\n\t [quantity] supply quantity value (no default value)\n\t [type] supply book type value (no default value)",
+	"import": "adds every book of a csv or jsonl file (columns/fields: isbn, title, type, quantity), invalid rows are reported and skipped\n\t [file] path of the file to import\n\t [format=csv|jsonl] file format (default: from the file extension)",
+	"export": "writes the catalogue (or the loan history) into a csv or jsonl file, as it was when the export started\n\t [file] path of the file to write\n\t [data=books|loans] what to export (loans: administrators only)\n\t [order=title|isbn] order of the books\n\t [user] only the loans of this user\n\t [format=csv|jsonl] file format (default: from the file extension)",
+
+	"create": "interface to create a new user",
+	"archive": "moves old loan history out of users.json into compressed archive segments (database/archive)\n\t [age=180] days after return a loan stays in users.json",
+
+	"delete": "interface to delete a book\n\t [-d] detailed view on search interface\n\t [-p] precision search (search interface will use isbn to search)\n\t [-f] forces delete without warning whether users have loaned it or are loaning it",
+	"convert": "exports/imports the book and user stores to/from the other snapshot format (database/*.json, database/*.bin)\n\t [export=json|binary] write the current data in that format\n\t [import=json|binary] replace the current data with the files of that format"
+}
+
+# actions of the update book interface (LibCLI.update_actions)
+update_book = {
+	"title": "changes title of the book",
+	"quantity": "changes quantity of the book",
+	"type": "changes type of the book",
+	"save": "save changes, will prompt for confirmation"
+}
@@ -0,0 +1,121 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# isbn-10 and isbn-13 validation, normalisation and conversion (LibraryData.validate_isbn(), LibraryData.find_isbn())
+# table driven: checksums are computed over the ascii bytes with precomputed weight tables (no splitting, no int() per digit)
+# hyphens and spaces may appear anywhere between the digits, e.g. "0-306-40615-2", "978 0 306 40615 7"
+from operator import mul
+
+_SEPARATORS = str.maketrans("", "", "- ")
+
+# weight of every position, check digit included (a valid isbn sums to a multiple of the modulus)
+# the ascii offset of the digits (48 per digit) is a multiple of the modulus for both tables, so bytes can be summed as they are:
+# 48 *(10 +9 +.. +1) = 2640 = 11 *240, 48 *(7 *1 +6 *3) = 1200 = 10 *120
+_WEIGHTS_10 = (10, 9, 8, 7, 6, 5, 4, 3, 2, 1)
+_WEIGHTS_13 = (1, 3, 1, 3, 1, 3, 1, 3, 1, 3, 1, 3, 1)
+_X_CORRECTION = ord("X") -(ord("0") +10) # "X" check digit stands for 10
+
+# check digit indexed by the byte sum of the other digits %modulus (their ascii offset is not a multiple of the modulus)
+_CHECK_DIGITS_10 = "".join("0123456789X"[(ord("0") *sum(_WEIGHTS_10[:9]) -r) %11] for r in range(11))
+_CHECK_DIGITS_13 = "".join("0123456789"[(ord("0") *sum(_WEIGHTS_13[:12]) -r) %10] for r in range(10))
+
+def compact_isbn(isbn_code):
+	# returns isbn_code without hyphens and spaces (lowercase "x" check digit made uppercase)
+	return isbn_code.translate(_SEPARATORS).upper()
+
+def _valid_compact(code):
+	# code: str (compact, see compact_isbn())
+	if (len(code) == 13):
+		return code.isascii() and code.isdigit() and sum(map(mul, code.encode(), _WEIGHTS_13)) %10 == 0
+	elif (len(code) == 10):
+		body = code[:9]
+		if not (body.isascii() and body.isdigit()):
+			return False
+
+		last = code[9]
+		if (last == "X"):
+			return (sum(map(mul, code.encode(), _WEIGHTS_10)) -_X_CORRECTION) %11 == 0
+		return "0" <= last <= "9" and sum(map(mul, code.encode(), _WEIGHTS_10)) %11 == 0
+	return False
+
+def valid_isbn(isbn_code):
+	# returns true if isbn_code is a well formed isbn-10 or isbn-13 with a correct check digit
+	if (type(isbn_code) != str):
+		return False
+	return _valid_compact(compact_isbn(isbn_code))
+
+def check_digit_10(digits):
+	# digits: str (first 9 digits of an isbn-10), returns the check digit ("0" to "9" or "X")
+	return _CHECK_DIGITS_10[sum(map(mul, digits.encode(), _WEIGHTS_10)) %11]
+
+def check_digit_13(digits):
+	# digits: str (first 12 digits of an isbn-13), returns the check digit ("0" to "9")
+	return _CHECK_DIGITS_13[sum(map(mul, digits.encode(), _WEIGHTS_13)) %10]
+
+def to_isbn13(isbn_code):
+	# returns the compact isbn-13 of isbn_code (isbn-10 gets the "978" prefix), None if isbn_code is not valid
+	if (type(isbn_code) != str):
+		return None
+
+	code = compact_isbn(isbn_code)
+	if not _valid_compact(code):
+		return None
+	if (len(code) == 13):
+		return code
+
+	digits = "978" +code[:9]
+	return digits +check_digit_13(digits)
+
+def to_isbn10(isbn_code):
+	# returns the compact isbn-10 of isbn_code, None if isbn_code is not valid or has no isbn-10 form (only "978" isbn-13s do)
+	if (type(isbn_code) != str):
+		return None
+
+	code = compact_isbn(isbn_code)
+	if not _valid_compact(code):
+		return None
+	if (len(code) == 10):
+		return code
+	if not code.startswith("978"):
+		return None
+
+	digits = code[3:12]
+	return digits +check_digit_10(digits)
+
+def canonical_isbn(isbn_code):
+	# returns the key both forms of an isbn (any hyphenation) map to (its compact isbn-13), None if isbn_code is not valid
+	return to_isbn13(isbn_code)
+
+def catalogue_isbn(isbn_code):
+	# returns isbn_code in the form books are stored under in isbn.json ("978-" +10 digits for isbn-13, 10 characters for isbn-10)
+	# None if isbn_code is not valid, e.g. "978 0 306 40615 7" -> "978-0306406157", "0-306-40615-2" -> "0306406152"
+	if (type(isbn_code) != str):
+		return None
+
+	code = compact_isbn(isbn_code)
+	if not _valid_compact(code):
+		return None
+	return code[:3] +"-" +code[3:] if len(code) == 13 else code
+
+def catalogue_canonical_isbn(catalogue_code):
+	# catalogue_code: str (as returned by catalogue_isbn(), already validated)
+	# returns canonical_isbn(catalogue_code) without validating it again, e.g. for rows checked by LibraryData.parse_book()
+	if (len(catalogue_code) == 14):
+		return catalogue_code[:3] +catalogue_code[4:]
+
+	digits = "978" +catalogue_code[:9]
+	return digits +check_digit_13(digits)
+
+def canonical_isbns(isbn_codes):
+	# batch form of canonical_isbn() for bulk imports and index builds
+	# isbn_codes: iterable of str, returns a list with the canonical key (or None) of every code, in order
+	keys = []
+	for isbn_code in isbn_codes:
+		code = isbn_code.translate(_SEPARATORS).upper() if type(isbn_code) == str else ""
+		if not _valid_compact(code):
+			keys.append(None)
+		elif (len(code) == 13):
+			keys.append(code)
+		else:
+			digits = "978" +code[:9]
+			keys.append(digits +check_digit_13(digits))
+	return keys
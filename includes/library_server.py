@@ -0,0 +1,212 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# library server (one long lived process owning the database and the warm indexes) and the thin client used by LibCLI
+# protocol: one json line per request {"op": str, "args": any[]} over a unix domain socket,
+# answered by one json line {"result": any} or {"error": str}
+import os
+import json
+import socket
+import socketserver
+import threading
+
+class RemoteError(Exception):
+	# the server failed to execute a request (message from the server)
+	pass
+
+def encode_line(message):
+	# mapping records (e.g. BookRecord) are sent as plain objects
+	return json.dumps(message, separators=(",", ":"), default=dict).encode("utf-8") +b"\n"
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+	# serves the requests of one client connection (one LibCLI terminal) until it disconnects
+	def handle(self):
+		for line in self.rfile:
+			try:
+				request = json.loads(line)
+				response = {"result": self.server.execute(request["op"], request.get("args", []))}
+			except Exception as e:
+				response = {"error": "{}: {}".format(type(e).__name__, e)}
+
+			self.wfile.write(encode_line(response))
+
+class LibraryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+	# one thread per connection, requests are executed one at a time (the indexes are not thread safe)
+	daemon_threads = True
+
+	def __init__(self, socket_path, handlers, writes=(), prepare=None, flush=None, lock=None, unlocked=()):
+		# socket_path: str
+		# handlers: {op: function (*args) -> json compatible value}
+		# writes: str[] (ops that change the database, flush() is called before they are answered)
+		# prepare: function? (called before every request, e.g. to pick up changes of shared readers)
+		# flush: function? (saves the changes of a write)
+		# lock: lock? (held while a request is executed), unlocked: str[] (long running ops that take the lock themselves)
+		self.handlers = handlers
+		self.writes = set(writes)
+		self.prepare = prepare
+		self.flush = flush
+		self.lock = lock if lock != None else threading.Lock()
+		self.unlocked = set(unlocked)
+		self.requests = 0
+
+		# a socket file left behind by a server that did not shut down cleanly is replaced
+		if os.path.exists(socket_path):
+			if (LibraryClient.connect(socket_path) != None):
+				raise RuntimeError("a library server is already listening on {}".format(socket_path))
+			os.remove(socket_path)
+
+		old_umask = os.umask(0o077) # socket only usable by the owner
+		try:
+			socketserver.UnixStreamServer.__init__(self, socket_path, _RequestHandler)
+		finally:
+			os.umask(old_umask)
+
+	def execute(self, op, args):
+		handler = self.handlers.get(op)
+		if (handler == None):
+			raise KeyError("unknown op '{}'".format(op))
+
+		if (op in self.unlocked):
+			self.requests += 1
+			return handler(*args)
+
+		with self.lock:
+			self.requests += 1
+			if (self.prepare != None):
+				self.prepare()
+			result = handler(*args)
+			if (op in self.writes and self.flush != None):
+				# the client only sees the result once the change is saved
+				self.flush()
+
+			return result
+
+	def server_close(self):
+		socketserver.UnixStreamServer.server_close(self)
+		if os.path.exists(self.server_address):
+			os.remove(self.server_address)
+
+class LibraryClient:
+	# connection to a LibraryServer, call() sends one request and waits for its answer
+	def __init__(self, sock):
+		self.sock = sock
+		self.file = sock.makefile("rwb")
+		self.lock = threading.Lock() # one request in flight at a time
+		self.requests = 0
+
+	def connect(socket_path):
+		# returns a LibraryClient, or None if no server is listening on socket_path
+		if not (hasattr(socket, "AF_UNIX") and os.path.exists(socket_path)):
+			return None
+
+		sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		try:
+			sock.connect(socket_path)
+		except OSError:
+			sock.close()
+			return None
+
+		return LibraryClient(sock)
+
+	def call(self, op, *args):
+		with self.lock:
+			self.file.write(encode_line({"op": op, "args": args}))
+			self.file.flush()
+			line = self.file.readline()
+			self.requests += 1
+
+		if (len(line) == 0):
+			raise ConnectionError("library server closed the connection")
+
+		response = json.loads(line)
+		if ("error" in response):
+			raise RemoteError(response["error"])
+		return response["result"]
+
+	def close(self):
+		self.file.close()
+		self.sock.close()
+
+class RemoteRecord(dict):
+	# copy of a record held by the server, setting a field sends it to the server
+	def __init__(self, reader, key, value):
+		dict.__init__(self, value)
+		self._reader = reader
+		self._key = key
+
+	def __setitem__(self, field, value):
+		self._reader.client.call("set_field", self._reader.hash, self._key, field, value)
+		dict.__setitem__(self, field, value)
+
+class RemoteReader:
+	# stands in for a DatabaseReader owned by the server (reads and top level writes go through the server)
+	def __init__(self, client, name):
+		# name: str (reader hash, e.g. "users")
+		self.client = client
+		self.hash = name
+		self.dirty = False # nothing is saved locally, see DatabaseEngine.flush()
+
+	def get(self, key, default=None):
+		value = self.client.call("get", self.hash, key)
+		if (value == None):
+			return default
+		return RemoteRecord(self, key, value) if isinstance(value, dict) else value
+
+	def __getitem__(self, key):
+		return self.get(key)
+
+	def __setitem__(self, key, value):
+		self.client.call("set", self.hash, key, value)
+
+	def __contains__(self, key):
+		return self.client.call("contains", self.hash, key)
+
+	def __len__(self):
+		return self.client.call("len", self.hash)
+
+	def __repr__(self):
+		return "<RemoteReader '{}'>".format(self.hash)
+
+class RemoteSequence:
+	# read only list held by the server (e.g. LibraryData.sorted_title), fetched one slice at a time
+	def __init__(self, client, name):
+		self.client = client
+		self.name = name
+
+	def __len__(self):
+		return self.client.call("index_len", self.name)
+
+	def __getitem__(self, idx):
+		if isinstance(idx, slice):
+			return self.client.call("index_slice", self.name, idx.start, idx.stop)
+		return self.client.call("index_slice", self.name, idx, idx +1)[0]
+
+class RemotePages:
+	# paginated results computed by the server (e.g. SearchResults), pages are fetched once when first accessed
+	# the op is called with (*args, page_idx) and returns [number of pages, page]
+	def __init__(self, client, op, *args):
+		self.client = client
+		self.op = op
+		self.args = args
+		self.pages = {}
+		self.page_n = 1
+		self[0] # first page (and the number of pages)
+
+	def __len__(self):
+		return self.page_n
+
+	def __getitem__(self, page_idx):
+		if (page_idx < 0 or page_idx >= self.page_n):
+			raise IndexError("page index out of range")
+
+		if not (page_idx in self.pages):
+			self.page_n, self.pages[page_idx] = self.client.call(self.op, *self.args, page_idx)
+		return self.pages[page_idx]
+
+class RemoteObject:
+	# forwards method calls to the server as "<name>.<method>" ops (e.g. borrowers.has_references(isbn))
+	def __init__(self, client, name):
+		self.client = client
+		self.name = name
+
+	def __getattr__(self, method):
+		return lambda *args: self.client.call("{}.{}".format(self.name, method), *args)
@@ -0,0 +1,99 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+from os import path
+import os
+import json
+import gzip
+import time
+
+from includes.database_engine import write_atomic, fsync_dir
+
+class LoanArchive:
+	# append-only archive of old "loaned_books" entries (loan history), kept out of users.json
+	# every archive() call writes one new gzip compressed segment (json lines), segments are never rewritten
+	# segments are named after their creation time and process id, terminals sharing database/ never pick the same name
+	# first line of a segment: {"cutoff": ts}, every entry returned before ts has been archived by then
+	# other lines: [username, isbn, loan_timestamp, duration, return_timestamp]
+	def __init__(self, directory=None, max_age=180 *86400):
+		# directory: str? (defaults to database/archive), max_age: float (seconds after return an entry stays in users.json)
+		self.directory = directory if directory != None else path.join(path.dirname(path.dirname(path.abspath(__file__))), "database", "archive")
+		self.max_age = max_age
+
+		self.segments = [] # segment file names, oldest first
+		self.cutoff = 0 # entries returned before this have been archived
+		self._cutoffs = {} # segment name -> cutoff in its header (read once per segment)
+		self.refresh()
+
+	def refresh(self):
+		# lists the segments again (other terminals may have written some since), returns a copy of self.segments
+		if path.isdir(self.directory):
+			# older segments were numbered (loans-000001), they sort before the timestamped ones
+			self.segments = sorted(name for name in os.listdir(self.directory) if name.startswith("loans-") and name.endswith(".jsonl.gz"))
+			for name in self.segments:
+				if not (name in self._cutoffs):
+					with gzip.open(path.join(self.directory, name), "rb") as f:
+						self._cutoffs[name] = json.loads(f.readline())["cutoff"]
+					self.cutoff = max(self.cutoff, self._cutoffs[name])
+		return list(self.segments)
+
+	def segment_name(self):
+		# returns an unused segment name, "loans-<milliseconds since epoch>-<process id>.jsonl.gz"
+		timestamp = int(time.time() *1000)
+		while True:
+			name = "loans-{:013d}-{}.jsonl.gz".format(timestamp, os.getpid())
+			if not path.exists(path.join(self.directory, name)):
+				return name
+			timestamp += 1 # archived twice within a millisecond
+
+	def archive(self, users, max_age=None, now=None):
+		# users: DatabaseReader (users.json), shared mode: call with its file lock held (see LibraryData.archive_loans())
+		# moves every "loaned_books" entry returned more than max_age seconds ago into a new segment
+		# returns [username, isbn][] of the entries removed from users (for the caller's indexes)
+		max_age = max_age if max_age != None else self.max_age
+		cutoff = (now if now != None else time.time()) -max_age
+		self.refresh() # cutoff of segments written by other terminals
+
+		lines = []
+		moved = [] # [username, loan entry][]
+		for username in users:
+			for loan_entry in users[username]["loaned_books"]:
+				if (loan_entry[3] < cutoff):
+					if (loan_entry[3] >= self.cutoff):
+						lines.append(json.dumps([username] +list(loan_entry), separators=(",", ":")) +"\n")
+					# else already archived by an earlier run (crashed before users.json was saved)
+					moved.append([username, loan_entry])
+
+		if (len(moved) == 0):
+			return []
+
+		if (len(lines) > 0):
+			# segment is durable before the entries leave users.json, a crash in between only leaves duplicates behind
+			# in users.json, which the next run drops without archiving them again (see self.cutoff)
+			os.makedirs(self.directory, exist_ok=True)
+			name = self.segment_name()
+			header = json.dumps({"cutoff": cutoff}) +"\n"
+			write_atomic(path.join(self.directory, name), gzip.compress((header +"".join(lines)).encode("utf-8")), True)
+			fsync_dir(self.directory)
+
+			self.segments.append(name)
+			self._cutoffs[name] = cutoff
+			self.cutoff = max(self.cutoff, cutoff)
+
+		# keep the recent entries only (one assignment per user, so the change is tracked once)
+		for username in {username for username, loan_entry in moved}:
+			user_data = users[username]
+			user_data["loaned_books"] = [loan_entry for loan_entry in user_data["loaned_books"] if loan_entry[3] >= cutoff]
+
+		return [[username, loan_entry[0]] for username, loan_entry in moved]
+
+	def entries(self, username=None, segments=None):
+		# yields [username, isbn, loan_timestamp, duration, return_timestamp] of every archived entry (oldest segment first)
+		# streams the segments line by line, username: str? (only entries of username)
+		# segments: str[]? (segment names to read, e.g. the list returned by refresh() earlier, defaults to every segment now)
+		prefix = (json.dumps([username], separators=(",", ":"))[:-1] +",").encode("utf-8") if username != None else b""
+		for name in (segments if segments != None else self.refresh()):
+			with gzip.open(path.join(self.directory, name), "rb") as f:
+				f.readline() # header
+				for line in f:
+					if line.startswith(prefix):
+						yield json.loads(line)
@@ -0,0 +1,133 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+import heapq
+
+def loan_rows(users):
+	# users: DatabaseReader (users.json)
+	# yields [username, isbn, due, returned] for every loan entry, returned is None for active loans
+	# (same rows as SQLiteReader.loan_rows(), which reads them from its loans table instead)
+	for username in users:
+		user_data = users[username]
+		for loan_entry in user_data["loaning"]:
+			yield [username, loan_entry[0], loan_entry[1] +loan_entry[2], None]
+		for loan_entry in user_data["loaned_books"]:
+			yield [username, loan_entry[0], loan_entry[1] +loan_entry[2], loan_entry[3]]
+
+class BorrowerIndex:
+	# reverse index from isbn to the users referencing it in their loan entries ("loaning" and "loaned_books")
+	# lets book deletion visit only the borrowers of a book instead of every user
+	def __init__(self):
+		self.refs = {} # isbn -> {username: number of loan entries referencing isbn}
+
+	def build(self, users):
+		# users: DatabaseReader (users.json)
+		# rebuilds the index from every user's loan entries
+		self.load(loan_rows(users))
+
+	def load(self, rows):
+		# rows: [username, isbn, due, returned][] (see loan_rows())
+		self.refs = {}
+		for row in rows:
+			self.add(row[1], row[0])
+
+	def add(self, isbn, username):
+		# records one more loan entry of isbn held by username
+		borrowers = self.refs.get(isbn)
+		if (borrowers == None):
+			self.refs[isbn] = {username: 1}
+		else:
+			borrowers[username] = borrowers.get(username, 0) +1
+
+	def discard(self, isbn, username):
+		# removes one loan entry of isbn held by username (e.g. archived history)
+		borrowers = self.refs.get(isbn)
+		if (borrowers == None or not (username in borrowers)):
+			return
+
+		borrowers[username] -= 1
+		if (borrowers[username] == 0):
+			del borrowers[username]
+			if (len(borrowers) == 0):
+				del self.refs[isbn]
+
+	def has_references(self, isbn):
+		# returns true if any user has isbn in their loan entries
+		return isbn in self.refs
+
+	def drop(self, isbn):
+		# removes isbn from the index, returns the usernames that referenced it
+		return list(self.refs.pop(isbn, {}))
+
+class DueIndex:
+	# min-heap over active loans (due timestamp, username, isbn), answers library-wide due date queries
+	# without visiting every user; returned loans leave stale heap entries behind that are skipped (and compacted)
+	def __init__(self):
+		self.heap = [] # [due, username, isbn][] (min-heap on due)
+		self.loans = {} # username -> {isbn: due} (active loans only, source of truth for the heap)
+		self.size = 0 # number of active loans
+
+	def build(self, users):
+		# users: DatabaseReader (users.json)
+		# rebuilds the index from every user's "loaning" entries
+		self.load(loan_rows(users))
+
+	def load(self, rows):
+		# rows: [username, isbn, due, returned][] (see loan_rows()), returned loans are skipped
+		self.loans = {}
+		self.size = 0
+		for row in rows:
+			if (row[3] == None):
+				self.loans.setdefault(row[0], {})[row[1]] = row[2]
+				self.size += 1
+
+		self._rebuild_heap()
+
+	def add(self, username, isbn, due):
+		self.loans.setdefault(username, {})[isbn] = due
+		self.size += 1
+		heapq.heappush(self.heap, [due, username, isbn])
+
+	def discard(self, username, isbn):
+		user_loans = self.loans.get(username)
+		if (user_loans == None or not (isbn in user_loans)):
+			return
+
+		del user_loans[isbn]
+		if (len(user_loans) == 0):
+			del self.loans[username]
+		self.size -= 1
+
+		if (len(self.heap) > 2 *self.size +64):
+			# mostly stale entries, compact
+			self._rebuild_heap()
+
+	def due_before(self, timestamp):
+		# returns [due, username, isbn][] of every active loan due at or before timestamp, earliest first
+		# only walks heap nodes that are due at or before timestamp (O(k) for k results, plus stale entries)
+		found = []
+		stack = [0] if len(self.heap) > 0 else []
+		while len(stack) > 0:
+			idx = stack.pop()
+			entry = self.heap[idx]
+			if (entry[0] > timestamp):
+				# children are due even later
+				continue
+
+			if (self.loans.get(entry[1], {}).get(entry[2]) == entry[0]):
+				# still an active loan
+				found.append(entry)
+
+			for child_idx in (2 *idx +1, 2 *idx +2):
+				if (child_idx < len(self.heap)):
+					stack.append(child_idx)
+
+		found.sort()
+		return found
+
+	def user_due_before(self, username, timestamp):
+		# returns the isbns loaned by username that are due at or before timestamp (in loan order)
+		return [isbn for isbn, due in self.loans.get(username, {}).items() if due <= timestamp]
+
+	def _rebuild_heap(self):
+		self.heap = [[due, username, isbn] for username in self.loans for isbn, due in self.loans[username].items()]
+		heapq.heapify(self.heap)
@@ -0,0 +1,62 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+from collections import OrderedDict
+
+class QueryCache:
+	# least recently used cache for search results, bounded by an (approximate) memory budget
+	# every entry is tagged with the catalogue version it was computed against, entries of older versions are never served
+	def __init__(self, max_bytes=8 *1024 *1024, sizeof=None):
+		# max_bytes: int (memory cap over all cached values)
+		# sizeof: function (value -> int), estimates the memory held by a cached value
+		self.max_bytes = max_bytes
+		self.sizeof = sizeof if sizeof != None else (lambda value: 0)
+
+		self.entries = OrderedDict() # key -> [version, value, size], least recently used first
+		self.total_bytes = 0
+
+		# statistics
+		self.hits = 0
+		self.misses = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	def get(self, key, version):
+		# returns the cached value for key if it was computed at version, else None
+		entry = self.entries.get(key)
+		if (entry == None):
+			self.misses += 1
+			return None
+		elif (entry[0] != version):
+			# stale (catalogue changed since), drop it
+			self._drop(key)
+			self.misses += 1
+			return None
+
+		self.entries.move_to_end(key) # most recently used
+		self.hits += 1
+		return entry[1]
+
+	def put(self, key, version, value):
+		size = self.sizeof(value)
+		if (size > self.max_bytes):
+			# would evict everything else, not worth caching
+			return
+
+		if (key in self.entries):
+			self._drop(key)
+
+		self.entries[key] = [version, value, size]
+		self.total_bytes += size
+
+		# evict least recently used entries until within budget
+		while self.total_bytes > self.max_bytes:
+			self._drop(next(iter(self.entries)))
+
+	def clear(self):
+		self.entries.clear()
+		self.total_bytes = 0
+
+	def _drop(self, key):
+		entry = self.entries.pop(key)
+		self.total_bytes -= entry[2]
@@ -0,0 +1,85 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# three-way merge of json records, used by DatabaseReader in shared mode when another terminal changed a record
+# that also has unsaved local changes (base: last saved version both sides started from)
+import json
+from collections import Counter
+
+class Missing:
+	# marks an absent value (deleted record or field), distinct from json null
+	def __repr__(self):
+		return "MISSING"
+
+MISSING = Missing()
+
+def plain(value):
+	# returns a plain (untracked, unshared) copy of a json compatible value, mapping records (e.g. BookRecord) become dicts
+	if (value is MISSING):
+		return MISSING
+	return json.loads(json.dumps(value, default=dict))
+
+def is_number(value):
+	return type(value) == int or type(value) == float # bools excluded
+
+def merge_values(base, ours, theirs):
+	# base, ours, theirs: json compatible value or MISSING
+	# returns the merged value (MISSING if it should be absent)
+	if (theirs == base):
+		return ours
+	elif (ours == base):
+		return theirs
+
+	# changed on both sides (possibly to the same value, e.g. two loans of the same book both taking one off its stock)
+	if (ours is MISSING and theirs is MISSING):
+		return MISSING
+	elif (ours is MISSING or theirs is MISSING):
+		# deleted on one side and changed on the other (e.g. a book deleted while another terminal loaned it)
+		# the change wins, the deletion is refused rather than leaving references (loan entries) to a missing record
+		return theirs if ours is MISSING else ours
+	elif isinstance(ours, dict) and isinstance(theirs, dict):
+		# field by field
+		base = base if isinstance(base, dict) else {}
+		merged = {}
+		for key in list(theirs) +[key for key in ours if not (key in theirs)]:
+			value = merge_values(base.get(key, MISSING), ours.get(key, MISSING), theirs.get(key, MISSING))
+			if not (value is MISSING):
+				merged[key] = value
+		return merged
+	elif is_number(base) and is_number(ours) and is_number(theirs):
+		# independent increments/decrements (e.g. stock counts of two loans) both apply
+		# a count can not be taken below zero by a merge, our change is dropped and the saved value (theirs) kept
+		# (checked writes such as loans do not get here, they run in a Transaction, see database_engine)
+		merged = theirs +(ours -base)
+		if (merged < 0 and min(base, ours, theirs) >= 0):
+			return theirs
+		return merged
+	elif isinstance(ours, list) and isinstance(theirs, list):
+		return merge_lists(base if isinstance(base, list) else [], ours, theirs)
+
+	# same or conflicting scalars, last writer (ours) wins
+	return ours
+
+def merge_lists(base, ours, theirs):
+	# applies our insertions and removals (relative to base) on top of theirs, items are compared by value
+	# e.g. loan entries appended to "loaning" by two terminals are both kept
+	item_key = lambda item: json.dumps(item, sort_keys=True)
+	base_counts = Counter(item_key(item) for item in base)
+	ours_counts = Counter(item_key(item) for item in ours)
+	removed = base_counts -ours_counts
+	added = ours_counts -base_counts
+
+	merged = []
+	for item in theirs:
+		key = item_key(item)
+		if (removed[key] > 0):
+			removed[key] -= 1
+		else:
+			merged.append(item)
+
+	for item in ours:
+		key = item_key(item)
+		if (added[key] > 0):
+			added[key] -= 1
+			merged.append(item)
+
+	return merged
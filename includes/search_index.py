@@ -0,0 +1,122 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+import heapq
+from collections import Counter, defaultdict
+
+class NGramIndex:
+	# inverted index from character n-grams to the ids (isbn references) of the texts containing them
+	# used to narrow down search candidates before running the (expensive) levenshtein distance on them
+	def __init__(self, n=3, key_fn=str.casefold):
+		# n: int (gram size), key_fn: function (str -> str) to normalise texts before splitting them into grams
+		self.n = n
+		self.key_fn = key_fn
+
+		self.postings = {} # gram: str -> set of ids
+		self.lengths = {} # id -> length of the normalised text (tie breaker for candidates)
+
+		# once this many candidates have been collected from the rarest grams, the remaining grams only re-score them
+		self.expand_limit = 5000
+
+	def grams(self, text):
+		# returns the set of n-grams of text, padded so that short texts and word boundaries produce grams too
+		padded = " " *(self.n -1) +self.key_fn(text) +" "
+		return {padded[idx: idx +self.n] for idx in range(len(padded) -self.n +1)}
+
+	def load(self, ids, texts):
+		# ids: str[], texts: str[] (texts[i] belongs to ids[i])
+		# rebuilds the index from scratch
+		postings, lengths = self._collect(ids, texts)
+		self.postings = {gram: set(posting) for gram, posting in postings.items()}
+		self.lengths = lengths
+
+	def add_many(self, ids, texts):
+		# ids: str[], texts: str[] (texts[i] belongs to ids[i]), ids must not be in the index yet
+		# adds a batch of texts (e.g. an import), every gram's posting is extended once instead of once per text
+		postings, lengths = self._collect(ids, texts)
+		for gram, posting in postings.items():
+			existing = self.postings.get(gram)
+			if (existing == None):
+				self.postings[gram] = set(posting)
+			else:
+				existing.update(posting)
+
+		self.lengths.update(lengths)
+
+	def _collect(self, ids, texts):
+		# returns [postings: {gram: id[]}, lengths: {id: int}] of the texts
+		# postings are collected as lists first (cheaper appends), callers convert them to sets once
+		# same grams as grams(), without building a set per text: a gram repeated within a text is dropped by that conversion
+		postings = defaultdict(list)
+		lengths = {}
+		n = self.n
+		for idx in range(len(ids)):
+			doc_id = ids[idx]
+			padded = " " *(n -1) +self.key_fn(texts[idx]) +" "
+			for start in range(len(padded) -n +1):
+				postings[padded[start: start +n]].append(doc_id)
+
+			lengths[doc_id] = len(texts[idx])
+
+		return [postings, lengths]
+
+	def add(self, doc_id, text):
+		for gram in self.grams(text):
+			posting = self.postings.get(gram)
+			if (posting == None):
+				self.postings[gram] = {doc_id}
+			else:
+				posting.add(doc_id)
+
+		self.lengths[doc_id] = len(text)
+
+	def remove(self, doc_id, text):
+		for gram in self.grams(text):
+			posting = self.postings.get(gram)
+			if (posting != None):
+				posting.discard(doc_id)
+				if (len(posting) == 0):
+					# drop empty postings
+					del self.postings[gram]
+
+		self.lengths.pop(doc_id, None)
+
+	def update(self, doc_id, old_text, new_text):
+		if (old_text == new_text):
+			return
+
+		self.remove(doc_id, old_text)
+		self.add(doc_id, new_text)
+
+	def candidates(self, query, limit):
+		# returns up to limit ids sharing the most n-grams with query (most shared first)
+		# returns an empty list if no ids share any n-gram with query
+		postings = [self.postings[gram] for gram in self.grams(query) if gram in self.postings]
+		postings.sort(key=len) # rarest grams first
+
+		counts = Counter() # id -> number of shared grams (counted in C by Counter.update)
+		candidate_set = None # frozen set of candidates once self.expand_limit is reached
+		for posting in postings:
+			if (candidate_set == None):
+				# rare gram, every id containing it becomes a candidate
+				counts.update(posting)
+				if (len(counts) >= self.expand_limit):
+					candidate_set = set(counts)
+			else:
+				# common gram, only re-score the candidates found so far
+				counts.update(candidate_set.intersection(posting))
+
+		# lowest shared gram count that still yields at least limit candidates, anything below it can be dropped early
+		min_count = 0
+		total = 0
+		count_freq = Counter(counts.values())
+		for count in sorted(count_freq, reverse=True):
+			total += count_freq[count]
+			min_count = count
+			if (total >= limit):
+				break
+		shortlist = [doc_id for doc_id, count in counts.items() if count >= min_count]
+
+		# most shared grams first, then closest text length to the query
+		query_n = len(query)
+		lengths = self.lengths
+		return heapq.nsmallest(limit, shortlist, key=lambda doc_id: (-counts[doc_id], abs(lengths[doc_id] -query_n)))
@@ -0,0 +1,87 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+from bisect import bisect_left, bisect_right
+
+class SortedIndex:
+	# maintains a list of values (isbn references) in ascending order of their keys
+	# keys are stored in a parallel list so that every mutation is a bisect lookup instead of a full re-sort
+	def __init__(self, key_fn=str.casefold):
+		# key_fn: function (str -> comparable), maps the raw field (e.g. title) to its sort key
+		self.key_fn = key_fn
+
+		self.keys = [] # sort keys, always in ascending order
+		self.values = [] # values, values[i] belongs to keys[i]
+
+	def __len__(self):
+		return len(self.values)
+
+	def __iter__(self):
+		return iter(self.values)
+
+	def load(self, keys, values):
+		# keys: comparable[] (already computed with key_fn and sorted in ascending order), values: str[]
+		# replaces the contents of the index without sorting again
+		self.keys = keys
+		self.values = values
+
+	def merge(self, keys, values):
+		# keys: comparable[] (already computed with key_fn and sorted in ascending order), values: str[]
+		# adds a batch of entries (e.g. an import), equal keys are placed after existing ones like insert()
+		# the two sorted runs are merged by timsort in linear time instead of one list insert per entry
+		if (len(self.keys) == 0):
+			self.load(list(keys), list(values))
+			return
+
+		merged_keys = self.keys +keys
+		merged_values = self.values +values
+		order = sorted(range(len(merged_keys)), key=merged_keys.__getitem__)
+		self.keys = [merged_keys[idx] for idx in order]
+		self.values = [merged_values[idx] for idx in order]
+
+	def insert(self, field, value):
+		# inserts value into its sorted position, equal keys are appended after existing ones (stable)
+		key = self.key_fn(field)
+		idx = bisect_right(self.keys, key)
+
+		self.keys.insert(idx, key)
+		self.values.insert(idx, value)
+
+	def remove(self, field, value):
+		# removes value (stored under field) from the index
+		# returns boolean (true if value was found and removed)
+		key = self.key_fn(field)
+		lo, hi = bisect_left(self.keys, key), bisect_right(self.keys, key)
+
+		# scan through entries sharing the same key only
+		for idx in range(lo, hi):
+			if (self.values[idx] == value):
+				del self.keys[idx]
+				del self.values[idx]
+				return True
+
+		return False
+
+	def update(self, old_field, new_field, value):
+		# moves value from old_field's position to new_field's position
+		if (self.key_fn(old_field) == self.key_fn(new_field)):
+			# same position, nothing to do
+			return
+
+		self.remove(old_field, value)
+		self.insert(new_field, value)
+
+	def entries_after(self, key=None, value=None, n=1000):
+		# returns up to n (a few more if equal keys straddle the limit) [key, value] pairs following [key, value]
+		# in ascending (key, value) order, from the beginning if key is None
+		# lets callers walk the index in batches while it changes in between (positions shift, keys do not)
+		entries = []
+		idx = 0 if key == None else bisect_left(self.keys, key)
+		while idx < len(self.keys) and len(entries) < n:
+			group_key = self.keys[idx]
+			end = bisect_right(self.keys, group_key, idx)
+			for group_value in sorted(self.values[idx: end]):
+				if (group_key != key or group_value > value):
+					entries.append([group_key, group_value])
+			idx = end
+
+		return entries
@@ -0,0 +1,273 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+from os import path
+from collections import OrderedDict
+import json
+import sqlite3
+import weakref
+import threading
+
+from includes.database_engine import DatabaseReader, TrackedDict, TrackedList, ReaderSnapshot, track, preserve
+
+class SQLiteReader:
+	# reader backed by a local sqlite database, same mapping interface as DatabaseReader
+	# records are decoded on access and kept in a bounded cache, so memory does not grow with the dataset
+	# isbn.json -> table "books" (indexed title_key), users.json -> table "records_users" plus "loans" (indexed isbn and due)
+	# any other file -> table "records_<name>" (key, json value)
+	def __init__(self, filename, directory=None, database="library.sqlite3", cache_size=4096):
+		# filename: str (json file the data originates from, imported on first use)
+		# database: str (sqlite file within directory), cache_size: int (decoded records kept in memory)
+		self.filename = filename
+		self.directory = directory if directory != None else path.join(path.dirname(path.dirname(path.abspath(__file__))), "database")
+		self.filepath = path.join(self.directory, filename)
+		self.db_path = path.join(self.directory, database)
+
+		# use self.filename as hash without the .json extension
+		self.hash = "".join(self.filename.split(".")[:-1])
+		self.layout = self.hash if self.hash in ("isbn", "users") else "records"
+		self.table = "books" if self.layout == "isbn" else "records_{}".format("".join(c for c in self.hash if c.isalnum() or c == "_"))
+
+		# same bookkeeping as DatabaseReader (see DatabaseEngine.flush())
+		self.lock = threading.RLock()
+		self.dirty_keys = set()
+		self.fsyncs = 0
+		self.snapshots = [] # open ReaderSnapshot objects, see open_snapshot()
+
+		self.cache_size = cache_size
+		self._cache = OrderedDict() # key -> record, least recently used first
+		self._live = weakref.WeakValueDictionary() # key -> record still referenced anywhere (so every caller shares one object)
+		self._pinned = {} # key -> record with unsaved changes (None if deleted), never evicted before push()
+
+		self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None) # transactions are opened manually
+		self.conn.execute("PRAGMA journal_mode=WAL")
+		self._create_tables()
+
+		if self.conn.execute("SELECT 1 FROM {} LIMIT 1".format(self.table)).fetchone() == None and path.exists(self.filepath):
+			# first use, import the json file (snapshot and write-ahead log)
+			self._import_json()
+
+	def _create_tables(self):
+		if (self.layout == "isbn"):
+			self.conn.execute("CREATE TABLE IF NOT EXISTS books (isbn TEXT PRIMARY KEY, title TEXT NOT NULL, title_key TEXT NOT NULL, type INTEGER, quantity INTEGER, extra TEXT)")
+			self.conn.execute("CREATE INDEX IF NOT EXISTS books_title_key ON books (title_key)")
+		else:
+			self.conn.execute("CREATE TABLE IF NOT EXISTS {} (key TEXT PRIMARY KEY, value TEXT NOT NULL)".format(self.table))
+
+		if (self.layout == "users"):
+			# one row per loan entry, "returned" is NULL for active loans
+			self.conn.execute("CREATE TABLE IF NOT EXISTS loans (username TEXT NOT NULL, isbn TEXT NOT NULL, loan_ts REAL, duration REAL, due REAL, returned REAL)")
+			self.conn.execute("CREATE INDEX IF NOT EXISTS loans_username ON loans (username)")
+			self.conn.execute("CREATE INDEX IF NOT EXISTS loans_isbn ON loans (isbn)")
+			self.conn.execute("CREATE INDEX IF NOT EXISTS loans_due ON loans (due)")
+
+	def _import_json(self):
+		source = DatabaseReader(self.filename, wal=True, directory=self.directory)
+		with self.lock:
+			self._write({key: source.content[key] for key in source.content}, True)
+
+	def _encode(self, key, value):
+		# returns the row stored for value
+		if (self.layout == "isbn"):
+			extra = {k: v for k, v in value.items() if not (k in ("title", "type", "quantity"))}
+			title = value.get("title", "")
+			return (key, title, title.casefold(), value.get("type"), value.get("quantity"), json.dumps(extra) if len(extra) > 0 else None)
+		else:
+			return (key, json.dumps(value, separators=(",", ":")))
+
+	def _decode(self, row):
+		# row: result of the select in self._select() (without the key)
+		if (self.layout == "isbn"):
+			value = {"title": row[0], "type": row[1], "quantity": row[2]}
+			if (row[3] != None):
+				value.update(json.loads(row[3]))
+			return value
+		else:
+			return json.loads(row[0])
+
+	def _select(self, key):
+		if (self.layout == "isbn"):
+			return self.conn.execute("SELECT title, type, quantity, extra FROM books WHERE isbn = ?", (key,)).fetchone()
+		else:
+			return self.conn.execute("SELECT value FROM {} WHERE key = ?".format(self.table), (key,)).fetchone()
+
+	def _key_column(self):
+		return "isbn" if self.layout == "isbn" else "key"
+
+	def _remember(self, key, record):
+		# keeps record in the lru cache (and the live map if it can be weakly referenced)
+		self._cache[key] = record
+		self._cache.move_to_end(key)
+		if isinstance(record, (TrackedDict, TrackedList)):
+			self._live[key] = record
+
+		while len(self._cache) > self.cache_size:
+			self._cache.popitem(last=False) # still reachable through self._live while referenced elsewhere
+
+	def get(self, key, default=None):
+		with self.lock:
+			if (key in self._pinned):
+				record = self._pinned[key]
+				return default if record == None else record
+
+			record = self._live.get(key)
+			if (record != None):
+				self._remember(key, record)
+				return record
+
+			row = self._select(key)
+			if (row == None):
+				return default
+
+			record = track(self._decode(row), self, key)
+			self._remember(key, record)
+			return record
+
+	def __getitem__(self, key):
+		# wrapper for referencing the data directly (None if missing, like DatabaseReader)
+		return self.get(key)
+
+	def __setitem__(self, key, value):
+		value = track(value, self, key)
+		with self.lock:
+			if (len(self.snapshots) > 0):
+				preserve(self, key)
+			self.dirty_keys.add(key)
+			self._pinned[key] = value
+			self._remember(key, value)
+
+	def __delitem__(self, key):
+		with self.lock:
+			if not (key in self):
+				raise KeyError(key)
+
+			if (len(self.snapshots) > 0):
+				preserve(self, key)
+			self.dirty_keys.add(key)
+			self._pinned[key] = None # tombstone
+			self._cache.pop(key, None)
+			self._live.pop(key, None)
+
+	def __contains__(self, item):
+		# for 'in' operator
+		with self.lock:
+			if (item in self._pinned):
+				return self._pinned[item] != None
+
+			return self.conn.execute("SELECT 1 FROM {} WHERE {} = ?".format(self.table, self._key_column()), (item,)).fetchone() != None
+
+	def __iter__(self):
+		# keys are listed up front (records are not), unsaved additions and deletions included
+		with self.lock:
+			keys = [row[0] for row in self.conn.execute("SELECT {} FROM {}".format(self._key_column(), self.table))]
+			if (len(self._pinned) > 0):
+				stored = [key for key in keys if not (key in self._pinned)]
+				added = [key for key in self._pinned if self._pinned[key] != None]
+				keys = stored +added
+
+		return iter(keys)
+
+	def open_snapshot(self):
+		# returns a ReaderSnapshot of the current content (see DatabaseReader.open_snapshot())
+		return ReaderSnapshot(self)
+
+	def __repr__(self):
+		return "<SQLiteReader {} ({})>".format(self.filename, self.db_path)
+
+	def touch(self, key):
+		# marks key as changed (called by tracked records modified in place), keeps the record until it is pushed
+		with self.lock:
+			if (len(self.snapshots) > 0):
+				preserve(self, key)
+			self.dirty_keys.add(key)
+			if not (key in self._pinned):
+				self._pinned[key] = self._live.get(key, self._cache.get(key))
+
+	@property
+	def dirty(self):
+		# true if there are changes not pushed yet
+		return len(self.dirty_keys) > 0
+
+	def project(self, field):
+		# returns [key, record[field]][] for every record, read from the column directly where possible
+		with self.lock:
+			if (self.layout == "isbn" and field in ("title", "type", "quantity")):
+				pairs = [[row[0], row[1]] for row in self.conn.execute("SELECT isbn, {} FROM books".format(field)) if not (row[0] in self._pinned)]
+				pairs += [[key, record[field]] for key, record in self._pinned.items() if record != None]
+				return pairs
+
+		return [[key, self[key][field]] for key in self]
+
+	def loan_rows(self):
+		# users layout only, returns [username, isbn, due, returned][] for every loan entry (returned is None for active loans)
+		self.push(durable=False) # unsaved loans are not in the table yet
+		with self.lock:
+			return [list(row) for row in self.conn.execute("SELECT username, isbn, due, returned FROM loans")]
+
+	def push(self, durable=True, sync_dir=True):
+		# writes every changed record in one transaction, does nothing if there are no changes
+		# durable: boolean (commit with synchronous=FULL), sync_dir unused (sqlite manages its own files)
+		# returns the (approximate) number of bytes written
+		self.fsyncs = 0
+		with self.lock:
+			if not self.dirty:
+				return 0
+
+			changes = {key: self._pinned.get(key) for key in self.dirty_keys}
+			written = self._write(changes, durable)
+
+			self.dirty_keys = set()
+			self._pinned = {}
+
+		return written
+
+	def checkpoint(self, durable=True, sync_dir=True):
+		# pushes and folds sqlite's own write-ahead log back into the database file
+		written = self.push(durable, sync_dir)
+		with self.lock:
+			self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+		return written
+
+	def _write(self, changes, durable):
+		# changes: {key: record or None (deleted)}
+		# returns the number of bytes encoded
+		upserts = []
+		deletes = []
+		loans = []
+		written = 0
+		for key, record in changes.items():
+			if (record == None):
+				deletes.append((key,))
+				continue
+
+			row = self._encode(key, record)
+			upserts.append(row)
+			written += sum(len(str(x)) for x in row)
+
+			if (self.layout == "users"):
+				for loan_entry in record.get("loaning", []):
+					loans.append((key, loan_entry[0], loan_entry[1], loan_entry[2], loan_entry[1] +loan_entry[2], None))
+				for loan_entry in record.get("loaned_books", []):
+					loans.append((key, loan_entry[0], loan_entry[1], loan_entry[2], loan_entry[1] +loan_entry[2], loan_entry[3]))
+
+		key_column = self._key_column()
+		self.conn.execute("PRAGMA synchronous={}".format("FULL" if durable else "NORMAL"))
+		self.conn.execute("BEGIN")
+		try:
+			if (len(deletes) > 0):
+				self.conn.executemany("DELETE FROM {} WHERE {} = ?".format(self.table, key_column), deletes)
+			if (len(upserts) > 0):
+				self.conn.executemany("INSERT OR REPLACE INTO {} VALUES ({})".format(self.table, ", ".join("?" *len(upserts[0]))), upserts)
+
+			if (self.layout == "users"):
+				# loan rows of changed users are rewritten
+				self.conn.executemany("DELETE FROM loans WHERE username = ?", [(key,) for key in changes])
+				self.conn.executemany("INSERT INTO loans VALUES (?, ?, ?, ?, ?, ?)", loans)
+
+			self.conn.execute("COMMIT")
+		except Exception:
+			self.conn.execute("ROLLBACK")
+			raise
+
+		if durable:
+			self.fsyncs += 1
+		return written
@@ -0,0 +1,72 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# write_atomic() and DatabaseReader.push() failing part way: the file on disk is left as it was, changes stay pending
+# usage: python -m unittest discover tests (from the project root)
+import sys
+import json
+import tempfile
+import unittest
+from unittest import mock
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from includes import database_engine
+from includes.database_engine import DatabaseReader, write_atomic
+
+USERS = {"alice": {"loaning": [], "loaned_books": []}}
+
+class WriteAtomicTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.filepath = path.join(self.tmp.name, "users.json")
+		with open(self.filepath, "wb") as f:
+			f.write(b"original")
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def read(self):
+		with open(self.filepath, "rb") as f:
+			return f.read()
+
+	def test_replaces_the_file(self):
+		self.assertEqual(write_atomic(self.filepath, b"new"), 1)
+		self.assertEqual(self.read(), b"new")
+		self.assertEqual(write_atomic(self.filepath, b"newer", durable=False), 0)
+		self.assertEqual(self.read(), b"newer")
+
+	def test_failed_write_leaves_the_original(self):
+		# disk full while writing, crash before the rename
+		for failing in ("fsync", "replace"):
+			with mock.patch.object(database_engine.os, failing, side_effect=OSError(28, "No space left on device")):
+				with self.assertRaises(OSError):
+					write_atomic(self.filepath, b"new" *1000)
+			self.assertEqual(self.read(), b"original")
+
+		# data that can not be written at all
+		with self.assertRaises(TypeError):
+			write_atomic(self.filepath, "not bytes")
+		self.assertEqual(self.read(), b"original")
+
+	def test_failed_push_keeps_changes_pending(self):
+		with open(self.filepath, "w") as f:
+			json.dump(USERS, f)
+		users = DatabaseReader("users.json", directory=self.tmp.name)
+		users["alice"]["loaning"].append(["0306406152", 1000.0, 86400])
+		users["bob"] = {"loaning": [], "loaned_books": []}
+
+		with mock.patch.object(database_engine.os, "replace", side_effect=OSError(28, "No space left on device")):
+			with self.assertRaises(OSError):
+				users.push()
+		self.assertEqual(users.dirty_keys, {"alice", "bob"})
+		with open(self.filepath, "r") as f:
+			self.assertEqual(json.load(f), USERS)
+
+		# saved by the next push
+		users.push()
+		self.assertFalse(users.dirty)
+		self.assertEqual(dict(DatabaseReader("users.json", directory=self.tmp.name).content), dict(users.content))
+
+if __name__ == "__main__":
+	unittest.main()
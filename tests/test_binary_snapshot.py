@@ -0,0 +1,72 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# binary snapshot format: decode(encode(content)) gives back the same keys, key order, values and value types
+# usage: python -m unittest discover tests (from the project root)
+import sys
+import json
+import unittest
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from includes import binary_snapshot
+
+class BinarySnapshotTest(unittest.TestCase):
+	def assertRoundTrip(self, content):
+		decoded = binary_snapshot.decode(binary_snapshot.encode(content))
+		self.assertEqual(decoded, content)
+		# dict equality ignores order and 1 == 1.0 == True, the json text does not
+		self.assertEqual(json.dumps(decoded), json.dumps(content))
+
+	def test_columns_of_every_kind(self):
+		self.assertRoundTrip({
+			"0306406152": {"title": "Learn Data Analytics", "type": 2, "quantity": 3, "price": 12.5, "tags": ["a", "b"]},
+			"080442957X": {"title": "Harry Potter", "type": 1, "quantity": 300, "price": 8.0, "tags": []},
+			"9780000000002": {"title": "Learn Data Analytics", "type": 1, "quantity": -70000, "price": 0.1, "tags": ["c"]}
+		})
+
+	def test_mixed_type_columns(self):
+		self.assertRoundTrip({
+			"a": {"value": 1, "flag": True, "note": "x"},
+			"b": {"value": 1.0, "flag": 1, "note": None},
+			"c": {"value": "1", "flag": False, "note": {"nested": [1, 2.5, None]}},
+			"d": {"value": None, "flag": 0, "note": ["x"]}
+		})
+
+	def test_wide_ints(self):
+		self.assertRoundTrip({
+			"a": {"i32": 2 **31 -1, "i64": 2 **40, "big": 2 **70, "time": 1700000000000},
+			"b": {"i32": -2 **31, "i64": -2 **63, "big": -2 **64, "time": 0},
+			"c": {"i32": 0, "i64": 2 **63 -1, "big": 1, "time": 1}
+		})
+
+	def test_strings_with_nul_characters(self):
+		self.assertRoundTrip({
+			"a\x00b": {"title": "\x00", "author": ""},
+			"a": {"title": "b\x00", "author": "a\x00b"},
+			"": {"title": "é书\U0001f4da", "author": "\x00\x00"}
+		})
+		self.assertRoundTrip({"": {"title": ""}, "b": {"title": "é"}}) # separator path, empty strings
+
+	def test_empty_and_non_dict_records(self):
+		self.assertRoundTrip({})
+		self.assertRoundTrip({"a": {}, "b": {}})
+		self.assertRoundTrip({"a": [1, 2], "b": "text", "c": 3, "d": None, "e": 1.5, "f": [], "g": True})
+
+	def test_key_order(self):
+		# records of different shapes interleaved, fields in different orders
+		content = {}
+		for idx in range(20):
+			if (idx %4 == 0):
+				content["k{}".format(19 -idx)] = {"title": str(idx), "quantity": idx}
+			elif (idx %4 == 1):
+				content["k{}".format(19 -idx)] = {"quantity": idx, "title": str(idx)}
+			elif (idx %4 == 2):
+				content["k{}".format(19 -idx)] = {}
+			else:
+				content["k{}".format(19 -idx)] = [idx]
+		self.assertRoundTrip(content)
+		self.assertEqual(list(binary_snapshot.decode(binary_snapshot.encode(content))), list(content))
+
+if __name__ == "__main__":
+	unittest.main()
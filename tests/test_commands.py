@@ -0,0 +1,84 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# command registry of LibCLI: commands listed and dispatched per access level, suggestions for mistyped commands
+# usage: python -m unittest discover tests (from the project root)
+import io
+import sys
+import json
+import tempfile
+import unittest
+import importlib.util
+from unittest import mock
+from contextlib import redirect_stdout
+from os import path
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from includes.book_store import wrap_book
+
+# imports __main__.py as a module (without running the login loop), like benchmarks/bench_common.py
+spec = importlib.util.spec_from_file_location("libcli", path.join(ROOT, "__main__.py"))
+libcli = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(libcli)
+
+USER, LIBRARIAN, ADMINISTRATOR, ROOT_USER = range(4) # AuthManager.USER_ACCESS_LEVEL
+
+class CommandAccessTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		for filename in ("isbn.json", "users.json"):
+			with open(path.join(self.tmp.name, filename), "w") as f:
+				json.dump({}, f)
+		libcli.database_engine.create_reader("users.json", directory=self.tmp.name)
+		libcli.database_engine.create_reader("isbn.json", directory=self.tmp.name, wrap=wrap_book)
+		with mock.patch.object(libcli.AuthManager, "__init__", return_value=None): # credentials (.env) are not needed to dispatch commands
+			self.cli = libcli.LibCLI()
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def dispatch(self, command, access_level):
+		# returns the printed output, archive and convert handlers are replaced with mocks (self.archive, self.convert)
+		self.cli.access_level = access_level
+		output = io.StringIO()
+		with mock.patch.object(self.cli, "archive_interface") as self.archive, mock.patch.object(self.cli, "convert_interface") as self.convert:
+			with redirect_stdout(output):
+				self.cli.kernel(command)
+		return output.getvalue()
+
+	def test_help_lists_commands_up_to_the_access_level(self):
+		listed = {}
+		for access_level in range(4):
+			help_text = self.cli.commands.help_text(access_level)
+			listed[access_level] = [name for name in ("help", "add", "archive", "convert") if "\n{:<7}|".format(name) in help_text]
+
+		self.assertEqual(listed[USER], ["help"])
+		self.assertEqual(listed[LIBRARIAN], ["help", "add"])
+		self.assertEqual(listed[ADMINISTRATOR], ["help", "add", "archive"])
+		self.assertEqual(listed[ROOT_USER], ["help", "add", "archive", "convert"])
+
+	def test_admin_commands_are_not_dispatched_below_their_level(self):
+		for access_level in (USER, LIBRARIAN):
+			for command in ("archive", "convert", "ARCHIVE"):
+				output = self.dispatch(command, access_level)
+				self.archive.assert_not_called()
+				self.convert.assert_not_called()
+				self.assertIn("No command found for '{}'".format(command), output)
+				self.assertNotIn("did you mean '{}'".format(command.lower()), output)
+
+		self.dispatch("convert", ADMINISTRATOR)
+		self.convert.assert_not_called()
+		self.dispatch("archive", ADMINISTRATOR)
+		self.archive.assert_called_once()
+		self.dispatch("convert", ROOT_USER)
+		self.convert.assert_called_once()
+
+	def test_mistyped_commands_are_suggested(self):
+		self.assertIn("did you mean 'help'", self.dispatch("hlep", USER))
+		self.assertIn("did you mean 'archive'", self.dispatch("archve", ADMINISTRATOR))
+		self.assertNotIn("archive", self.dispatch("archve", USER)) # only commands the user can run are suggested
+		self.archive.assert_not_called()
+
+if __name__ == "__main__":
+	unittest.main()
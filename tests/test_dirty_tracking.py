@@ -0,0 +1,76 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# dirty key tracking of DatabaseReader (in place edits of nested values) and DatabaseEngine.flush() skipping clean readers
+# usage: python -m unittest discover tests (from the project root)
+import sys
+import json
+import tempfile
+import unittest
+from unittest import mock
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from includes.database_engine import DatabaseEngine, DatabaseReader
+
+USERS = {
+	"alice": {"loaning": [], "loaned_books": [], "settings": {"pages": [{"size": 10}]}},
+	"bob": {"loaning": [["0306406152", 1000.0, 86400]], "loaned_books": [], "settings": {"pages": []}}
+}
+
+class DirtyTrackingTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.directory = self.tmp.name
+		for filename in ("users.json", "isbn.json"):
+			with open(path.join(self.directory, filename), "w") as f:
+				json.dump(USERS if filename == "users.json" else {"0306406152": {"title": "one", "quantity": 1}}, f)
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def test_nested_in_place_edits_mark_their_key(self):
+		users = DatabaseReader("users.json", directory=self.directory)
+		self.assertFalse(users.dirty)
+
+		users["alice"]["settings"]["pages"][0]["size"] = 20 # dict in a list in a dict
+		self.assertEqual(users.dirty_keys, {"alice"})
+		users["bob"]["loaning"][0][2] = 2 *86400
+		users["bob"]["loaning"].append(["080442957X", 2000.0, 86400])
+		self.assertEqual(users.dirty_keys, {"alice", "bob"})
+
+		# values added in place are tracked too
+		users.push()
+		self.assertFalse(users.dirty)
+		users["bob"]["loaning"][1].append("renewed")
+		self.assertEqual(users.dirty_keys, {"bob"})
+
+		users.push()
+		saved = DatabaseReader("users.json", directory=self.directory)
+		self.assertEqual(saved["alice"]["settings"]["pages"][0]["size"], 20)
+		self.assertEqual(saved["bob"]["loaning"], [["0306406152", 1000.0, 2 *86400], ["080442957X", 2000.0, 86400, "renewed"]])
+
+	def test_reads_do_not_mark_keys(self):
+		users = DatabaseReader("users.json", directory=self.directory)
+		for username in users:
+			len(users[username]["loaning"])
+			users[username]["settings"].get("pages")
+		self.assertFalse(users.dirty)
+
+	def test_flush_skips_clean_readers(self):
+		engine = DatabaseEngine()
+		users = engine.create_reader("users.json", directory=self.directory)
+		books = engine.create_reader("isbn.json", directory=self.directory)
+		users["alice"]["loaning"].append(["0306406152", 1000.0, 86400])
+
+		with mock.patch.object(books, "push", side_effect=AssertionError("clean reader pushed")):
+			self.assertEqual(engine.flush(), 1)
+		self.assertFalse(users.dirty)
+		self.assertEqual(engine.metrics["flushes"], 1)
+
+		# nothing changed since, no reader is pushed
+		self.assertEqual(engine.flush(), 0)
+		self.assertEqual(engine.metrics["flushes"], 1)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,49 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# batch updates of SortedIndex and NGramIndex (bulk imports) against the same entries added one by one
+# usage: python -m unittest discover tests (from the project root)
+import sys
+import unittest
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from includes.sorted_index import SortedIndex
+from includes.search_index import NGramIndex
+
+class SortedIndexTest(unittest.TestCase):
+	def test_merge_matches_inserts(self):
+		existing = [["Dune", "1"], ["banana", "2"], ["apple", "3"]]
+		added = [["Apple", "4"], ["cherry", "5"], ["dune", "6"]]
+
+		inserted = SortedIndex()
+		for title, isbn in existing +added:
+			inserted.insert(title, isbn)
+
+		merged = SortedIndex()
+		for title, isbn in existing:
+			merged.insert(title, isbn)
+		added.sort(key=lambda entry: entry[0].casefold())
+		merged.merge([title.casefold() for title, isbn in added], [isbn for title, isbn in added])
+
+		self.assertEqual(merged.keys, inserted.keys)
+		self.assertEqual(merged.values, inserted.values) # equal keys after the existing ones
+		self.assertEqual(merged.values, ["3", "4", "2", "5", "1", "6"])
+
+class NGramIndexTest(unittest.TestCase):
+	def test_add_many_matches_load(self):
+		ids = ["1", "2", "3", "4"]
+		texts = ["Banana Bread", "bread", "Anna Karenina", "aaaa"]
+
+		loaded = NGramIndex()
+		loaded.load(ids, texts)
+		added = NGramIndex()
+		added.load(ids[:2], texts[:2])
+		added.add_many(ids[2:], texts[2:])
+
+		self.assertEqual(added.postings, loaded.postings)
+		self.assertEqual(added.lengths, loaded.lengths)
+		self.assertEqual(added.candidates("karenina", 1), ["3"])
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,43 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# isbn validation, conversion and the forms books are looked up and stored under
+# usage: python -m unittest discover tests (from the project root)
+import sys
+import unittest
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from includes.isbn_codes import valid_isbn, to_isbn10, to_isbn13, canonical_isbn, canonical_isbns, catalogue_isbn, catalogue_canonical_isbn
+
+class IsbnCodesTest(unittest.TestCase):
+	def test_check_digits(self):
+		self.assertTrue(valid_isbn("0306406152"))
+		self.assertTrue(valid_isbn("080442957X")) # check digit 10
+		self.assertTrue(valid_isbn("0-8044-2957-x"))
+		self.assertTrue(valid_isbn("9780000000002")) # isbn-13 check digit 0
+		self.assertFalse(valid_isbn("0306406153"))
+		self.assertFalse(valid_isbn("978030640615"))
+		self.assertFalse(valid_isbn(None))
+
+	def test_conversion(self):
+		self.assertEqual(to_isbn13("0306406152"), "9780306406157")
+		self.assertEqual(to_isbn10("978-0-306-40615-7"), "0306406152")
+		self.assertEqual(to_isbn10("9780804429573"), "080442957X")
+		self.assertEqual(to_isbn10("979-10-90636-07-1"), None) # no isbn-10 form
+
+	def test_both_forms_share_a_canonical_key(self):
+		self.assertEqual(canonical_isbn("0306406152"), canonical_isbn("978 0 306 40615 7"))
+		self.assertEqual(canonical_isbns(["0306406152", "bad", None]), ["9780306406157", None, None])
+
+	def test_catalogue_form(self):
+		self.assertEqual(catalogue_isbn("978 0 306 40615 7"), "978-0306406157")
+		self.assertEqual(catalogue_isbn("0-306-40615-2"), "0306406152")
+		self.assertEqual(catalogue_isbn("0306406153"), None)
+
+	def test_canonical_form_of_catalogue_keys(self):
+		for isbn_code in ("978 0 306 40615 7", "0-306-40615-2", "080442957X", "979-10-90636-07-1"):
+			self.assertEqual(catalogue_canonical_isbn(catalogue_isbn(isbn_code)), canonical_isbn(isbn_code))
+
+if __name__ == "__main__":
+	unittest.main()
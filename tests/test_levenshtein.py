@@ -0,0 +1,78 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# levenshtein kernels (UtilCLI.levenshtein_distance, UtilCLI.levenshtein_batch) against the plain full matrix dp, with and without cutoffs
+# usage: python -m unittest discover tests (from the project root)
+import sys
+import random
+import unittest
+import importlib.util
+from unittest import mock
+from os import path
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# imports __main__.py as a module (without running the login loop), like benchmarks/bench_common.py
+spec = importlib.util.spec_from_file_location("libcli", path.join(ROOT, "__main__.py"))
+libcli = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(libcli)
+
+CUTOFFS = [None, 0, 1, 2, 3, 5, 8]
+
+def plain_distance(a, b):
+	# full (len(a) +1) x (len(b) +1) matrix
+	matrix = [[x +y if x == 0 or y == 0 else 0 for x in range(len(b) +1)] for y in range(len(a) +1)]
+	for y in range(1, len(a) +1):
+		for x in range(1, len(b) +1):
+			matrix[y][x] = min(matrix[y -1][x] +1, matrix[y][x -1] +1, matrix[y -1][x -1] +(a[y -1] != b[x -1]))
+	return matrix[len(a)][len(b)]
+
+def expected(a, b, max_distance):
+	distance = plain_distance(a, b)
+	return distance if max_distance == None else min(distance, max_distance +1)
+
+def random_strings(rng, count, alphabet="abcde é书\U0001f4da"):
+	# small alphabet, so that strings share characters and distances stay close to the cutoffs
+	return ["".join(rng.choice(alphabet) for idx in range(rng.randint(0, 14))) for idx in range(count)]
+
+class LevenshteinDistanceTest(unittest.TestCase):
+	def test_known_distances(self):
+		self.assertEqual(libcli.UtilCLI.levenshtein_distance("kitten", "sitting"), 3)
+		self.assertEqual(libcli.UtilCLI.levenshtein_distance("", "abc"), 3)
+		self.assertEqual(libcli.UtilCLI.levenshtein_distance("abc", "abc", 0), 0)
+		self.assertEqual(libcli.UtilCLI.levenshtein_distance("kitten", "sitting", 1), 2) # cut off at max_distance +1
+
+	def test_matches_plain_dp(self):
+		rng = random.Random(4)
+		strings = random_strings(rng, 60)
+		for max_distance in CUTOFFS:
+			for a, b in zip(strings, reversed(strings)):
+				with self.subTest(a=a, b=b, max_distance=max_distance):
+					self.assertEqual(libcli.UtilCLI.levenshtein_distance(a, b, max_distance), expected(a, b, max_distance))
+					self.assertEqual(libcli.UtilCLI.levenshtein_distance(b, a, max_distance), expected(a, b, max_distance))
+
+class LevenshteinBatchTest(unittest.TestCase):
+	def setUp(self):
+		rng = random.Random(5)
+		self.queries = ["", "a", "abc", "é书ab", "cabbage d"]
+		self.strings = random_strings(rng, 200) +["", "abc", "\U0001f4da" *20] # enough rows for the numpy path
+
+	def check_batch(self):
+		for query in self.queries:
+			for max_distance in CUTOFFS:
+				with self.subTest(query=query, max_distance=max_distance):
+					distances = libcli.UtilCLI.levenshtein_batch(query, self.strings, max_distance)
+					self.assertEqual(distances, [expected(s, query, max_distance) for s in self.strings])
+					self.assertEqual(libcli.UtilCLI.levenshtein_batch(query, self.strings[:5], max_distance), distances[:5]) # row by row
+		self.assertEqual(libcli.UtilCLI.levenshtein_batch("abc", []), [])
+
+	def test_without_numpy(self):
+		with mock.patch.object(libcli, "np", None):
+			self.check_batch()
+
+	@unittest.skipIf(libcli.np == None, "numpy is not installed")
+	def test_numpy(self):
+		self.check_batch()
+
+if __name__ == "__main__":
+	unittest.main()
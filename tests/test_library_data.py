@@ -0,0 +1,97 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# LibraryData on a catalogue in a temporary directory: indexes and cached search results kept up to date by local and remote (shared mode) changes
+# usage: python -m unittest discover tests (from the project root)
+import sys
+import json
+import tempfile
+import unittest
+import importlib.util
+from os import path
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from includes.book_store import wrap_book
+from includes.database_engine import DatabaseReader
+
+# imports __main__.py as a module (without running the login loop), like benchmarks/bench_common.py
+spec = importlib.util.spec_from_file_location("libcli", path.join(ROOT, "__main__.py"))
+libcli = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(libcli)
+
+BOOKS = {
+	"978-0306406157": {"title": "Learn Data Analytics", "type": 2, "quantity": 3},
+	"0804429579": {"title": "Harry Potter and the Stone", "type": 1, "quantity": 1}
+}
+
+class SharedCatalogueTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.directory = self.tmp.name
+		with open(path.join(self.directory, "isbn.json"), "w") as f:
+			json.dump(BOOKS, f)
+		with open(path.join(self.directory, "users.json"), "w") as f:
+			json.dump({}, f)
+
+		libcli.database_engine.create_reader("users.json", directory=self.directory, wal=True, shared=True)
+		libcli.database_engine.create_reader("isbn.json", directory=self.directory, wrap=wrap_book, wal=True, shared=True)
+		self.library = libcli.LibraryData()
+		self.library.process_data()
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def other_terminal(self):
+		return DatabaseReader("isbn.json", directory=self.directory, shared=True)
+
+	def test_remote_keys_that_are_not_isbns_are_not_indexed(self):
+		other = self.other_terminal()
+		other["0306406153"] = {"title": "Legacy One", "type": 1, "quantity": 1} # bad check digits, written before keys were validated
+		other["0306406154"] = {"title": "Legacy Two", "type": 1, "quantity": 1}
+		other["978-0000000002"] = {"title": "New Book", "type": 1, "quantity": 1}
+		other.push()
+
+		libcli.database_engine.sync()
+		self.library.apply_remote_changes()
+		self.assertFalse(None in self.library.canonical_index)
+		self.assertEqual(self.library.find_isbn("9780000000002"), "978-0000000002")
+		self.assertEqual(self.library.find_isbn("0306406153"), "0306406153") # still found under its own key
+		self.assertEqual(self.library.total_entries, 5)
+
+	def search(self, query):
+		# returns the titles on the first page of results (alphabetical, ranking is not tested here)
+		return sorted([self.library.data[isbn]["title"] for isbn, distance in self.library.search_book({"query": query})[0]])
+
+	def test_cached_search_results_are_invalidated_by_changes(self):
+		results = self.library.search_book({"query": "Learn Data"})
+		self.assertIs(self.library.search_book({"query": "Learn Data"}), results) # served from the cache
+		self.assertEqual(self.search("Learn Data"), ["Learn Data Analytics"])
+
+		self.assertTrue(self.library.add_book({"isbn": "9780000000002", "title": "Learn Data Science", "type": 1, "quantity": 1}))
+		isbn = self.library.find_isbn("9780000000002")
+		self.assertEqual(self.search("Learn Data"), ["Learn Data Analytics", "Learn Data Science"])
+
+		self.assertTrue(self.library.update_book(isbn, {"title": "Learn Data"}))
+		self.assertEqual(self.search("Learn Data"), ["Learn Data", "Learn Data Analytics"])
+
+		self.assertTrue(self.library.delete_book(isbn))
+		self.assertEqual(self.search("Learn Data"), ["Learn Data Analytics"])
+
+		# saved by another terminal
+		other = self.other_terminal()
+		other["978-0000000002"] = {"title": "Learn Data Mining", "type": 1, "quantity": 1}
+		other.push()
+		version = self.library.version
+		libcli.database_engine.sync()
+		self.library.apply_remote_changes()
+		self.assertGreater(self.library.version, version)
+		self.assertEqual(self.search("Learn Data"), ["Learn Data Analytics", "Learn Data Mining"])
+
+		# nothing changed, nothing invalidated
+		results = self.library.search_book({"query": "Learn Data"})
+		self.library.apply_remote_changes()
+		self.assertIs(self.library.search_book({"query": "Learn Data"}), results)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,68 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# LoanArchive segments written by several terminals sharing one database folder
+# usage: python -m unittest discover tests (from the project root)
+import sys
+import json
+import tempfile
+import unittest
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from includes.database_engine import DatabaseReader
+from includes.loan_archive import LoanArchive
+
+DAY = 86400
+
+class LoanArchiveTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.directory = self.tmp.name
+		users = {}
+		for username in ("alice", "bob"):
+			users[username] = {"loaning": [], "loaned_books": [["978-0306406157", 1000.0, 2 *DAY, 2000.0], ["0306406152", 3000.0, 2 *DAY, 4000.0]]}
+		with open(path.join(self.directory, "users.json"), "w") as f:
+			json.dump(users, f)
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def archive(self):
+		return LoanArchive(path.join(self.directory, "archive"), max_age=DAY)
+
+	def test_terminals_write_separate_segments(self):
+		a, b = self.archive(), self.archive() # both started before anything was archived
+		users = DatabaseReader("users.json", directory=self.directory)
+		self.assertEqual(len(a.archive(users, now=DAY +3000.0)), 2) # entries returned before 3000
+		self.assertEqual(len(b.archive(users, now=10 *DAY)), 2)
+
+		self.assertEqual(len(b.segments), 2)
+		self.assertEqual(len(set(b.segments)), 2)
+		entries = sorted(entry[0] +entry[1] for entry in a.entries()) # segments of b are listed too
+		self.assertEqual(entries, ["alice0306406152", "alice978-0306406157", "bob0306406152", "bob978-0306406157"])
+
+	def test_archived_entries_are_not_archived_again(self):
+		a, b = self.archive(), self.archive()
+		users = DatabaseReader("users.json", directory=self.directory)
+		entries = [list(loan_entry) for loan_entry in users["alice"]["loaned_books"]]
+		a.archive(users, now=10 *DAY)
+
+		# crashed before users.json was saved, the entries are still there for the next terminal
+		users["alice"]["loaned_books"] = entries
+		b.archive(users, now=10 *DAY)
+		self.assertEqual(len([entry for entry in b.entries("alice")]), 2)
+
+	def test_numbered_segments_sort_first(self):
+		a = self.archive()
+		users = DatabaseReader("users.json", directory=self.directory)
+		a.archive(users, now=10 *DAY)
+		with open(path.join(a.directory, a.segments[0]), "rb") as f:
+			data = f.read()
+		with open(path.join(a.directory, "loans-000001.jsonl.gz"), "wb") as f:
+			f.write(data)
+
+		self.assertEqual(a.refresh()[0], "loans-000001.jsonl.gz")
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,204 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# shared mode of DatabaseReader (several terminals on one database folder): log records, merges and transactions
+# every reader below stands in for one terminal, they only share the files in a temporary directory
+# usage: python -m unittest discover tests (from the project root)
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import unittest
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from includes.database_engine import DatabaseEngine, DatabaseReader, Transaction
+from includes.record_merge import MISSING, merge_values
+
+class MergeValuesTest(unittest.TestCase):
+	def test_fields_changed_on_either_side_are_kept(self):
+		base = {"title": "a", "quantity": 1}
+		merged = merge_values(base, {"title": "b", "quantity": 1}, {"title": "a", "quantity": 2})
+		self.assertEqual(merged, {"title": "b", "quantity": 2})
+
+	def test_counts_apply_both_changes(self):
+		self.assertEqual(merge_values(5, 4, 4), 3)
+		self.assertEqual(merge_values(5, 7, 4), 6)
+
+	def test_counts_do_not_go_below_zero(self):
+		self.assertEqual(merge_values(1, 0, 0), 0)
+
+	def test_change_wins_over_deletion(self):
+		self.assertEqual(merge_values({"quantity": 1}, MISSING, {"quantity": 0}), {"quantity": 0})
+		self.assertEqual(merge_values({"quantity": 1}, {"quantity": 0}, MISSING), {"quantity": 0})
+		self.assertIs(merge_values({"quantity": 1}, MISSING, MISSING), MISSING)
+
+	def test_list_insertions_of_both_sides_are_kept(self):
+		self.assertEqual(merge_values([["a", 1]], [["a", 1], ["b", 2]], [["c", 3]]), [["c", 3], ["b", 2]])
+
+class SharedReaderTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.directory = self.tmp.name
+		with open(path.join(self.directory, "isbn.json"), "w") as f:
+			json.dump({"1": {"title": "one", "quantity": 1}, "2": {"title": "two", "quantity": 10}}, f)
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def terminal(self):
+		return DatabaseReader("isbn.json", directory=self.directory, shared=True)
+
+	def saved(self):
+		# what a terminal started now would load
+		return DatabaseReader("isbn.json", directory=self.directory, wal=True).content
+
+	def test_independent_keys_are_both_saved(self):
+		a, b = self.terminal(), self.terminal()
+		a["3"] = {"title": "three", "quantity": 3}
+		b["4"] = {"title": "four", "quantity": 4}
+		a.push()
+		b.push()
+
+		self.assertEqual(sorted(self.saved()), ["1", "2", "3", "4"])
+		a.sync()
+		self.assertEqual(a["4"]["title"], "four")
+
+	def test_unsaved_changes_are_merged_with_saved_ones(self):
+		a, b = self.terminal(), self.terminal()
+		a["2"]["title"] = "second"
+		b["2"]["quantity"] -= 1
+		b.push()
+		a.push()
+
+		self.assertEqual(self.saved()["2"], {"title": "second", "quantity": 9})
+		self.assertEqual(a.merges, 1)
+
+	def test_changes_of_other_terminals_are_queued(self):
+		a, b = self.terminal(), self.terminal()
+		del b["1"]
+		b.push()
+
+		self.assertEqual(a.sync(), 1)
+		self.assertFalse("1" in a)
+		self.assertEqual(list(a.changes), [["1", {"title": "one", "quantity": 1}, None]])
+
+	def test_sync_after_another_terminal_checkpointed(self):
+		a, b = self.terminal(), self.terminal()
+		b["2"]["quantity"] = 0
+		del b["1"]
+		b.checkpoint()
+		self.assertFalse(path.exists(b.wal_path))
+
+		a.sync()
+		self.assertEqual(dict(a.content), {"2": {"title": "two", "quantity": 0}})
+
+	def test_torn_log_record_is_dropped(self):
+		a = self.terminal()
+		a["1"]["quantity"] = 5
+		a.push()
+		with open(a.wal_path, "ab") as f:
+			f.write(b'["s","1",{"title":"one","quan') # crashed while appending
+
+		b = self.terminal()
+		self.assertEqual(b["1"]["quantity"], 5)
+		b["2"]["quantity"] = 7
+		b.push() # appended after the last complete record
+		self.assertEqual(self.saved()["2"]["quantity"], 7)
+		self.assertEqual(self.saved()["1"]["quantity"], 5)
+
+	def test_log_records_with_version_numbers_are_replayed(self):
+		# written before the version numbers were dropped from the log
+		with open(path.join(self.directory, "isbn.json.wal"), "w") as f:
+			f.write('["s","1",{"title":"one","quantity":0},2]\n["d","2",1]\n')
+
+		self.assertEqual(dict(self.terminal().content), {"1": {"title": "one", "quantity": 0}})
+
+	def test_transactions_do_not_oversell(self):
+		# two terminals loaning the same 10 copies, each check and decrement happens in one transaction
+		terminals = [self.terminal(), self.terminal()]
+		loaned = [0, 0]
+
+		def loan(idx):
+			reader = terminals[idx]
+			for attempt in range(8):
+				with Transaction([reader]):
+					if (reader["2"]["quantity"] > 0):
+						reader["2"]["quantity"] -= 1
+						loaned[idx] += 1
+
+		threads = [threading.Thread(target=loan, args=(idx,)) for idx in range(2)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		self.assertEqual(sum(loaned), 10)
+		self.assertEqual(self.saved()["2"]["quantity"], 0)
+		for reader in terminals:
+			reader.sync()
+			self.assertEqual(reader["2"]["quantity"], 0)
+
+	def test_iteration_while_another_terminal_writes(self):
+		# another terminal adds and deletes records while this one iterates over its keys and syncs in a second thread
+		a, b = self.terminal(), self.terminal()
+		for idx in range(200):
+			a[str(idx +10)] = {"title": "book", "quantity": idx}
+		a.push()
+		b.sync()
+		stop = threading.Event()
+		failures = []
+
+		def write():
+			idx = 0
+			while not stop.is_set():
+				b["new" +str(idx)] = {"title": "new", "quantity": 1}
+				b.push()
+				del b["new" +str(idx)]
+				b.push()
+				idx += 1
+
+		def sync():
+			while not stop.is_set():
+				a.sync()
+
+		threads = [threading.Thread(target=write), threading.Thread(target=sync)]
+		for thread in threads:
+			thread.start()
+		try:
+			for attempt in range(10):
+				keys = []
+				for key in a:
+					keys.append(key)
+					time.sleep(0) # lets the other threads run in between keys
+				self.assertEqual(len([key for key in keys if not key.startswith("new")]), 202)
+		except RuntimeError as e:
+			failures.append(e)
+		finally:
+			stop.set()
+			for thread in threads:
+				thread.join()
+
+		self.assertEqual(failures, [])
+
+	def test_autosave_leaves_shared_readers_to_their_thread(self):
+		engine = DatabaseEngine()
+		a = engine.create_reader("isbn.json", directory=self.directory, shared=True)
+		b = self.terminal()
+		b["3"] = {"title": "three", "quantity": 3}
+		b.push()
+		a["1"]["quantity"] = 0
+
+		engine.flush(shared=False) # autosave thread
+		self.assertFalse("3" in a)
+		self.assertTrue(a.dirty)
+
+		engine.sync() # before the next command
+		self.assertEqual(a["3"]["title"], "three")
+		self.assertFalse(a.dirty)
+		self.assertEqual(self.saved()["1"]["quantity"], 0)
+
+if __name__ == "__main__":
+	unittest.main()
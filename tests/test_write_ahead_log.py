@@ -0,0 +1,89 @@
+# Author: Chong Cheng Hock
+# Admin No / Grp: 230643M / AA2301
+# write-ahead log of DatabaseReader (wal=True): records appended on push(), replayed on load, torn records dropped
+# usage: python -m unittest discover tests (from the project root)
+import os
+import sys
+import json
+import tempfile
+import unittest
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from includes.database_engine import DatabaseReader
+
+USERS = {"alice": {"loaning": [], "loaned_books": []}, "bob": {"loaning": [["0306406152", 1000.0, 86400]], "loaned_books": []}}
+
+class WriteAheadLogTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.directory = self.tmp.name
+		self.snapshot_path = path.join(self.directory, "users.json")
+		with open(self.snapshot_path, "w") as f:
+			json.dump(USERS, f)
+
+	def tearDown(self):
+		self.tmp.cleanup()
+
+	def reader(self):
+		return DatabaseReader("users.json", directory=self.directory, wal=True)
+
+	def snapshot(self):
+		with open(self.snapshot_path, "r") as f:
+			return json.load(f)
+
+	def test_changes_are_appended_and_replayed(self):
+		users = self.reader()
+		users["carol"] = {"loaning": [], "loaned_books": []}
+		users["alice"]["loaning"].append(["080442957X", 2000.0, 86400]) # in place edit of a nested list
+		del users["bob"]
+		users.push()
+
+		self.assertEqual(self.snapshot(), USERS) # snapshot is not rewritten
+		with open(users.wal_path, "rb") as f:
+			self.assertEqual(len(f.read().splitlines()), 3) # one record per changed key
+
+		self.assertEqual(dict(self.reader().content), {"alice": {"loaning": [["080442957X", 2000.0, 86400]], "loaned_books": []}, "carol": {"loaning": [], "loaned_books": []}})
+
+	def test_log_cut_mid_record_reloads_last_complete_state(self):
+		for cut in (1, 10, -1): # bytes of the last record that reached the disk (-1: all but its newline)
+			if path.exists(path.join(self.directory, "users.json.wal")):
+				os.remove(path.join(self.directory, "users.json.wal"))
+			users = self.reader()
+			users["alice"]["loaning"].append(["080442957X", 2000.0, 86400])
+			del users["bob"]
+			users.push()
+			complete = dict(self.reader().content)
+			complete_size = path.getsize(users.wal_path)
+
+			# crashed while appending the next record
+			users["carol"] = {"loaning": [], "loaned_books": []}
+			users.push()
+			with open(users.wal_path, "r+b") as f:
+				f.truncate(complete_size +cut if cut > 0 else path.getsize(users.wal_path) +cut)
+
+			reloaded = self.reader()
+			self.assertEqual(dict(reloaded.content), complete)
+			self.assertEqual(path.getsize(users.wal_path), complete_size) # torn record cut off
+
+			# records appended after recovery land on their own line and are replayed
+			reloaded["dave"] = {"loaning": [], "loaned_books": []}
+			reloaded.push()
+			self.assertEqual(sorted(self.reader().content), ["alice", "dave"])
+
+	def test_checkpoint_compacts_the_log(self):
+		users = self.reader()
+		users.checkpoint_every = 3
+		users["alice"]["loaning"].append(["080442957X", 2000.0, 86400])
+		users.push()
+		users["carol"] = {"loaning": [], "loaned_books": []}
+		del users["bob"]
+		users.push() # log would hold 3 records, rewritten into the snapshot instead
+
+		self.assertFalse(path.exists(users.wal_path))
+		self.assertEqual(self.snapshot(), dict(self.reader().content))
+		self.assertEqual(sorted(self.snapshot()), ["alice", "carol"])
+
+if __name__ == "__main__":
+	unittest.main()